@@ -22,9 +22,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # imports
 from utils.common_utils import (
     registrar_inicio, registrar_resumen, 
-    nombre_mes, obtener_mes_anterior, obtener_anio, crear_directorio_salida
+    nombre_mes, obtener_mes_anterior, obtener_anio, crear_directorio_salida,
+    indexar_hojas, resolver_hoja
 )
-from utils.drive_utils import inicializar_drive, obtener_archivos, descargar_archivo
+from utils.drive_utils import inicializar_drive, obtener_archivos, abrir_archivo_excel
+from utils.excel_utils import listar_hojas_xlsx
 from utils.gmail_utils import enviar_email_html_con_adjuntos, generar_html_resumen_fv
 
 
@@ -88,15 +90,22 @@ def buscar_en_hoja(fh, nombre, hoja, todas_las_filas):
         bool: True si se encontró al menos una fila que cumple la condición
     """
     try:
+        # Verificar la hoja leyendo sólo workbook.xml (None: no es .xlsx)
+        hojas = listar_hojas_xlsx(fh)
+        if hojas is not None and not resolver_hoja(hoja, indexar_hojas(hojas)):
+            print(f"   ⚠ Hoja '{hoja}' no encontrada en {nombre}")
+            return False
+
         fh.seek(0)
         wb = openpyxl.load_workbook(fh, data_only=True, read_only=True)
 
-        if hoja not in wb.sheetnames:
+        hoja_real = resolver_hoja(hoja, indexar_hojas(wb.sheetnames))
+        if not hoja_real:
             print(f"   ⚠ Hoja '{hoja}' no encontrada en {nombre}")
             wb.close()
             return False
 
-        ws = wb[hoja]
+        ws = wb[hoja_real]
         filas_encontradas_en_archivo = 0
 
         # DEBUG: Muestra primeras filas para verificar
@@ -258,7 +267,7 @@ def procesar_archivo(archivo, hoja_periodo, todas_las_filas):
         if not servicio_drive:
             return archivo["name"], False
 
-        fh = descargar_archivo(servicio_drive, archivo)
+        fh = abrir_archivo_excel(servicio_drive, archivo)
         if not fh:
             return archivo["name"], False
 
@@ -9,11 +9,41 @@ del año en un unico Excel, con una hoja por periodo.
 ======= EJECUCION MANUAL =========
 Usar workflow_dispatch en GitHub Actions con el input:
   - anio: ej: 2025
+  - fuente: unificados (por defecto) | libros
+
+======= FUENTES =========
+Con REPORTE_FUENTE=unificados cada período se toma, en este orden, de:
+  1. el almacén SQLite que carga el unificador mensual (se baja de la
+     carpeta PERSISTENCIA_CARPETA_ID de Drive al empezar)
+  2. el Unificado_<Mes><Año>.csv en la carpeta REPORTE_CARPETA_UNIFICADOS_ID,
+     donde lo sube el unificador mensual
+  3. la extracción directa de los libros de cada repartición
+Con REPORTE_FUENTE=libros siempre se extrae de los libros.
+
+======= REANUDAR =========
+Con la fuente libros cada libro extraído queda guardado en
+estado/reporte_anual; de cada mes sólo se anotan los conteos. Si la corrida
+se corta, el input reanudar_run_id restaura ese estado y corre con
+--resume: los libros terminados no se vuelven a abrir y cada mes se rearma
+desde ellos (o desde el almacén / CSV unificado). Al final se controla que
+los conteos de los meses den lo mismo que los anotados y se vuelve a
+extraer una muestra de los libros que salieron del estado.
+  Local: python src/reporte_anual_bot.py --resume
+
+======= CACHÉ DE HOJAS =========
+Las hojas ya extraídas, por este bot o por el unificador mensual (mismas
+entradas), quedan en cache/hojas. Con PERSISTENCIA_CARPETA_ID la caché se
+baja de Drive al empezar y se sube al terminar (utils.persistencia_utils);
+sin esa carpeta sólo sirve dentro de la misma máquina.
 
 """
 
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+import csv
+import io
 import sys
 import os
 import re
@@ -25,10 +55,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.common_utils import (
     registrar_inicio, registrar_resumen,
-    nombre_mes, crear_directorio_salida
+    nombre_mes, crear_directorio_salida,
+    indexar_hojas, indice_hojas_cacheado, resolver_hoja, normalizar_nombre_hoja
+)
+from utils.drive_utils import (
+    inicializar_drive, obtener_archivos, abrir_archivo_excel, descargar_a_archivo, buscar_en_carpeta
+)
+from utils.excel_utils import listar_hojas_xlsx
+from utils.esquema_utils import convertir_fila, ESQUEMA_CACHE
+from utils.bloque_utils import BloqueFilas
+from utils.fragmento_utils import Fragmento
+from utils.cache_utils import (
+    leer_hoja_cacheada, guardar_hoja_cacheada, version_archivo,
+    podar_cache, CACHE_DIR, NOMBRE_CACHE_DRIVE
+)
+from utils.persistencia_utils import Persistencia
+from utils.estado_utils import Checkpoint
+from utils.almacen_utils import (
+    periodos_cargados, filas_periodo, anios_cargados, ALMACEN_PATH, NOMBRE_ALMACEN_DRIVE
 )
-from utils.drive_utils import inicializar_drive, obtener_archivos, descargar_archivo
-from utils.excel_utils import normalizar_texto
 from utils.gmail_utils import enviar_email_html_con_adjuntos, generar_html_resumen_anual
 
 
@@ -41,6 +86,11 @@ ANIO_ACTUAL = int(_anio_override)
 
 MESES = ["01", "02", "03", "04", "05", "06", "1° sac", "07", "08", "09", "10", "11","2° sac", "12"]
 
+
+# Origen de los datos: "unificados" (almacén / CSV mensuales, con fallback a libros) o "libros"
+FUENTE = os.getenv("REPORTE_FUENTE", "").strip().lower() or "unificados"
+CARPETA_UNIFICADOS_ID = os.getenv("REPORTE_CARPETA_UNIFICADOS_ID", "").strip()
+
 ENCABEZADOS = [
     "1-cuil", "2-dni", "3-tipo doc", "4-nombre y apellido", "5-cod liq",
     "6-sit revista", "7-estado del afil", "8-reparticion", "9-aporte personal",
@@ -57,6 +107,12 @@ FONT_HEADER  = Font(name="Arial", bold=True, color="FFFFFF", size=10)
 FONT_DATA    = Font(name="Arial", size=10)
 ALIGN_CENTER = Alignment(horizontal="center", vertical="center")
 ALIGN_LEFT   = Alignment(horizontal="left",   vertical="center")
+FMT_NUM      = '#,##0.00'
+
+# Estilos con nombre del libro write_only: cada celda sólo referencia el nombre
+ESTILO_HEADER = "anual_encabezado"
+ESTILO_TEXTO  = "anual_texto"
+ESTILO_NUMERO = "anual_numero"
 
 
 # ---------------------------------------------------------------------------
@@ -73,26 +129,36 @@ def extraer_codigo_desde_nombre(nombre_archivo):
         return "SIN_CODIGO"
 
 
-def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
+def extraer_datos_excel(fh, nombre_archivo, hoja_mes, file_id=None):
     """
     Extrae columnas A-X (+ codigo como col 25) desde fila 4 (fila 5 para archivos Caja).
     Se detiene en '-' o celda vacia en columna A.
-    Columnas D, F, H: elimina tildes. Cols I-X: formato numerico 2 decimales.
+    Las celdas se convierten con el esquema de utils.esquema_utils, igual que
+    en el unificador, así las filas coinciden con las del CSV unificado y la
+    caché de hojas sirve para los dos.
+    Devuelve un BloqueFilas, [] si la hoja no existe y None si hubo un error
+    (no se cachea).
     """
     try:
         codigo_archivo = extraer_codigo_desde_nombre(nombre_archivo)
 
+        # Verificar la hoja leyendo sólo workbook.xml (None: no es .xlsx)
+        hojas = listar_hojas_xlsx(fh)
+        if hojas is not None and not resolver_hoja(hoja_mes, indexar_hojas(hojas, file_id)):
+            return []
+
         fh.seek(0)
         wb = openpyxl.load_workbook(fh, data_only=True, read_only=True)
 
-        if hoja_mes not in wb.sheetnames:
+        hoja_real = resolver_hoja(hoja_mes, indexar_hojas(wb.sheetnames, file_id))
+        if not hoja_real:
             wb.close()
             return []
 
-        ws = wb[hoja_mes]
+        ws = wb[hoja_real]
         es_caja   = "caja" in nombre_archivo.lower()
         fila_inicio = 5 if es_caja else 4
-        datos = []
+        datos = BloqueFilas()
 
         for row in ws.iter_rows(min_row=fila_inicio, max_col=24, values_only=True):
             primera = row[0] if row else None
@@ -108,41 +174,9 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
             if all(c is None or str(c).strip() == "" for c in row):
                 break
 
-            fila_limpia = []
-            for col_idx, cell in enumerate(row, start=1):
-                if cell is None:
-                    fila_limpia.append("" if col_idx <= 8 else "0.00")
-                elif isinstance(cell, datetime):
-                    fila_limpia.append(cell.strftime("%Y-%m-%d"))
-                elif col_idx <= 8:
-                    # Columnas de texto
-                    if isinstance(cell, (int, float)):
-                        val = str(int(cell)) if isinstance(cell, float) and cell.is_integer() else str(cell)
-                    else:
-                        val = str(cell)
-                    # D(4), F(6), H(8): elimina tildes
-                    eliminar = col_idx in (4, 6, 8)
-                    fila_limpia.append(normalizar_texto(val, eliminar_tildes_param=eliminar))
-                else:
-                    # Columnas numericas I-X
-                    if isinstance(cell, (int, float)):
-                        fila_limpia.append(f"{float(cell):.2f}")
-                    else:
-                        s = str(cell).strip()
-                        if s in ("", "nan", "0"):
-                            fila_limpia.append("0.00")
-                        else:
-                            try:
-                                s = s.replace(',', '.')
-                                if s.count('.') > 1:
-                                    partes = s.split('.')
-                                    s = ''.join(partes[:-1]) + '.' + partes[-1]
-                                fila_limpia.append(f"{float(s):.2f}")
-                            except ValueError:
-                                fila_limpia.append("0.00")
-
-            if any(c != "" and c != "0.00" for c in fila_limpia):
-                datos.append(fila_limpia + [codigo_archivo])
+            # Misma conversión que el unificador (esquema compilado A-X)
+            valores = convertir_fila(row)
+            datos.agregar(valores[:8], valores[8:], codigo_archivo)
 
         wb.close()
         print(f" ✔ {nombre_archivo} [{hoja_mes}]: {len(datos)} filas")
@@ -151,7 +185,127 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
     except Exception as e:
         print(f"✘ Error extrayendo {nombre_archivo}: {e}")
         traceback.print_exc()
-        return []
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Fuentes de datos por mes
+# ---------------------------------------------------------------------------
+
+def nombre_csv_unificado(mes, anio):
+    """Nombre del CSV que genera el unificador mensual para el período."""
+    return f"Unificado_{nombre_mes(mes)}{anio}.csv"
+
+
+def filas_csv_unificado(fh):
+    """Genera las filas (sin encabezado) del CSV unificado descargado en fh."""
+    with io.TextIOWrapper(fh, encoding="utf-8", newline="") as texto:
+        lector = csv.reader(texto, delimiter="|")
+        next(lector, None)  # encabezado
+        for fila in lector:
+            if fila:
+                yield fila
+
+
+def leer_unificado_drive(drive, mes, anio):
+    """
+    Busca Unificado_<Mes><Año>.csv en CARPETA_UNIFICADOS_ID y lo descarga.
+    Devuelve un iterador de sus filas (sin encabezado), que se leen de la
+    descarga a medida que se escribe la hoja, o None si no está.
+    """
+    if not CARPETA_UNIFICADOS_ID:
+        return None
+    nombre = nombre_csv_unificado(mes, anio)
+    try:
+        encontrado = buscar_en_carpeta(drive, CARPETA_UNIFICADOS_ID, nombre)
+        if not encontrado:
+            return None
+        fh = descargar_a_archivo(drive.files().get_media(fileId=encontrado["id"]), nombre)
+    except Exception as e:
+        print(f"⚠ No se pudo leer {nombre} desde Drive: {e}")
+        return None
+    return filas_csv_unificado(fh)
+
+
+def extraer_mes_desde_libros(drive, archivos, mes, checkpoint=None, conteo=None):
+    """
+    Extrae el mes de los libros de cada repartición y genera sus filas libro
+    por libro; al terminar, conteo["archivos"] tiene los libros que
+    aportaron filas. Usa la caché de hojas, con las mismas entradas
+    (Fragmento) que el unificador mensual: un libro ya unificado no se
+    vuelve a abrir. Con checkpoint, cada libro terminado queda guardado y al
+    reanudar no se vuelve a abrir; una muestra de esos libros se vuelve a
+    extraer en frío para compararla con lo guardado.
+    """
+    paso = f"libros {mes}"
+    conteo = {} if conteo is None else conteo
+    conteo["archivos"] = 0
+    desde_checkpoint = []  # IDs cuyas filas salieron del checkpoint (muestra en frío)
+    for archivo in archivos:
+        version = version_archivo(archivo)
+        fragmento = None
+        if checkpoint is not None:
+            previo = checkpoint.resumen(paso, archivo["id"], version)
+            if previo is not None and previo.get("omitido"):
+                continue
+            if previo is not None:
+                fragmento = checkpoint.resultado(paso, archivo["id"], version)
+                if fragmento is not None:
+                    desde_checkpoint.append(archivo["id"])
+        if fragmento is None:
+            # Hoja ya extraída en otra corrida (de este bot o del unificador) para esta versión
+            fragmento = leer_hoja_cacheada(archivo, mes, ESQUEMA_CACHE)
+            if fragmento is not None and not isinstance(fragmento, (Fragmento, list)):
+                fragmento = None
+            if fragmento is None:
+                # Un libro ya abierto en otro mes que no tiene esta hoja no se vuelve a abrir
+                indice = indice_hojas_cacheado(archivo["id"])
+                if indice is not None and not resolver_hoja(mes, indice):
+                    if checkpoint is not None:
+                        checkpoint.guardar(paso, archivo["id"], version, None, {"omitido": 1})
+                    continue
+                fh = abrir_archivo_excel(drive, archivo)
+                if not fh:
+                    continue
+                bloque = extraer_datos_excel(fh, archivo["name"], mes, archivo["id"])
+                if bloque is not None:
+                    fragmento = Fragmento(bloque) if bloque else []
+                    guardar_hoja_cacheada(archivo, mes, fragmento, ESQUEMA_CACHE)
+            if fragmento is not None and checkpoint is not None:
+                checkpoint.guardar(paso, archivo["id"], version, fragmento, {"registros": len(fragmento)})
+        if fragmento:
+            conteo["archivos"] += 1
+            yield from fragmento.bloque.filas()
+
+    if desde_checkpoint:
+        por_id = {archivo["id"]: archivo for archivo in archivos}
+
+        def reextraer(archivo_id):
+            archivo = por_id[archivo_id]
+            fh = abrir_archivo_excel(drive, archivo)
+            if not fh:
+                return None
+            bloque = extraer_datos_excel(fh, archivo["name"], mes, archivo["id"])
+            return None if bloque is None else {"registros": len(bloque)}
+
+        checkpoint.verificar_muestra(paso, desde_checkpoint, reextraer)
+
+
+def obtener_datos_mes(drive, archivos, mes, cargados, checkpoint=None, conteo=None):
+    """
+    Devuelve (filas, fuente) del mes según FUENTE. Las filas son un
+    iterador: se leen (o extraen) a medida que se escribe la hoja. Con la
+    fuente libros, conteo["archivos"] queda con los libros que aportaron
+    filas. `cargados` son los períodos del año presentes en el almacén.
+    """
+    if FUENTE == "unificados":
+        if normalizar_nombre_hoja(mes) in cargados:
+            return filas_periodo(ANIO_ACTUAL, mes), "almacén"
+        filas = leer_unificado_drive(drive, mes, ANIO_ACTUAL)
+        if filas is not None:
+            return filas, "csv unificado"
+        print(f"   ℹ️ Sin unificado para {nombre_mes(mes)}/{ANIO_ACTUAL}: se extrae de los libros")
+    return extraer_mes_desde_libros(drive, archivos, mes, checkpoint, conteo), "libros"
 
 
 # ---------------------------------------------------------------------------
@@ -167,58 +321,109 @@ ANCHOS_COL = [
 ]
 
 
+def registrar_estilos(wb):
+    """Registra en el libro los estilos con nombre de encabezado, texto y número."""
+    wb.add_named_style(NamedStyle(name=ESTILO_HEADER, font=FONT_HEADER,
+                                  fill=FILL_HEADER, alignment=ALIGN_CENTER))
+    wb.add_named_style(NamedStyle(name=ESTILO_TEXTO, font=FONT_DATA, alignment=ALIGN_LEFT))
+    wb.add_named_style(NamedStyle(name=ESTILO_NUMERO, font=FONT_DATA,
+                                  alignment=ALIGN_CENTER, number_format=FMT_NUM))
+
+
+def _celda(ws, valor, estilo):
+    c = WriteOnlyCell(ws, value=valor)
+    c.style = estilo
+    return c
+
+
 def aplicar_encabezados(ws):
-    ws.append(ENCABEZADOS)
-    for i, cell in enumerate(ws[1], start=1):
-        cell.font      = FONT_HEADER
-        cell.fill      = FILL_HEADER
-        cell.alignment = ALIGN_CENTER
-        letra = cell.column_letter
-        ws.column_dimensions[letra].width = ANCHOS_COL[i - 1] if i <= len(ANCHOS_COL) else 14
+    """
+    Anchos, alto de la fila 1, panel fijo y encabezados. En write_only todo
+    lo que va antes de las filas debe definirse antes del primer append.
+    """
+    for i in range(1, len(ENCABEZADOS) + 1):
+        ws.column_dimensions[get_column_letter(i)].width = ANCHOS_COL[i - 1] if i <= len(ANCHOS_COL) else 14
     ws.row_dimensions[1].height = 18
+    ws.freeze_panes = "A2"
+    ws.append([_celda(ws, titulo, ESTILO_HEADER) for titulo in ENCABEZADOS])
 
 
-def agregar_filas_excel(ws, filas):
-    fmt_num = '#,##0.00'
-    for fila in filas:
-        ws.append(fila)
-
-    for row in ws.iter_rows(min_row=2):
-        for i, cell in enumerate(row, start=1):
-            cell.font = FONT_DATA
-            if i <= 8 or i == 25:
-                cell.alignment = ALIGN_LEFT
-            else:
-                cell.number_format = fmt_num
-                cell.alignment     = ALIGN_CENTER
-                # Convertir string numerico a float para que Excel lo trate como numero
-                if cell.value and isinstance(cell.value, str):
+def agregar_filas_excel(ws, filas, conteo):
+    """
+    Escribe las filas en una sola pasada: columnas A-H y Y como texto, el
+    resto convertido a float (para que Excel lo trate como número).
+    Retorna (registros, códigos distintos de la columna Y). También si la
+    escritura falla a mitad deja en conteo["registros"] y conteo["codigos"]
+    (set) las filas ya tomadas de `filas`, incluida la que estaba
+    escribiéndose: contar_filas sobre el resto completa el total.
+    """
+    registros = 0
+    codigos = set()
+    try:
+        for fila in filas:
+            registros += 1
+            if len(fila) > 24:
+                codigos.add(fila[24])
+            celdas = []
+            for i, valor in enumerate(fila, start=1):
+                if i <= 8 or i == 25:
+                    celdas.append(_celda(ws, valor, ESTILO_TEXTO))
+                    continue
+                if valor and isinstance(valor, str):
                     try:
-                        cell.value = float(cell.value)
+                        valor = float(valor)
                     except ValueError:
                         pass
+                celdas.append(_celda(ws, valor, ESTILO_NUMERO))
+            ws.append(celdas)
+    finally:
+        conteo["registros"] = registros
+        conteo["codigos"] = codigos
+    return registros, len(codigos)
 
 
-def generar_excel_anual(datos_por_mes, anio):
+def contar_filas(filas, registros=0, codigos=None):
     """
-    Crea el workbook con una hoja por mes.
-    datos_por_mes: dict { "01": [...filas...], ... }
-    Retorna ruta del archivo o None.
+    (registros, códigos distintos de la columna Y) de las filas, sin
+    escribirlas, sumados a los ya contados (registros y set de códigos).
     """
-    try:
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
-
-        for mes in MESES:
-            nombre_hoja = nombre_mes(mes)
-            ws = wb.create_sheet(title=nombre_hoja)
-            aplicar_encabezados(ws)
-            filas = datos_por_mes.get(mes, [])
-            agregar_filas_excel(ws, filas)
-            ws.freeze_panes = "A2"
-            ws.auto_filter.ref = f"A1:Y1"
-            print(f" Hoja '{nombre_hoja}': {len(filas)} registros")
+    codigos = set() if codigos is None else codigos
+    for fila in filas:
+        registros += 1
+        if len(fila) > 24:
+            codigos.add(fila[24])
+    return registros, len(codigos)
+
+
+def abrir_excel_anual():
+    """
+    Crea el workbook (write_only) al que se le agrega una hoja por mes a
+    medida que se obtienen los datos: cada hoja se vuelca a disco al
+    escribirse y en memoria sólo queda el mes en curso.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    registrar_estilos(wb)
+    return wb
+
+
+def agregar_hoja_mes(wb, mes, filas, conteo=None):
+    """
+    Agrega la hoja del mes con sus filas (un iterable, que se consume).
+    Retorna (registros, códigos distintos de la columna Y); si falla, en
+    conteo queda lo que se llegó a tomar (ver agregar_filas_excel).
+    """
+    nombre_hoja = nombre_mes(mes)
+    ws = wb.create_sheet(title=nombre_hoja)
+    aplicar_encabezados(ws)
+    registros, codigos = agregar_filas_excel(ws, filas, {} if conteo is None else conteo)
+    ws.auto_filter.ref = f"A1:Y1"
+    print(f" Hoja '{nombre_hoja}': {registros} registros")
+    return registros, codigos
+
 
+def guardar_excel_anual(wb, anio):
+    """Guarda el workbook anual. Retorna ruta del archivo o None."""
+    try:
         carpeta = crear_directorio_salida()
         nombre_archivo = f"Unificado_Anual_{anio}.xlsx"
         ruta = os.path.join(carpeta, nombre_archivo)
@@ -249,12 +454,33 @@ def ejecutar_principal():
     if not archivos:
         print("✘ No se encontraron archivos.")
         return
+    # La caché de hojas se guarda en Drive: fuera lo de archivos que ya no están
+    podar_cache({archivo["id"] for archivo in archivos})
 
     print(f" Año a procesar: {ANIO_ACTUAL}")
     print(f" Meses: {', '.join(MESES)}")
+    print(f" Fuente: {FUENTE}")
     print(f" Extrae columnas A-X + codigo, igual que el unificador mensual\n")
 
-    datos_por_mes  = {mes: [] for mes in MESES}
+    cargados = {}
+    if FUENTE == "unificados":
+        cargados = periodos_cargados(ANIO_ACTUAL)
+        if cargados:
+            print(f" 🗄️ Períodos en el almacén: {', '.join(sorted(cargados))}")
+        elif not os.path.exists(ALMACEN_PATH):
+            print(f" ⚠️ Almacén vacío: no hay {ALMACEN_PATH} (¿PERSISTENCIA_CARPETA_ID?). "
+                  f"Los meses salen del CSV unificado o de los libros")
+        else:
+            anios = anios_cargados()
+            print(f" ⚠️ El almacén no tiene períodos de {ANIO_ACTUAL} "
+                  f"(años cargados: {', '.join(map(str, anios)) or 'ninguno'}). "
+                  f"Los meses salen del CSV unificado o de los libros")
+
+    # Checkpoint por libro (y conteos por mes) en estado/reporte_anual; --resume retoma una corrida cortada
+    checkpoint = Checkpoint("reporte_anual", f"{ANIO_ACTUAL}|{FUENTE}|{ESQUEMA_CACHE}")
+
+    # El Excel se arma mes a mes: cada hoja se escribe apenas están sus filas
+    wb = abrir_excel_anual()
     resumen_por_mes = {}
 
     for mes in MESES:
@@ -263,30 +489,51 @@ def ejecutar_principal():
         print(f" Procesando mes: {nombre_legible} ({mes}/{ANIO_ACTUAL})")
         print(f"{'='*60}")
 
-        filas_mes = []
-        archivos_con_datos = 0
-
-        for archivo in archivos:
-            fh = descargar_archivo(drive, archivo)
-            if not fh:
-                continue
-            filas = extraer_datos_excel(fh, archivo["name"], mes)
-            if filas:
-                filas_mes.extend(filas)
-                archivos_con_datos += 1
+        # El mes se rearma siempre (la hoja hay que escribirla igual); de los
+        # libros ya extraídos se encarga el checkpoint por libro. Las filas
+        # van directo de la fuente a la hoja: del mes sólo quedan los conteos
+        conteo = {}
+        filas_mes, fuente = obtener_datos_mes(drive, archivos, mes, cargados, checkpoint, conteo)
+        registros = None
+        tomadas = {}
+        if wb is not None:
+            try:
+                registros, codigos = agregar_hoja_mes(wb, mes, filas_mes, tomadas)
+            except Exception as e:
+                print(f"✘ Error generando Excel anual: {e}")
+                traceback.print_exc()
+                wb = None
+        if registros is None:
+            # Sin Excel las filas igual se cuentan para el resumen: a las que
+            # la hoja tomó antes de fallar se suma el resto del iterador
+            registros, codigos = contar_filas(filas_mes, tomadas.get("registros", 0), tomadas.get("codigos"))
+        archivos_con_datos = conteo.get("archivos", codigos)
+        filas_mes = None
+
+        # Los conteos se anotan sólo si la hoja quedó escrita entera
+        if wb is not None and checkpoint.resumen("meses", mes, FUENTE) is None:
+            checkpoint.guardar("meses", mes, FUENTE, None,
+                               {"registros": registros, "archivos": archivos_con_datos})
 
-        datos_por_mes[mes] = filas_mes
         resumen_por_mes[mes] = {
             "nombre":    nombre_legible,
-            "registros": len(filas_mes),
+            "registros": registros,
             "archivos":  archivos_con_datos,
         }
-        print(f"   → {len(filas_mes)} registros en {archivos_con_datos} reparticion(es)")
+        print(f"   → {registros} registros en {archivos_con_datos} reparticion(es) [{fuente}]")
 
-    # Genera Excel
+    # Corrida reanudada: los meses rearmados tienen que dar los conteos
+    # anotados antes del corte (el estado está entero y se usó todo)
+    if checkpoint.reanudado:
+        checkpoint.verificar("meses", MESES, {
+            "registros": sum(r["registros"] for r in resumen_por_mes.values()),
+            "archivos": sum(r["archivos"] for r in resumen_por_mes.values()),
+        })
+
+    # Guarda el Excel
     print(f"\n{'='*60}")
-    print("Generando archivo Excel anual...")
-    ruta_excel = generar_excel_anual(datos_por_mes, ANIO_ACTUAL)
+    print("Guardando archivo Excel anual...")
+    ruta_excel = guardar_excel_anual(wb, ANIO_ACTUAL) if wb is not None else None
 
     # Email
     if ruta_excel:
@@ -298,6 +545,8 @@ def ejecutar_principal():
         )
         asunto = f"🟢🔵 OSER - UNIFICADO ANUAL | AÑO: {ANIO_ACTUAL}"
         enviar_email_html_con_adjuntos(asunto, html, [ruta_excel], "SMTP_TO_UNIFICADOR")
+        # Corrida completa: el estado para reanudar ya no hace falta
+        checkpoint.finalizar()
     else:
         print("⚠ No se genero el Excel, email no enviado.")
 
@@ -317,4 +566,13 @@ def ejecutar_principal():
 
 
 if __name__ == "__main__":
-    ejecutar_principal()
\ No newline at end of file
+    # La caché de hojas y el almacén viven en Drive entre corridas (ver
+    # utils.persistencia_utils); el almacén sólo lo escribe el unificador
+    persistencia = Persistencia()
+    persistencia.restaurar_directorio(NOMBRE_CACHE_DRIVE, CACHE_DIR)
+    if FUENTE == "unificados":
+        persistencia.restaurar_archivo(NOMBRE_ALMACEN_DRIVE, ALMACEN_PATH)
+    try:
+        ejecutar_principal()
+    finally:
+        persistencia.guardar_directorio(NOMBRE_CACHE_DRIVE, CACHE_DIR)
\ No newline at end of file
@@ -1,34 +1,50 @@
 """
 Bot de construcción de Snapshots para Monitoreo de Liquidaciones
 
-Descarga cada .xlsx de la carpeta de reparticiones y lo sube como
-Google Sheets en la carpeta de snapshots. Los SNAPs ya existentes
-se saltean automáticamente.
+Convierte cada .xlsx de la carpeta de reparticiones a Google Sheets
+en la carpeta de snapshots. Los SNAPs ya existentes se saltean
+automáticamente.
+
+La conversión se intenta primero con files().copy en el servidor (los
+bytes no pasan por el runner); si Drive la rechaza se descarga el
+archivo y se sube convertido. Los archivos se procesan en paralelo con
+un limitador de tasa compartido en lugar de pausas fijas.
+
+Modos (SNAPSHOT_MODO):
+  faltantes  → sólo crea los SNAPs que no existen (por defecto)
+  refrescar  → además reconstruye los SNAPs cuyo origen cambió después
+               de crearse el SNAP (md5 guardado en appProperties o, si no
+               está, modifiedTime del origen contra createdTime del SNAP)
+SNAPSHOT_DRY_RUN=1 muestra el plan de trabajo sin tocar Drive.
 
 ======= EJECUCIÓN =======
 Correr manualmente desde GitHub Actions → workflow_dispatch
 O bien: python src/snapshot_bot.py
 """
 
+import concurrent.futures
 import io
 import json
 import os
 import sys
+import threading
 import time
 import traceback
+import uuid
 
 # Forzar flush de prints para ver logs en tiempo real en GitHub Actions
 sys.stdout.reconfigure(line_buffering=True)
 
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseUpload
 from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.common_utils import registrar_inicio, registrar_resumen
+from utils.common_utils import registrar_inicio, registrar_resumen, LimitadorTasa
+from utils.drive_utils import descargar_a_archivo, ESTADOS_REINTENTABLES
 
 # ---------------------------------------------------------------------------
 # Configuración
@@ -38,10 +54,28 @@ CARPETA_XLSX_ID    = "1_Xb2jrtr3Sjwi8-2nhT2k53KZ6CLE5hJ"   # Reparticiones
 CARPETA_INTERNA_ID = "1XJj3pMySybGeK7cW5-PRFPf1q5w2Dch5"   # Carpeta interna OSER
 SNAP_FOLDER_NAME   = "_snapshots_liquidaciones"
 SNAP_PREFIX        = "[SNAP] "
+MIME_GSHEET        = "application/vnd.google-apps.spreadsheet"
+MIME_XLSX          = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 INTENTOS_MAX       = 3
 ESPERA_REINTENTO   = 6   # segundos entre reintentos de subida
-PAUSA_ENTRE_ARCH   = 2   # segundos entre archivos (evita rate limit)
+
+# Subidas: multipart (una sola request) hasta el umbral; por encima,
+# resumable en chunks reanudando la misma sesión ante errores.
+UMBRAL_RESUMABLE   = int(float(os.getenv("SNAPSHOT_UMBRAL_RESUMABLE_MB", "").strip() or 5) * 1024 * 1024)
+CHUNK_SUBIDA       = 8 * 1024 * 1024   # múltiplo de 256 KB
+
+# Paralelismo: cada hilo usa su propio cliente de Drive (httplib2 no es
+# thread-safe) y todos comparten el limitador de llamadas a la API.
+MAXIMO_HILOS       = max(1, int(os.getenv("SNAPSHOT_HILOS", "").strip() or 4))
+TASA_API           = float(os.getenv("SNAPSHOT_TASA", "").strip() or 3)   # llamadas/seg
+COPIA_SERVIDOR     = os.getenv("SNAPSHOT_COPIA_SERVIDOR", "1").strip().lower() not in ("0", "false", "no")
+
+MODO               = os.getenv("SNAPSHOT_MODO", "").strip().lower() or "faltantes"
+DRY_RUN            = os.getenv("SNAPSHOT_DRY_RUN", "").strip() == "1"
+
+limitador = LimitadorTasa(TASA_API, rafaga=MAXIMO_HILOS)
+_drive_hilo = threading.local()
 
 # Modo producción: procesar TODOS los archivos
 MODO_PRUEBA          = False
@@ -74,6 +108,38 @@ def inicializar_drive_con_scopes():
         return None
 
 
+def obtener_drive_hilo():
+    """Devuelve el servicio de Drive del hilo actual, creándolo si no existe."""
+    drive = getattr(_drive_hilo, "drive", None)
+    if drive is None:
+        drive = inicializar_drive_con_scopes()
+        _drive_hilo.drive = drive
+    return drive
+
+
+def esperar_por_error(e, intento, tag=""):
+    """
+    Decide si un error amerita reintento: los mismos que reintentan las
+    descargas (HttpError 429/5xx y cortes de red, OSError) más el 403 de
+    rate limit de Drive. En rate limit frena a todos los hilos a través del
+    limitador. Devuelve True si hay que reintentar.
+    """
+    status = e.resp.status if isinstance(e, HttpError) else None
+    if isinstance(e, HttpError):
+        if status != 403 and status not in ESTADOS_REINTENTABLES:
+            return False
+    elif not isinstance(e, OSError):
+        return False
+    if intento >= INTENTOS_MAX - 1:
+        return False
+    espera = ESPERA_REINTENTO * (intento + 1)
+    if status in (403, 429):
+        limitador.penalizar(espera)
+    print(f"{tag}   ⏳ Reintento {intento+1}/{INTENTOS_MAX} en {espera}s...", flush=True)
+    time.sleep(espera)
+    return True
+
+
 def listar_archivos(drive, carpeta_id, solo_xlsx=True):
     """Lista todos los archivos de una carpeta de Drive con paginación."""
     mime_xlsx = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -90,7 +156,10 @@ def listar_archivos(drive, carpeta_id, solo_xlsx=True):
         res = drive.files().list(
             q=q,
             pageSize=200,
-            fields="nextPageToken, files(id, name, mimeType)",
+            fields=(
+                "nextPageToken, files(id, name, mimeType, createdTime, "
+                "modifiedTime, md5Checksum, appProperties)"
+            ),
             supportsAllDrives=True,
             includeItemsFromAllDrives=True,
             pageToken=page_token,
@@ -136,78 +205,235 @@ def obtener_o_crear_carpeta_snaps(drive):
 
 
 def listar_snaps_existentes(drive, snap_folder_id):
-    """Devuelve un set con los nombres de SNAPs ya creados."""
+    """Devuelve un dict {nombre: metadatos} con los SNAPs ya creados."""
     archivos = listar_archivos(drive, snap_folder_id, solo_xlsx=False)
-    return {a["name"] for a in archivos}
+    return {a["name"]: a for a in archivos}
+
+
+def propiedades_origen(archivo):
+    """appProperties que se graban en el SNAP para detectar cambios del origen."""
+    props = {"origen_id": archivo["id"]}
+    if archivo.get("md5Checksum"):
+        props["origen_md5"] = archivo["md5Checksum"]
+    if archivo.get("modifiedTime"):
+        props["origen_modificado"] = archivo["modifiedTime"]
+    return props
+
+
+def motivo_refresco(archivo, snap):
+    """
+    Devuelve el motivo por el que el SNAP quedó desactualizado respecto de
+    su origen, o None si está al día.
+    """
+    props = snap.get("appProperties") or {}
+    md5_origen = archivo.get("md5Checksum")
+    if md5_origen and props.get("origen_md5"):
+        if props["origen_md5"] != md5_origen:
+            return "md5 distinto"
+        return None
+    # Sin md5 (SNAPs viejos u origen nativo de Sheets): comparar fechas.
+    # Los timestamps RFC 3339 de Drive están en UTC y se comparan como texto.
+    modificado = archivo.get("modifiedTime") or ""
+    creado_snap = snap.get("createdTime") or ""
+    if modificado and creado_snap and modificado > creado_snap:
+        return f"origen modificado {modificado[:19]} > SNAP {creado_snap[:19]}"
+    return None
 
 
-def descargar_bytes(drive, file_id, mime_type):
-    """Descarga un archivo de Drive y devuelve su contenido como BytesIO."""
+def descargar_bytes(drive, file_id, mime_type, tag=""):
+    """
+    Descarga un archivo de Drive con reanudación por Range y devuelve un
+    archivo temporal (en memoria o en disco según el tamaño).
+    """
     try:
-        if mime_type == "application/vnd.google-apps.spreadsheet":
-            req = drive.files().export_media(
-                fileId=file_id,
-                mimeType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+        if mime_type == MIME_GSHEET:
+            req = drive.files().export_media(fileId=file_id, mimeType=MIME_XLSX)
         else:
             req = drive.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, req)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        fh.seek(0)
-        return fh
+        return descargar_a_archivo(req, file_id, limitador=limitador)
     except Exception as e:
-        print(f"   ❌ Error descargando: {e}", flush=True)
+        print(f"{tag}   ❌ Error descargando: {e}", flush=True)
         return None
 
 
-def subir_como_gsheet(drive, fh, nombre_snap, snap_folder_id):
-    """Sube un archivo .xlsx como Google Sheets usando enfoque de dos pasos."""
-    fh.seek(0)
+def copiar_como_gsheet(drive, archivo, nombre_snap, snap_folder_id, tag=""):
+    """
+    Crea el SNAP con una sola copia en el servidor, pidiendo a Drive que
+    convierta a Google Sheets. Devuelve el ID o None si Drive no la acepta
+    (el llamador cae a descarga + subida). Como en la subida, la copia lleva
+    la marca snap_intento: antes de reintentar se borra la que haya quedado
+    creada aunque la respuesta no llegó.
+    """
+    token = uuid.uuid4().hex
     for intento in range(INTENTOS_MAX):
+        limitador.esperar()
         try:
-            file_metadata = {
-                "name": nombre_snap,
-                "mimeType": "application/vnd.google-apps.spreadsheet",
-                "parents": [snap_folder_id]
-            }
-            print(f"   📄 Creando archivo vacío...", flush=True)
-            file = drive.files().create(
-                body=file_metadata,
+            copia = drive.files().copy(
+                fileId=archivo["id"],
+                body={
+                    "name": nombre_snap,
+                    "mimeType": MIME_GSHEET,
+                    "parents": [snap_folder_id],
+                    "appProperties": dict(propiedades_origen(archivo), snap_intento=token),
+                },
                 fields="id",
-                supportsAllDrives=True
+                supportsAllDrives=True,
             ).execute()
-            file_id = file.get("id")
-            print(f"   📄 Archivo creado (ID: {file_id})", flush=True)
-            fh.seek(0)
-            media = MediaIoBaseUpload(
-                fh,
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                resumable=True
-            )
-            print(f"   ⬆️  Subiendo contenido...", flush=True)
-            updated_file = drive.files().update(
-                fileId=file_id,
-                media_body=media,
-                fields="id",
-                supportsAllDrives=True
-            ).execute()
-            print(f"   ✅ Contenido subido", flush=True)
-            return updated_file.get("id")
+            return copia.get("id")
         except HttpError as e:
-            print(f"   ❌ Error {e.resp.status}: {e._get_reason()}", flush=True)
-            if e.resp.status in (403, 429, 500, 503):
-                espera = ESPERA_REINTENTO * (intento + 1)
-                print(f"   ⏳ Reintento {intento+1}/{INTENTOS_MAX} en {espera}s...", flush=True)
-                time.sleep(espera)
+            print(f"{tag}   ⚠️  Copia en servidor rechazada ({e.resp.status}): {e._get_reason()}", flush=True)
+            if e.resp.status not in ESTADOS_REINTENTABLES:
+                return None  # rechazo definitivo: Drive no creó nada
+            if not esperar_por_error(e, intento, tag):
+                break
+        except OSError as e:
+            print(f"{tag}   ⚠️  Error de red en la copia en servidor: {e}", flush=True)
+            if not esperar_por_error(e, intento, tag):
+                break
+        limpiar_intentos(drive, snap_folder_id, token, tag)
+    limpiar_intentos(drive, snap_folder_id, token, tag)
+    return None
+
+
+def limpiar_intentos(drive, snap_folder_id, token, tag=""):
+    """
+    Borra los archivos que haya dejado un intento de copia o subida fallido
+    (p. ej. creados en el servidor aunque la respuesta no llegó). Se
+    identifican por la marca snap_intento en appProperties, así nunca se
+    toca un SNAP con el mismo nombre.
+    """
+    q = (
+        f"'{snap_folder_id}' in parents and trashed=false and "
+        f"appProperties has {{ key='snap_intento' and value='{token}' }}"
+    )
+    try:
+        limitador.esperar()
+        res = drive.files().list(
+            q=q, fields="files(id)",
+            supportsAllDrives=True, includeItemsFromAllDrives=True,
+        ).execute()
+        for f in res.get("files", []):
+            limitador.esperar()
+            drive.files().delete(fileId=f["id"], supportsAllDrives=True).execute()
+            print(f"{tag}   🗑️  Eliminado archivo huérfano ({f['id']})", flush=True)
+    except HttpError as e:
+        print(f"{tag}   ⚠️  No se pudieron limpiar intentos fallidos: {e._get_reason()}", flush=True)
+
+
+def subir_como_gsheet(drive, fh, nombre_snap, snap_folder_id, tag="", app_properties=None):
+    """
+    Sube un .xlsx convirtiéndolo a Google Sheets con un único files().create.
+
+    Hasta UMBRAL_RESUMABLE se usa upload multipart (metadatos + contenido en
+    una request). Por encima, upload resumable: ante un error se vuelve a
+    llamar next_chunk() sobre la misma request, que consulta al servidor
+    cuántos bytes recibió y continúa desde ahí en la misma sesión.
+    """
+    token = uuid.uuid4().hex
+    file_metadata = {
+        "name": nombre_snap,
+        "mimeType": MIME_GSHEET,
+        "parents": [snap_folder_id],
+        "appProperties": dict(app_properties or {}, snap_intento=token),
+    }
+    tamanio = fh.seek(0, io.SEEK_END)
+    fh.seek(0)
+    resumable = tamanio > UMBRAL_RESUMABLE
+    media = MediaIoBaseUpload(fh, mimetype=MIME_XLSX, resumable=resumable,
+                              chunksize=CHUNK_SUBIDA if resumable else -1)
+    print(f"{tag}   ⬆️  Subida {'resumable' if resumable else 'multipart'} "
+          f"({tamanio / 1024:.1f} KB)...", flush=True)
+
+    request = None
+    for intento in range(INTENTOS_MAX):
+        try:
+            if request is None:
+                request = drive.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields="id",
+                    supportsAllDrives=True
+                )
+            if resumable:
+                respuesta = None
+                while respuesta is None:
+                    limitador.esperar()
+                    estado, respuesta = request.next_chunk()
+                    if estado and respuesta is None:
+                        print(f"{tag}   ⬆️  {estado.progress() * 100:.0f}%", flush=True)
             else:
-                print(f"   📝 Detalle: {e.content}", flush=True)
-                return None
+                limitador.esperar()
+                respuesta = request.execute()
+            print(f"{tag}   ✅ Contenido subido", flush=True)
+            return respuesta.get("id")
+        except (HttpError, OSError) as e:
+            if isinstance(e, HttpError):
+                print(f"{tag}   ❌ Error {e.resp.status}: {e._get_reason()}", flush=True)
+            else:
+                print(f"{tag}   ❌ Error de red: {e}", flush=True)
+            if not esperar_por_error(e, intento, tag):
+                if isinstance(e, HttpError):
+                    print(f"{tag}   📝 Detalle: {e.content}", flush=True)
+                break
+            if not resumable:
+                # Multipart no se reanuda: descartar lo que haya quedado y reintentar entero
+                limpiar_intentos(drive, snap_folder_id, token, tag)
+                request = None
+    limpiar_intentos(drive, snap_folder_id, token, tag)
     return None
 
 
+def eliminar_snap_anterior(drive, snap_id, tag=""):
+    """Borra el SNAP reemplazado una vez creado el nuevo."""
+    limitador.esperar()
+    try:
+        drive.files().delete(fileId=snap_id, supportsAllDrives=True).execute()
+        print(f"{tag}   🗑️  SNAP anterior eliminado ({snap_id})", flush=True)
+    except HttpError as e:
+        print(f"{tag}   ⚠️  No se pudo eliminar el SNAP anterior {snap_id}: {e._get_reason()}", flush=True)
+
+
+def procesar_archivo(archivo, nombre_snap, snap_folder_id, tag="", snap_anterior_id=None):
+    """
+    Construye el SNAP de un archivo en el hilo actual. Si reemplaza a uno
+    existente, el anterior se borra recién cuando el nuevo quedó creado.
+    Devuelve (snap_id, metodo) con metodo "copia" o "subida"; snap_id None si falló.
+    """
+    drive = obtener_drive_hilo()
+    if not drive:
+        return None, None
+
+    snap_id, metodo = construir_snap(drive, archivo, nombre_snap, snap_folder_id, tag)
+    if snap_id and snap_anterior_id:
+        eliminar_snap_anterior(drive, snap_anterior_id, tag)
+    return snap_id, metodo
+
+
+def construir_snap(drive, archivo, nombre_snap, snap_folder_id, tag=""):
+    """Crea el SNAP por copia en el servidor o, si no se puede, por descarga + subida."""
+    if COPIA_SERVIDOR:
+        print(f"{tag}   🔁 Convirtiendo en el servidor...", flush=True)
+        snap_id = copiar_como_gsheet(drive, archivo, nombre_snap, snap_folder_id, tag)
+        if snap_id:
+            return snap_id, "copia"
+
+    print(f"{tag}   ⬇️  Descargando...", flush=True)
+    fh = descargar_bytes(drive, archivo["id"], archivo["mimeType"], tag)
+    if not fh:
+        print(f"{tag}   ❌ No se pudo descargar.", flush=True)
+        return None, None
+    with fh:
+        tamanio_kb = fh.seek(0, io.SEEK_END) / 1024
+        print(f"{tag}   ✅ Descargado ({tamanio_kb:.1f} KB)", flush=True)
+
+        print(f"{tag}   ⬆️  Subiendo como Google Sheets...", flush=True)
+        snap_id = subir_como_gsheet(drive, fh, nombre_snap, snap_folder_id, tag,
+                                    app_properties=propiedades_origen(archivo))
+    if not snap_id:
+        print(f"{tag}   ❌ Falló la subida tras {INTENTOS_MAX} intentos.", flush=True)
+    return snap_id, "subida"
+
+
 # ---------------------------------------------------------------------------
 # Principal
 # ---------------------------------------------------------------------------
@@ -218,7 +444,7 @@ def ejecutar_principal():
     ahora = registrar_inicio("BOT SNAPSHOT BUILDER - Monitoreo de Liquidaciones")
     
     print("🔑 Inicializando Drive con OAuth...", flush=True)
-    drive = inicializar_drive_con_scopes()
+    drive = obtener_drive_hilo()
     if not drive:
         print("❌ No se pudo inicializar Drive", flush=True)
         return
@@ -243,47 +469,69 @@ def ejecutar_principal():
     print()
     
     procesados, saltados, errores = 0, 0, 0
+    por_copia, refrescados = 0, 0
     lista_errores = []
     
+    # Armar el plan antes de repartir el trabajo:
+    # SNAPs faltantes y, en modo refrescar, los desactualizados
+    pendientes = []
     for i, archivo in enumerate(archivos, 1):
+        tag = f"[{i}/{len(archivos)}]"
         nombre_base = archivo["name"].replace(".xlsx", "").replace(".XLSX", "")
         nombre_snap = f"{SNAP_PREFIX}{nombre_base}"
-        print(f"[{i}/{len(archivos)}] {archivo['name']}", flush=True)
-        
-        if nombre_snap in snaps_existentes:
-            print(f"   ⏭️  SNAP ya existe, saltando.", flush=True)
-            saltados += 1
+        snap = snaps_existentes.get(nombre_snap)
+        if snap is None:
+            pendientes.append((tag, archivo, nombre_snap, None, "no existe"))
             continue
-        
-        print(f"   ⬇️  Descargando...", flush=True)
-        fh = descargar_bytes(drive, archivo["id"], archivo["mimeType"])
-        if not fh:
-            print(f"   ❌ No se pudo descargar.", flush=True)
-            errores += 1
-            lista_errores.append(archivo["name"])
+        motivo = motivo_refresco(archivo, snap) if MODO == "refrescar" else None
+        if motivo:
+            pendientes.append((tag, archivo, nombre_snap, snap["id"], motivo))
             continue
-        tamanio_kb = fh.getbuffer().nbytes / 1024
-        print(f"   ✅ Descargado ({tamanio_kb:.1f} KB)", flush=True)
-        
-        print(f"   ⬆️  Subiendo como Google Sheets...", flush=True)
-        snap_id = subir_como_gsheet(drive, fh, nombre_snap, snap_folder_id)
-        if snap_id:
-            print(f"   ✅ SNAP creado ({snap_id})", flush=True)
-            snaps_existentes.add(nombre_snap)
-            procesados += 1
-        else:
-            print(f"   ❌ Falló la subida tras {INTENTOS_MAX} intentos.", flush=True)
-            errores += 1
-            lista_errores.append(archivo["name"])
+        print(f"{tag} {archivo['name']}: ⏭️  SNAP al día, saltando.", flush=True)
+        saltados += 1
+    
+    print(f"\n📋 Plan ({MODO}): {sum(1 for p in pendientes if not p[3])} a crear, "
+          f"{sum(1 for p in pendientes if p[3])} a refrescar, {saltados} al día", flush=True)
+    for tag, archivo, _, snap_anterior_id, motivo in pendientes:
+        accion = "🔄 refrescar" if snap_anterior_id else "🆕 crear"
+        print(f"   {tag} {accion}: {archivo['name']} ({motivo})", flush=True)
+    
+    if DRY_RUN:
+        print("\n🧪 DRY RUN: no se realizaron cambios en Drive", flush=True)
+        print("🏁 SNAPSHOT BUILDER FINALIZADO", flush=True)
+        return
+    
+    print(f"\n🧵 Construyendo {len(pendientes)} SNAPs con {MAXIMO_HILOS} hilos "
+          f"(límite {TASA_API:g} llamadas/s)", flush=True)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAXIMO_HILOS) as pool:
+        futuros = {}
+        for tag, archivo, nombre_snap, snap_anterior_id, _ in pendientes:
+            futuro = pool.submit(procesar_archivo, archivo, nombre_snap, snap_folder_id, tag, snap_anterior_id)
+            futuros[futuro] = (tag, archivo, nombre_snap, snap_anterior_id)
         
-        if i < len(archivos):
-            print(f"   ⏳ Esperando {PAUSA_ENTRE_ARCH}s...", flush=True)
-            time.sleep(PAUSA_ENTRE_ARCH)
+        for futuro in concurrent.futures.as_completed(futuros):
+            tag, archivo, nombre_snap, snap_anterior_id = futuros[futuro]
+            try:
+                snap_id, metodo = futuro.result()
+            except Exception as e:
+                print(f"{tag}   ❌ Error inesperado: {e}", flush=True)
+                traceback.print_exc()
+                snap_id, metodo = None, None
+            if snap_id:
+                print(f"{tag} ✅ SNAP creado por {metodo} ({snap_id}): {archivo['name']}", flush=True)
+                procesados += 1
+                por_copia += metodo == "copia"
+                refrescados += bool(snap_anterior_id)
+            else:
+                print(f"{tag} ❌ Error: {archivo['name']}", flush=True)
+                errores += 1
+                lista_errores.append(archivo["name"])
     
     duracion = time.time() - inicio
     print(f"\n{'='*60}", flush=True)
-    print(f"✅ Creados:      {procesados}", flush=True)
-    print(f"⏭️  Ya existían:  {saltados}", flush=True)
+    print(f"✅ Creados:      {procesados} ({por_copia} por copia en servidor, {refrescados} refrescados)", flush=True)
+    print(f"⏭️  Al día:       {saltados}", flush=True)
     print(f"❌ Errores:      {errores}", flush=True)
     print(f"⏱️  Tiempo:       {duracion:.0f}s ({duracion/60:.1f} min)", flush=True)
     print(f"{'='*60}", flush=True)
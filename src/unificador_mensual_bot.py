@@ -6,6 +6,23 @@ Unificador Mensual - Actualiza CSV consolidado en Drive agregando datos del mes
 Usar workflow_dispatch en GitHub Actions con los inputs:
   - mes:  ej: 04, 11, 06, 12, 1º sac, 2º sac  (vacío = mes anterior automático)
   - anio: ej: 2024, 2025                        (vacío = año automático)
+  - reanudar_run_id: ID de una corrida que se cortó (vacío = corrida normal).
+    Restaura su estado/ y corre con --resume: los archivos ya procesados no
+    se vuelven a abrir.
+
+Local: python src/unificador_mensual_bot.py --resume
+
+======= CSV UNIFICADOS =========
+Cada Unificado_<Mes><Año>.csv terminado se sube a la carpeta
+REPORTE_CARPETA_UNIFICADOS_ID (si ya estaba, se reemplaza su contenido):
+es la segunda fuente del reporte anual, después del almacén.
+
+======= CACHÉ DE HOJAS Y ALMACÉN =========
+Lo que aporta cada libro a un período (Fragmento) queda en cache/hojas,
+compartida con el reporte anual. Cada período se carga también en el
+almacén SQLite (utils.almacen_utils) del que lee el reporte anual. Con
+PERSISTENCIA_CARPETA_ID las dos cosas se bajan de Drive al empezar y se
+suben al terminar (utils.persistencia_utils).
 
 enviar_email_html_adjuntos():
 "SMTP_TO_UNIFICADOR"(normal)
@@ -17,10 +34,7 @@ enviar_email_html_adjuntos():
 import openpyxl
 import sys
 import os
-import io
-import csv
 import time
-import re
 import traceback
 from datetime import datetime
 
@@ -30,13 +44,27 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Luego el resto de imports
 from utils.common_utils import (
     registrar_inicio, registrar_resumen, 
-    nombre_mes, obtener_mes_anterior, obtener_anio, crear_directorio_salida
+    nombre_mes, obtener_mes_anterior, obtener_anio, crear_directorio_salida,
+    indexar_hojas, indice_hojas_cacheado, resolver_hoja
 )
 from utils.drive_utils import (
-    inicializar_drive, obtener_archivos, descargar_archivo,
-    guardar_csv_localmente
+    inicializar_drive, inicializar_drive_escritura, obtener_archivos, abrir_archivo_excel,
+    subir_a_carpeta
 )
-from utils.excel_utils import eliminar_tildes_latin, normalizar_texto
+from utils.csv_utils import EscritorCSV
+from utils.excel_utils import eliminar_tildes_latin, listar_hojas_xlsx
+from utils.cache_utils import (
+    leer_hoja_cacheada, guardar_hoja_cacheada, version_archivo,
+    podar_cache, CACHE_DIR, NOMBRE_CACHE_DRIVE
+)
+from utils.almacen_utils import CargaPeriodo, ALMACEN_PATH, NOMBRE_ALMACEN_DRIVE, anios_cargados
+from utils.bloque_utils import BloqueFilas, COLUMNAS_IMPORTE
+from utils.esquema_utils import convertir_fila, ESQUEMA_CACHE
+from utils.dni_utils import DNIsUnicos
+from utils.estado_utils import Checkpoint
+from utils.fragmento_utils import Fragmento
+from utils.persistencia_utils import Persistencia
+from utils.reparticion_utils import clasificar_archivos, clasificar_reparticion, contar_por_tipo
 from utils.gmail_utils import (
     enviar_email_html_con_adjuntos, 
     generar_html_resumen_unificador
@@ -50,6 +78,29 @@ _anio_override = os.getenv("ANIO_OVERRIDE", "").strip()
 
 MES_ACTUAL = _mes_override if _mes_override else obtener_mes_anterior()  # Mes que estamos procesando
 
+# Carpeta de Drive donde se sube cada Unificado_<Mes><Año>.csv (el reporte anual lo lee de ahí)
+CARPETA_UNIFICADOS_ID = os.getenv("REPORTE_CARPETA_UNIFICADOS_ID", "").strip()
+
+# Encabezados del CSV unificado (25 columnas, la última es el código de repartición)
+ENCABEZADOS_UNIFICADO = [
+    "1-cuil", "2-dni", "3-tipo doc", "4-nombre y apellido", "5-cod liq",
+    "6-sit revista", "7-estado del afil", "8-reparticion", "9-aporte personal",
+    "10-adherente sec", "11-fondo v", "12-hijo menor de 35", "13-menor a cargo",
+    "14-cred asist", "15-sueldo sin desc", "16-sueldo con desc", "17-reajs aporte pers",
+    "18-reaj adherente sec", "19-reajuste fv", "20-reajuste hijo menor",
+    "21-reajuste menor a cargo", "22-reajuste cred asistencial", "23-aporte patronal",
+    "24-reajuste aporte patronal", "25-codigo"
+]
+
+# Columnas (0-based) que suma cada concepto; el escritor del CSV suma I-X (8-23)
+CONCEPTOS_COLUMNAS = {
+    'creditos_asistenciales': (13, 21),
+    'fondo_voluntario': (10, 18),
+    'personal': (8, 16),
+    'adherente': (9, 11, 12, 17, 19, 20),
+    'patronal': (22, 23),
+}
+
 
 def obtener_nombre_csv():
     """Obtiene el nombre del archivo CSV basado en el mes y año actual"""
@@ -95,7 +146,7 @@ def extraer_codigo_desde_nombre(nombre_archivo):
         print(f"   ❌ Error extrayendo código de '{nombre_archivo}': {e}")
         return "SIN_CODIGO"
 
-def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
+def extraer_datos_excel(fh, nombre_archivo, hoja_mes, file_id=None):
     """
     Extrae datos de un archivo Excel desde fila 4, columnas A to X
     en la hoja anterior al mes actual.
@@ -108,33 +159,50 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
     - D (4): Nombre y apellido - ELIMINAR TILDES (SÍ eliminar)
     - F (6): Situación de revista - ELIMINAR TILDES (SÍ eliminar)
     - H (8): Repartición - ELIMINAR TILDES (SÍ eliminar)
-    - I-X (9-24): Números con 2 decimales
+    - I-X (9-24): Importes en centavos enteros (se escriben con 2 decimales)
     - Otras columnas de texto: mantener tildes
+    (declarado en ESQUEMA_LIQUIDACION de utils.esquema_utils, compartido con el reporte anual)
+    
+    La hoja se resuelve con resolver_hoja ("1º sac" encuentra "1° SAC") y
+    el índice de hojas queda cacheado por file_id.
+    Devuelve un BloqueFilas (columnar, importes en centavos), [] si la hoja
+    no existe y None si hubo un error (no se cachea).
     """
     try:
         # Extraer código del nombre del archivo
         codigo_archivo = extraer_codigo_desde_nombre(nombre_archivo)
         
-        # Cargar libro
-        fh.seek(0)
-        wb = openpyxl.load_workbook(fh, data_only=True, read_only=True)
+        # Listar hojas leyendo sólo workbook.xml: si la hoja no existe no se
+        # baja el resto del libro. Para .xls se carga el libro completo.
+        wb = None
+        hojas = listar_hojas_xlsx(fh)
+        if hojas is None:
+            fh.seek(0)
+            wb = openpyxl.load_workbook(fh, data_only=True, read_only=True)
+            hojas = wb.sheetnames
         
         # Mostrar todas las hojas disponibles para debug
-        print(f"   📋 Hojas disponibles en {nombre_archivo}: {wb.sheetnames}")
+        print(f"   📋 Hojas disponibles en {nombre_archivo}: {hojas}")
 
         # Verificar si existe la hoja del mes
-        if hoja_mes not in wb.sheetnames:
+        hoja_real = resolver_hoja(hoja_mes, indexar_hojas(hojas, file_id))
+        if not hoja_real:
             print(f"⚠ Hoja '{hoja_mes}' no encontrada en {nombre_archivo}")
             # Mostrar hojas similares
-            hojas_similares = [s for s in wb.sheetnames if hoja_mes.lower() in s.lower()]
+            hojas_similares = [s for s in hojas if hoja_mes.lower() in s.lower()]
             if hojas_similares:
                 print(f"   ℹ️ Hojas similares encontradas: {hojas_similares}")
 
-            wb.close()
+            if wb:
+                wb.close()
             return []
         
-        ws = wb[hoja_mes]
-        datos_extraidos = []
+        # Cargar libro
+        if wb is None:
+            fh.seek(0)
+            wb = openpyxl.load_workbook(fh, data_only=True, read_only=True)
+        ws = wb[hoja_real]
+        datos_extraidos = BloqueFilas()
         
         # DETERMINAR FILA DE INICIO
         # Si es archivo de "Caja", empezar desde fila 5, sino desde fila 4
@@ -171,93 +239,10 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
                 wb.close()
                 return datos_extraidos
             
-            # LIMPIAR Y FORMATAR CADA CELDA
-            fila_limpia = []
-            for col_idx, cell in enumerate(row, start=1):
-                if cell is None:
-                    # Columnas numéricas (9-24): None → 0.00
-                    if col_idx >= 9:
-                        fila_limpia.append("0.00")
-                    else:
-                        fila_limpia.append("")
-                elif isinstance(cell, datetime):
-                    fila_limpia.append(cell.strftime("%Y-%m-%d"))
-                else:
-                    # Columnas A-H (1-8): formatear como texto
-                    if col_idx <= 8:
-                        if col_idx in (1, 2):
-                            # CUIL (col A) y DNI (col B): solo dígitos, sin formato
-                            if isinstance(cell, (int, float)):
-                                # Viene como número: convertir a int directamente
-                                cell_str = str(int(cell))
-                            else:
-                                # Viene como string: quitar puntos, guiones, espacios
-                                cell_str = str(cell).strip()
-                                cell_str = cell_str.replace('.', '').replace('-', '').replace(' ', '')
-                                # Si aún tiene forma de float string (ej: "20271234560.0"), limpiar
-                                if '.' in cell_str:
-                                    try:
-                                        cell_str = str(int(float(cell_str)))
-                                    except ValueError:
-                                        pass
-                            fila_limpia.append(cell_str)
-                        elif isinstance(cell, (int, float)):
-                            # Otros numéricos en cols texto (C-H)
-                            if isinstance(cell, float) and cell.is_integer():
-                                fila_limpia.append(str(int(cell)))
-                            else:
-                                cell_str = str(cell)
-                                if cell_str.endswith('.0'):
-                                    cell_str = cell_str[:-2]
-                                fila_limpia.append(cell_str)
-                        else:
-                            cell_str = str(cell) if cell is not None else ""
-                            # Columnas D (4), F (6) y H (8): eliminar tildes
-                            if col_idx in (4, 6, 8):
-                                fila_limpia.append(normalizar_texto(cell_str, eliminar_tildes_param=True))
-                            else:
-                                fila_limpia.append(normalizar_texto(cell_str, eliminar_tildes_param=False))
-                    
-                    else:  # Columnas I-X (9-24) - números SIEMPRE con 2 decimales y punto
-                        if cell == "" or cell is None:
-                            # Para celdas vacías, poner "0.00"
-                            fila_limpia.append("0.00")
-                        elif isinstance(cell, (int, float)):
-                            # Para números enteros o decimales, formatear siempre con 2 decimales
-                            formatted = f"{float(cell):.2f}"
-                            fila_limpia.append(formatted)
-                        else:
-                            # Si es texto, intentar convertir a número
-                            cell_str = str(cell).strip()
-                            
-                            if cell_str == "" or cell_str.lower() == "nan":
-                                fila_limpia.append("0.00")
-                            elif cell_str == "0":
-                                fila_limpia.append("0.00")
-                            else:
-                                try:
-                                    # Normalizar: reemplazar comas por puntos
-                                    cell_normalized = cell_str.replace(',', '.')
-                                    
-                                    # Manejar múltiples puntos
-                                    if cell_normalized.count('.') > 1:
-                                        parts = cell_normalized.split('.')
-                                        integer_part = ''.join(parts[:-1])
-                                        decimal_part = parts[-1]
-                                        cell_normalized = f"{integer_part}.{decimal_part}"
-                                    
-                                    num = float(cell_normalized)
-                                    formatted = f"{num:.2f}"
-                                    fila_limpia.append(formatted)
-                                    
-                                except (ValueError, AttributeError):
-                                    fila_limpia.append("0.00")
-            
-            # Solo agregar si la fila tiene algún contenido
-            if any(cell != "" for cell in fila_limpia):
-                # AGREGAR CÓDIGO COMO COLUMNA 25
-                fila_con_codigo = fila_limpia + [codigo_archivo]
-                datos_extraidos.append(fila_con_codigo)
+            # LIMPIAR Y CONVERTIR LA FILA con el esquema compilado (utils.esquema_utils):
+            # textos A-H como str, importes I-X como centavos; código como columna 25
+            valores = convertir_fila(row)
+            datos_extraidos.agregar(valores[:8], valores[8:], codigo_archivo)
         
         wb.close()
         
@@ -266,7 +251,7 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
         
         # Mostrar ejemplos detallados para debug
         if datos_extraidos and len(datos_extraidos) > 0:
-            primera_fila = datos_extraidos[0]
+            primera_fila = next(datos_extraidos.filas())
             print(f"   🔍 Verificación de formato (primer registro):")
             
             if len(primera_fila) > 3:
@@ -304,121 +289,21 @@ def extraer_datos_excel(fh, nombre_archivo, hoja_mes):
         print(f"❌ Error extrayendo datos de {nombre_archivo}: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return None
 
-def determinar_tipo_reparticion(nombre_archivo):
-    """
-    Determina el tipo de entidad basado en el nombre del archivo.
-    Versión MEJORADA con matching más preciso usando expresiones regulares.
-    SI NO ENCUENTRA COINCIDENCIA, DEVUELVE 'Otros'
-    """
-    nombre_lower = nombre_archivo.lower()
-    nombre_sin_ext = os.path.splitext(nombre_archivo)[0].lower()
-    nombre_sin_ext = re.sub(r'[-_\s]+', ' ', nombre_sin_ext).strip()
-    
-    # Patrones específicos para cada tipo
-    municipio_patterns = [
-        r'municipio',
-        r'municipalidad',
-        r'intendencia',
-        r'municipal',
-        r'^mun\.',
-        r'municipio de'
-    ]
-    
-    comuna_patterns = [
-        r'comuna',
-        r'^com\.',
-        r'comuna de'
-    ]
-    
-    entes_patterns = [
-        r'ente',
-        r'ente.*descentralizado',
-        r'ente.*autarq',
-        r'autarquico',
-        r'autárquico',
-        r'instituto.*autarq',
-        r'organismo.*descentralizado',
-        r'entidad.*autonoma',
-        r'entidad.*autónoma',
-        r'autarq'
-    ]
-    
-    cajas_patterns = [
-        r'caja',
-        r'caja.*municipal',
-        r'caja.*provincial',
-        r'banco.*municipal',
-        r'caja de jubilaciones',
-        r'caja de previsión',
-        r'caja de prevision'
-    ]
-    
-    escuela_patterns = [
-        r'idessa',
-        r'escuela',
-        r'instituto.*educacion',
-        r'instituto.*educación',
-        r'colegio',
-        r'universidad',
-        r'facultad'
-    ]
-
-    pasantias_patterns = [
-    r'pasantias',
-    r'pasantia'
-    ]
-    
-    # Verificar patrones en orden de prioridad
-    for pattern in cajas_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Cajas Municipales (patrón: {pattern})")
-            return 'Cajas Municipales'
-    
-    for pattern in escuela_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Escuela (patrón: {pattern})")
-            return 'Escuela'
-    
-    for pattern in entes_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Entes Descentralizados (patrón: {pattern})")
-            return 'Entes Descentralizados'
-    
-    for pattern in comuna_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Comunas (patrón: {pattern})")
-            return 'Comunas'
-    
-    for pattern in municipio_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Municipios (patrón: {pattern})")
-            return 'Municipios'
-    
-    for pattern in pasantias_patterns:
-        if re.search(pattern, nombre_lower) or re.search(pattern, nombre_sin_ext):
-            print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Pasantias (patrón: {pattern})")
-            return 'Pasantias'
-    
-    # SI NO ENCUENTRA NINGÚN PATRÓN, DEVOLVER 'Otros'
-    print(f"[CLASIFICACIÓN MEJORADA] Archivo: '{nombre_archivo}' → Otros (no se encontró patrón)")
-    return 'Otros'
-
-def verificar_consistencia_sumatorias_detallada(periodo, sumatorias_por_tipo, ruta_csv):
+def verificar_consistencia_sumatorias_detallada(periodo, sumatorias_por_tipo, sumatorias_csv):
     """
     Verifica en detalle la consistencia de las sumatorias para un período específico.
-    """
-    from utils.gmail_utils import calcular_sumatorias_csv
     
+    sumatorias_por_tipo salen de la extracción (las sumas del BloqueFilas de
+    cada archivo) y sumatorias_csv de los totales que el EscritorCSV fue
+    sumando sobre el texto que escribía: son dos cuentas independientes y
+    se comparan en memoria, sin releer el CSV.
+    """
     print(f"\n{'='*70}")
     print(f"🔍 VERIFICACIÓN DETALLADA DE CONSISTENCIA - PERÍODO {periodo}")
     print(f"{'='*70}")
     
-    # Calcular sumatorias del CSV
-    print("📊 Calculando sumatorias del CSV...")
-    sumatorias_csv = calcular_sumatorias_csv(ruta_csv)
-    
     # Calcular sumatorias acumuladas de los tipos
     print("📈 Calculando sumatorias acumuladas por tipo de entidad...")
     sumatorias_acumuladas = {
@@ -545,11 +430,12 @@ def verificar_consistencia_sumatorias_detallada(periodo, sumatorias_por_tipo, ru
     
     return not diferencias_encontradas, total_diferencia
 
-def calcular_sumatorias_datos(datos_excel):
+def sumatorias_desde_columnas(sumas_columnas):
     """
-    Calcula sumatorias directamente desde los datos extraídos.
+    Arma las sumatorias por concepto (en pesos) a partir de las sumas por
+    columna (índice 0-based, en centavos) de un Fragmento o de EscritorCSV. Se suma
+    en centavos enteros y se divide una sola vez, así el total es exacto.
     
-    CORRECCIONES:
     - Personal: I (9-aporte personal) + Q (17-reajs aporte pers)
     - Adherente: J (10-adherente sec) + L (12-hijo menor de 35) + M (13-menor a cargo) + 
                 R (18-reaj adherente sec) + T (20-reajuste hijo menor) + U (21-reajuste menor a cargo)
@@ -557,165 +443,68 @@ def calcular_sumatorias_datos(datos_excel):
     - Créditos Asistenciales: N (14-cred asist) + V (22-reajuste cred asistencial)
     - Patronal: W (23-aporte patronal) + X (24-reajuste aporte patronal)
     """
-    sumatorias = {
-        'creditos_asistenciales': 0.0,
-        'fondo_voluntario': 0.0,
-        'personal': 0.0,
-        'adherente': 0.0,
-        'patronal': 0.0,
-        'total': 0.0
+    centavos = {
+        concepto: sum(sumas_columnas.get(c, 0) for c in columnas)
+        for concepto, columnas in CONCEPTOS_COLUMNAS.items()
     }
-    
-    filas_procesadas = 0
-    filas_con_errores = 0
-    
-    for fila_idx, fila in enumerate(datos_excel, 1):
-        try:
-            # Verificar que la fila tenga al menos 24 columnas (ahora 25 con el código)
-            if len(fila) < 24:
-                filas_con_errores += 1
-                if fila_idx <= 10:  # Solo mostrar primeros errores
-                    print(f"   ⚠ Fila {fila_idx} tiene solo {len(fila)} columnas (necesita 24 para cálculos)")
-                continue
-            
-            def safe_float(val):
-                if not val or val == '' or str(val).strip() == '':
-                    return 0.0
-                try:
-                    return float(str(val).strip())
-                except ValueError:
-                    return 0.0
-            
-            # OBTENER VALORES - CÁLCULOS CORREGIDOS
-            # Columna I: 9-aporte personal
-            aporte_personal = safe_float(fila[8])      
-            
-            # Columna J: 10-adherente sec
-            adherente_sec = safe_float(fila[9])        
-            
-            # Columna K: 11-fondo v
-            fondo_v = safe_float(fila[10])             
-            
-            # Columna L: 12-hijo menor de 35
-            hijo_menor_35 = safe_float(fila[11])
-            
-            # Columna M: 13-menor a cargo
-            menor_cargo = safe_float(fila[12])
-            
-            # Columna N: 14-cred asist
-            cred_asist = safe_float(fila[13])          
-            
-            # Columna Q: 17-reajs aporte pers
-            reaj_aporte_pers = safe_float(fila[16])    
-            
-            # Columna R: 18-reaj adherente sec
-            reaj_adherente_sec = safe_float(fila[17])  
-            
-            # Columna S: 19-reajuste fv
-            reajuste_fv = safe_float(fila[18])         
-            
-            # Columna T: 20-reajuste hijo menor
-            reajuste_hijo_menor = safe_float(fila[19])
-            
-            # Columna U: 21-reajuste menor a cargo
-            reajuste_menor_cargo = safe_float(fila[20])
-            
-            # Columna V: 22-reajuste cred asistencial
-            reaj_cred_asist = safe_float(fila[21])     
-            
-            # Columna W: 23-aporte patronal
-            aporte_patronal = safe_float(fila[22])     
-            
-            # Columna X: 24-reajuste aporte patronal
-            reaj_aporte_patronal = safe_float(fila[23]) 
-            
-            # DEBUG: Mostrar primeras filas
-            if fila_idx <= 3:
-                print(f"\n🔍 DEBUG CÁLCULOS - Fila {fila_idx}:")
-                print(f"  Col I (aporte personal): {aporte_personal:.2f}")
-                print(f"  Col Q (reajuste aporte pers): {reaj_aporte_pers:.2f}")
-                print(f"  → Personal fila: {(aporte_personal + reaj_aporte_pers):.2f}")
-                
-                print(f"  Col J (adherente sec): {adherente_sec:.2f}")
-                print(f"  Col L (hijo menor 35): {hijo_menor_35:.2f}")
-                print(f"  Col M (menor cargo): {menor_cargo:.2f}")
-                print(f"  Col R (reaj adherente): {reaj_adherente_sec:.2f}")
-                print(f"  Col T (reaj hijo menor): {reajuste_hijo_menor:.2f}")
-                print(f"  Col U (reaj menor cargo): {reajuste_menor_cargo:.2f}")
-                print(f"  → Adherente fila: {(adherente_sec + hijo_menor_35 + menor_cargo + reaj_adherente_sec + reajuste_hijo_menor + reajuste_menor_cargo):.2f}")
-                
-                # Mostrar código si está disponible
-                if len(fila) > 24:
-                    print(f"  Col 25 (Código): {fila[24]}")
-            
-            # CALCULAR SUMS POR CONCEPTO - FÓRMULAS CORREGIDAS
-            # Personal = columna I + columna Q
-            sum_personal_fila = aporte_personal + reaj_aporte_pers
-            sumatorias['personal'] += sum_personal_fila
-            
-            # Adherente = columna J + columna L + columna M + columna R + columna T + columna U
-            sum_adherente_fila = (
-                adherente_sec + 
-                hijo_menor_35 + 
-                menor_cargo + 
-                reaj_adherente_sec + 
-                reajuste_hijo_menor + 
-                reajuste_menor_cargo
-            )
-            sumatorias['adherente'] += sum_adherente_fila
-            
-            # Fondo Voluntario = columna K + columna S
-            sum_fv_fila = fondo_v + reajuste_fv
-            sumatorias['fondo_voluntario'] += sum_fv_fila
-            
-            # Créditos Asistenciales = columna N + columna V
-            sum_creditos_fila = cred_asist + reaj_cred_asist
-            sumatorias['creditos_asistenciales'] += sum_creditos_fila
-            
-            # Patronal = columna W + columna X
-            sum_patronal_fila = aporte_patronal + reaj_aporte_patronal
-            sumatorias['patronal'] += sum_patronal_fila
-            
-            filas_procesadas += 1
-            
-        except (ValueError, IndexError, TypeError) as e:
-            filas_con_errores += 1
-            if fila_idx <= 10:  # Solo mostrar primeros errores
-                print(f"   ⚠ Error en fila {fila_idx}: {e}")
-                print(f"     Fila: {fila}")
-    
-    # Calcular total general
-    sumatorias['total'] = (
-        sumatorias['personal'] + 
-        sumatorias['adherente'] + 
-        sumatorias['fondo_voluntario'] + 
-        sumatorias['creditos_asistenciales'] + 
-        sumatorias['patronal']
-    )
-    
-    # Mostrar estadísticas de procesamiento
-    if filas_con_errores > 0:
-        print(f"\n📊 Estadísticas de cálculo de sumatorias:")
-        print(f"  Filas procesadas correctamente: {filas_procesadas}")
-        print(f"  Filas con errores: {filas_con_errores}")
-        print(f"  Total filas: {len(datos_excel)}")
-    
+    sumatorias = {concepto: total / 100 for concepto, total in centavos.items()}
+    sumatorias['total'] = sum(centavos.values()) / 100
     return sumatorias
 
-def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
+def resumen_checkpoint(filas, sumas):
+    """Resumen numérico de un archivo (o de un período) para el checkpoint."""
+    return {"filas": filas, "sumas": {str(c): centavos for c, centavos in sumas.items()}}
+
+
+def resumen_fragmento(fragmento):
+    """Resumen para el checkpoint de lo que aportó un archivo (Fragmento o [])."""
+    sumas = fragmento.sumas if fragmento else dict.fromkeys(COLUMNAS_IMPORTE, 0)
+    return resumen_checkpoint(len(fragmento), sumas)
+
+
+def guardar_checkpoint(checkpoint, paso, archivo, fragmento):
+    """Anota el fragmento del archivo en el checkpoint de la corrida (si hay)."""
+    if checkpoint is None:
+        return
+    checkpoint.guardar(paso, archivo['id'], version_archivo(archivo), fragmento,
+                       resumen_fragmento(fragmento))
+
+
+def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo, escritor, carga=None,
+                                         tipos_por_archivo=None, checkpoint=None):
     """
     Versión modificada que verifica consistencia
     AHORA INCLUYE CÓDIGO EN LOS DATOS EXTRAÍDOS Y REPORTE DE APORTANTES.
     Y RETORNA LA RUTA DEL REPORTE GENERADO.
+    
+    Las filas de cada archivo se vuelcan apenas se extraen al EscritorCSV del
+    período (y a la CargaPeriodo del almacén, si hay): en memoria sólo quedan
+    los acumulados (sumatorias, DNIs únicos, aportantes por repartición).
+    Finalizar o descartar el CSV y la carga queda a cargo de quien llama.
+    
+    Lo que aporta cada archivo (filas, sumas y DNIs) se guarda en
+    la caché como Fragmento por ID + md5Checksum: al volver a correr el mes
+    sólo se extraen los archivos nuevos o modificados y el resto se arma
+    con los fragmentos guardados.
+    
+    tipos_por_archivo es {id de archivo: tipo de entidad} ya clasificado
+    (clasificar_archivos); si no se pasa se clasifica acá.
+    
+    Con un checkpoint cada archivo terminado queda anotado: al reanudar
+    (--resume) esos archivos salen del checkpoint sin tocar Drive. Al final
+    se verifica que los totales coincidan con los resúmenes guardados y se
+    vuelve a extraer en frío una muestra de esos archivos para compararla.
     """
     from utils.common_utils import crear_directorio_salida
     
-    datos_mes = []
     errores = []
     archivos_procesados = 0
     filas_totales = 0
     datos_reporte_aportantes = []
-    dnis_unicos_periodo = set()  # Set global de DNIs únicos para todo el período
+    dnis_unicos_periodo = DNIsUnicos()  # DNIs únicos de todo el período (mapa de bits)
+    archivos_escritos = []  # IDs de los archivos volcados al CSV, para verificar el checkpoint
+    desde_checkpoint = []   # IDs cuyo fragmento salió del checkpoint (muestra en frío)
+    paso = f"periodo {periodo}"
     
     # Diccionario para sumatorias por tipo de entidad - AGREGAR 'Otros'
     sumatorias_por_tipo = {
@@ -787,33 +576,69 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
         'total': 0.0
     }
     
-    # Contadores para estadísticas
-    archivos_por_tipo = {}
+    # Tipo de entidad de cada archivo (ejecutar_principal lo calcula una vez por corrida)
+    if tipos_por_archivo is None:
+        tipos_por_archivo = clasificar_archivos(archivos_excel)
     
     for archivo in archivos_excel:
         print(f"\n📄 Procesando: {archivo['name']} (período: {periodo})")
         
         try:
-            # Determinar tipo de entidad (USANDO LA FUNCIÓN MEJORADA)
-            tipo_entidad = determinar_tipo_reparticion(archivo['name'])
-            
-            # Actualizar contador de archivos por tipo
-            archivos_por_tipo[tipo_entidad] = archivos_por_tipo.get(tipo_entidad, 0) + 1
+            tipo_entidad = tipos_por_archivo.get(archivo['id']) or clasificar_reparticion(archivo['name'])
             
             # DEBUG: Mostrar tipo para verificar
             if 'municipio' in archivo['name'].lower() or 'municipal' in archivo['name'].lower():
                 print(f"   🏢 ARCHIVO MUNICIPIO DETECTADO: {archivo['name']} -> {tipo_entidad}")
             
-            # Descargar archivo
-            fh = descargar_archivo(drive, archivo)
-            if not fh:
-                errores.append(f"No se pudo descargar: {archivo['name']}")
-                continue
+            # Archivo ya procesado antes de que se cortara la corrida que se reanuda
+            fragmento = None
+            version = version_archivo(archivo)
+            if checkpoint is not None:
+                previo = checkpoint.resumen(paso, archivo['id'], version)
+                if previo is not None and previo.get("omitido"):
+                    print(f"   ⏭️ Hoja '{periodo}' no existe en {archivo['name']} (checkpoint)")
+                    continue
+                if previo is not None:
+                    fragmento = checkpoint.resultado(paso, archivo['id'], version)
+                    if fragmento is not None:
+                        print(f"   ⏯️ {len(fragmento)} filas desde el checkpoint (hoja {periodo})")
+                        desde_checkpoint.append(archivo['id'])
             
-            # Extraer datos del Excel para el período específico
-            datos_excel = extraer_datos_excel(fh, archivo['name'], periodo)
+            # Aporte de este archivo ya calculado en otra corrida para esta misma versión
+            if fragmento is None:
+                fragmento = leer_hoja_cacheada(archivo, periodo, ESQUEMA_CACHE)
+                if fragmento is not None and not isinstance(fragmento, (Fragmento, list)):
+                    fragmento = None
+                if fragmento is not None:
+                    print(f"   💾 {len(fragmento)} filas desde caché (hoja {periodo}, sin volver a extraer)")
+                    guardar_checkpoint(checkpoint, paso, archivo, fragmento)
+            if fragmento is None:
+                # Si el libro ya se abrió para otro período y no tiene esta hoja, no abrirlo de nuevo
+                indice = indice_hojas_cacheado(archivo['id'])
+                if indice is not None and not resolver_hoja(periodo, indice):
+                    print(f"   ⏭️ Hoja '{periodo}' no existe en {archivo['name']} (índice en caché)")
+                    if checkpoint is not None:
+                        checkpoint.guardar(paso, archivo['id'], version, None, {"omitido": 1})
+                    continue
+                
+                # Abrir archivo (lectura remota por rangos o descarga completa)
+                fh = abrir_archivo_excel(drive, archivo)
+                if not fh:
+                    errores.append(f"No se pudo descargar: {archivo['name']}")
+                    continue
+                
+                # Extraer datos del Excel para el período específico
+                datos_excel = extraer_datos_excel(fh, archivo['name'], periodo, archivo['id'])
+                if hasattr(fh, "bytes_descargados"):
+                    print(f"   📥 Lectura parcial: {fh.bytes_descargados / 1024:.0f} KB "
+                          f"de {fh.tamanio / 1024:.0f} KB")
+                if datos_excel is not None:
+                    # Filas, sumas y DNIs del archivo, listos para la próxima corrida
+                    fragmento = Fragmento(datos_excel) if datos_excel else []
+                    guardar_hoja_cacheada(archivo, periodo, fragmento, ESQUEMA_CACHE)
+                    guardar_checkpoint(checkpoint, paso, archivo, fragmento)
             
-            if datos_excel:
+            if fragmento:
                 # NUEVO: Acumular para reporte de aportantes
                 codigo_archivo = extraer_codigo_desde_nombre(archivo['name'])
                 nombre_reparticion = archivo['name'].replace('.xlsx', '').replace('.xlsm', '').replace('.xls', '')
@@ -824,31 +649,30 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
                 else:
                     nombre_limpio = nombre_reparticion.rsplit('-', 1)[0].strip()
                 
-                # Contar DNIs únicos dentro de este archivo (columna B = índice 1)
-                # Normalizar el DNI: strip, quitar .0 final, para que coincida con el CSV unificado
-                def normalizar_dni(val):
-                    s = str(val).strip()
-                    if s.endswith('.0'):
-                        s = s[:-2]
-                    return s
-
-                dnis_archivo = set(
-                    normalizar_dni(fila[1]) for fila in datos_excel
-                    if len(fila) > 1 and fila[1] and normalizar_dni(fila[1]) not in ("", "None", "nan")
-                )
-                # Acumular al set global del período
-                dnis_unicos_periodo.update(dnis_archivo)
+                # DNIs únicos dentro de este archivo (columna B), acumulados al período
+                dnis_unicos_periodo.agregar(fragmento.dnis)
+                
+                datos_reporte_aportantes.append((codigo_archivo, nombre_limpio, fragmento.cantidad_dnis))
                 
-                datos_reporte_aportantes.append((codigo_archivo, nombre_limpio, len(dnis_archivo)))
+                # Volcar las filas al CSV; el escritor va sumando lo que escribe
+                escritor.escribir(fragmento.bloque.filas())
+                archivos_escritos.append(archivo['id'])
+                if carga is not None and not carga.cerrada:
+                    try:
+                        carga.agregar(fragmento.bloque)
+                    except Exception as e:
+                        print(f"   ⚠️ No se pudo cargar en el almacén, el período sigue sin él: {e}")
+                        carga.descartar()
                 
-                # Calcular sumatorias para este archivo
-                sumatorias_archivo = calcular_sumatorias_datos(datos_excel)
+                # Sumatorias de este archivo según la extracción (sumas del bloque,
+                # guardadas en el fragmento); se contrastan con las del escritor
+                sumatorias_archivo = sumatorias_desde_columnas(fragmento.sumas)
                 
                 # DEBUG DETALLADO PARA ARCHIVOS IMPORTANTES
                 if tipo_entidad == 'Municipios' or 'municipio' in archivo['name'].lower():
                     print(f"\n   💰 DEBUG DETALLADO - Archivo: {archivo['name']}")
                     print(f"      Tipo: {tipo_entidad}")
-                    print(f"      Filas extraídas: {len(datos_excel)}")
+                    print(f"      Filas extraídas: {len(fragmento)}")
                     print(f"      Personal calculado: ${sumatorias_archivo['personal']:,.2f}")
                     print(f"      Adherente calculado: ${sumatorias_archivo['adherente']:,.2f}")
                     print(f"      Fondo V calculado: ${sumatorias_archivo['fondo_voluntario']:,.2f}")
@@ -862,8 +686,7 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
                         sumatorias_por_tipo[tipo_entidad][concepto] += sumatorias_archivo[concepto]
                         sumatorias_directas_periodo[concepto] += sumatorias_archivo[concepto]
                 
-                datos_mes.extend(datos_excel)
-                filas_agregadas = len(datos_excel)
+                filas_agregadas = len(fragmento)
                 filas_totales += filas_agregadas
                 archivos_procesados += 1
                 print(f"   ✅ {filas_agregadas} filas extraídas del período {periodo} (con código en columna 25)")
@@ -882,22 +705,35 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
             print(f"   Traceback: {traceback.format_exc()}")
             errores.append(error_msg)
     
+    # Corrida reanudada: lo que quedó en el CSV tiene que sumar lo mismo que
+    # los resúmenes guardados (el estado está entero), y una muestra de los
+    # archivos que salieron del checkpoint, extraída de nuevo, lo mismo que
+    # lo guardado (lo reanudado coincide con una extracción en frío)
+    if checkpoint is not None and checkpoint.reanudado and archivos_escritos:
+        if not checkpoint.verificar(paso, archivos_escritos, resumen_checkpoint(escritor.filas, escritor.sumas)):
+            errores.append(f"Checkpoint: los totales reanudados del período {periodo} no coinciden con los guardados")
+        por_id = {archivo['id']: archivo for archivo in archivos_excel}
+        
+        def reextraer(archivo_id):
+            archivo = por_id[archivo_id]
+            fh = abrir_archivo_excel(drive, archivo)
+            if not fh:
+                return None
+            datos_excel = extraer_datos_excel(fh, archivo['name'], periodo, archivo['id'])
+            if datos_excel is None:
+                return None
+            return resumen_fragmento(Fragmento(datos_excel) if datos_excel else [])
+        
+        if not checkpoint.verificar_muestra(paso, desde_checkpoint, reextraer):
+            errores.append(f"Checkpoint: la muestra reextraída del período {periodo} no coincide con lo guardado")
+    
     # Mostrar estadísticas de archivos por tipo
     print(f"\n📊 ESTADÍSTICAS DE ARCHIVOS POR TIPO - PERÍODO {periodo}:")
     print("-" * 50)
     
-    # Filtrar items no nulos y ordenar
-    items_validos = [(tipo, cantidad) for tipo, cantidad in archivos_por_tipo.items() if tipo is not None]
-    items_ordenados = sorted(items_validos, key=lambda x: x[0] if x[0] else "")  # Ordenar por tipo
-    
-    for tipo, cantidad in items_ordenados:
+    for tipo, cantidad in sorted(contar_por_tipo(tipos_por_archivo).items()):
         print(f"  {tipo}: {cantidad} archivo(s)")
     
-    # Si hay archivos sin tipo (None), mostrarlos por separado
-    archivos_sin_tipo = sum(cantidad for tipo, cantidad in archivos_por_tipo.items() if tipo is None)
-    if archivos_sin_tipo > 0:
-        print(f"  Sin tipo asignado: {archivos_sin_tipo} archivo(s)")
-    
     # Mostrar sumatorias finales por tipo de entidad para este período
     print(f"\n📊 RESUMEN SUMATORIAS POR TIPO DE ENTIDAD - PERÍODO {periodo}:")
     print("-" * 60)
@@ -924,18 +760,7 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
     
     # Mostrar estadísticas del reporte de aportantes
     if datos_reporte_aportantes:
-        # Recalcular DNIs únicos desde datos_mes (misma fuente que el CSV unificado)
-        def normalizar_dni(val):
-            s = str(val).strip()
-            if s.endswith('.0'):
-                s = s[:-2]
-            return s
-
-        dnis_unicos_periodo = set(
-            normalizar_dni(fila[1]) for fila in datos_mes
-            if len(fila) > 1 and fila[1] and normalizar_dni(fila[1]) not in ("", "None", "nan")
-        )
-
+        # dnis_unicos_periodo se acumuló archivo por archivo con las mismas filas que van al CSV
         total_aportantes = sum(cantidad for _, _, cantidad in datos_reporte_aportantes)
         total_dnis_unicos_periodo = len(dnis_unicos_periodo)
         print(f"\n📊 REPORTE DE APORTANTES - PERÍODO {periodo}:")
@@ -975,75 +800,8 @@ def extraer_y_preparar_datos_mes_periodo(drive, archivos_excel, periodo):
         print(f"   Total aportantes (suma reparticiones): {suma_reparticiones}")
         print(f"   Total DNIs únicos del período: {total_dnis_unicos_periodo}")
     
-    # RETORNAR 9 VALORES (incluyendo la ruta del reporte y DNIs únicos del período)
-    return datos_mes, archivos_procesados, filas_totales, errores, sumatorias_por_tipo, sumatorias_directas_periodo, datos_reporte_aportantes, ruta_reporte, dnis_unicos_periodo
-
-def combinar_con_existente(csv_existente, datos_nuevos):
-    """
-    Combina CSV existente con nuevos datos.
-    AHORA INCLUYE COLUMNA 25 PARA CÓDIGO.
-    """
-    if not csv_existente:
-        # Si no hay CSV existente, crear uno nuevo con encabezados de 25 campos
-        encabezados = [
-            "1-cuil",
-            "2-dni",
-            "3-tipo doc",
-            "4-nombre y apellido",
-            "5-cod liq",
-            "6-sit revista",
-            "7-estado del afil",
-            "8-reparticion",
-            "9-aporte personal",
-            "10-adherente sec",
-            "11-fondo v",
-            "12-hijo menor de 35",
-            "13-menor a cargo",
-            "14-cred asist",
-            "15-sueldo sin desc",
-            "16-sueldo con desc",
-            "17-reajs aporte pers",
-            "18-reaj adherente sec",
-            "19-reajuste fv",
-            "20-reajuste hijo menor",
-            "21-reajuste menor a cargo",
-            "22-reajuste cred asistencial",
-            "23-aporte patronal",
-            "24-reajuste aporte patronal",
-            "25-codigo"  # NUEVA COLUMNA
-        ]
-        return encabezados, datos_nuevos
-    
-    # Leer CSV existente
-    reader = csv.reader(io.StringIO(csv_existente))
-    filas_existentes = list(reader)
-    
-    if not filas_existentes:
-        return [], datos_nuevos
-    
-    # Separar encabezados y datos
-    encabezados = filas_existentes[0]
-    
-    # Si el CSV existente no tiene columna 25, agregarla
-    if len(encabezados) < 25:
-        encabezados.append("25-codigo")
-    
-    datos_existentes = filas_existentes[1:]
-    
-    # Asegurar que los datos existentes tengan 25 columnas
-    datos_existentes_normalizados = []
-    for fila in datos_existentes:
-        if len(fila) < 25:
-            # Completar con celdas vacías hasta llegar a 25
-            fila_completa = fila + [""] * (25 - len(fila))
-            datos_existentes_normalizados.append(fila_completa)
-        else:
-            datos_existentes_normalizados.append(fila)
-    
-    # Combinar todos los datos existentes con nuevos datos
-    datos_combinados = datos_existentes_normalizados + datos_nuevos
-    
-    return encabezados, datos_combinados
+    # RETORNAR 8 VALORES (incluyendo la ruta del reporte y DNIs únicos del período)
+    return archivos_procesados, filas_totales, errores, sumatorias_por_tipo, sumatorias_directas_periodo, datos_reporte_aportantes, ruta_reporte, dnis_unicos_periodo
 
 def determina_mes_a_procesar(mes_actual):
     
@@ -1096,10 +854,30 @@ def ejecutar_principal():
     
     print(f"✅ Archivos Excel válidos: {len(archivos_excel)}")
     
-    # DEBUG: Mostrar nombres de archivos para verificar clasificación
+    # La caché de hojas se guarda en Drive: fuera lo de archivos que ya no están
+    if archivos_excel:
+        podados = podar_cache({a["id"] for a in archivos_excel})
+        if podados:
+            print(f"🧹 Caché de hojas: {podados} archivo(s) que ya no están en la carpeta")
+    
+    # Clasificar los archivos por tipo de entidad una sola vez (sirve para todos los períodos)
+    tipos_por_archivo = clasificar_archivos(archivos_excel)
     print(f"\n📋 LISTA DE ARCHIVOS EXCEL ENCONTRADOS ({len(archivos_excel)}):")
+    for tipo, cantidad in contar_por_tipo(tipos_por_archivo).items():
+        print(f"  {tipo}: {cantidad} archivo(s)")
+    
+    # Checkpoint por archivo en estado/unificador (--resume retoma una corrida cortada)
+    checkpoint = Checkpoint("unificador", f"{anio_actual}|{'|'.join(periodos)}|{ESQUEMA_CACHE}")
+    
+    # Los CSV unificados se suben a la carpeta de la que lee el reporte anual
+    drive_unificados = None
+    if CARPETA_UNIFICADOS_ID:
+        drive_unificados = inicializar_drive_escritura()
+    else:
+        print("⚠️ REPORTE_CARPETA_UNIFICADOS_ID sin definir: los CSV unificados no se suben a Drive")
     
     archivos_csv_generados = []
+    filas_por_csv = {}  # ruta -> filas de datos que escribió el EscritorCSV
     reportes_generados = []  # NUEVO: Lista para guardar rutas de CSVs de aportantes
     total_filas_todos_periodos = 0
     todos_errores = []
@@ -1167,6 +945,18 @@ def ejecutar_principal():
     aportantes_por_periodo = {}
     total_dnis_unicos_por_periodo = {}  # DNIs únicos globales por período
 
+    # Qué hay en el almacén antes de cargar (se baja de Drive al empezar)
+    try:
+        anios = anios_cargados()
+    except Exception as e:
+        print(f"⚠️ No se pudo leer el almacén ({ALMACEN_PATH}): {e}")
+        anios = None
+    if anios:
+        print(f"🗄️ Almacén ({ALMACEN_PATH}): " + ", ".join(f"{a}: {n} período(s)" for a, n in anios.items()))
+    elif anios is not None:
+        print(f"⚠️ Almacén vacío ({ALMACEN_PATH}): se crea con los períodos de esta corrida. "
+              f"Si no es la primera, revisar PERSISTENCIA_CARPETA_ID")
+    
     # 3. Procesar cada período por separado
     for periodo in periodos:
         print(f"\n{'='*70}")
@@ -1175,10 +965,27 @@ def ejecutar_principal():
         
         nombre_periodo = nombre_mes(periodo)
 
-        # 4. Extraer datos de este período específico con sumatorias directas (AHORA 9 VALORES)
-        datos_periodo, archivos_procesados, filas_periodo, errores, sumatorias_por_tipo, sumatorias_directas, aportantes_periodo, ruta_reporte_periodo, dnis_unicos_periodo = extraer_y_preparar_datos_mes_periodo(
-            drive, archivos_excel, periodo
-        )
+        # 4. Abrir el CSV del período (se escribe a medida que se extrae cada archivo)
+        nombre_csv = f"Unificado_{nombre_periodo}{anio_actual}.csv"
+        escritor = EscritorCSV(nombre_csv, ENCABEZADOS_UNIFICADO, COLUMNAS_IMPORTE)
+        
+        # Carga en el almacén local (SQLite) en paralelo al CSV, confirmada al final
+        try:
+            carga = CargaPeriodo(anio_actual, periodo)
+        except Exception as e:
+            print(f"⚠️ No se pudo abrir el almacén, el período no se cargará: {e}")
+            carga = None
+        
+        # 5. Extraer datos de este período específico con sumatorias directas (AHORA 8 VALORES)
+        try:
+            archivos_procesados, filas_periodo, errores, sumatorias_por_tipo, sumatorias_directas, aportantes_periodo, ruta_reporte_periodo, dnis_unicos_periodo = extraer_y_preparar_datos_mes_periodo(
+                drive, archivos_excel, periodo, escritor, carga, tipos_por_archivo, checkpoint
+            )
+        except Exception:
+            escritor.descartar()
+            if carga is not None:
+                carga.descartar()
+            raise
         
         # Guardar las sumatorias
         sumatorias_por_periodo_y_tipo[periodo] = sumatorias_por_tipo
@@ -1201,52 +1008,60 @@ def ejecutar_principal():
                         sumatorias_totales_por_tipo[tipo_entidad][concepto] += sumatorias_por_tipo[tipo_entidad][concepto]
         
         # Guardar la cantidad para este período
-        cantidades_por_periodo[periodo] = len(datos_periodo)
+        cantidades_por_periodo[periodo] = filas_periodo
 
-        if not datos_periodo:
+        if not filas_periodo:
             print(f"⚠️ No se extrajeron datos para el período {periodo}")
+            escritor.descartar()
+            if carga is not None:
+                carga.descartar()
             todos_errores.extend(errores)
             consistencias_por_periodo[periodo] = False
             diferencias_totales[periodo] = 0.0
             continue
         
-        # 5. Crear encabezados para este período (AHORA CON 25 COLUMNAS)
-        encabezados = [
-                "1-cuil", "2-dni", "3-tipo doc", "4-nombre y apellido", "5-cod liq",
-                "6-sit revista", "7-estado del afil", "8-reparticion", "9-aporte personal",
-                "10-adherente sec", "11-fondo v", "12-hijo menor de 35", "13-menor a cargo",
-                "14-cred asist", "15-sueldo sin desc", "16-sueldo con desc", "17-reajs aporte pers",
-                "18-reaj adherente sec", "19-reajuste fv", "20-reajuste hijo menor",
-                "21-reajuste menor a cargo", "22-reajuste cred asistencial", "23-aporte patronal",
-                "24-reajuste aporte patronal", "25-codigo"
-            ]
-        
-        # Agregar encabezados a los datos
-        datos_finales = [encabezados] + datos_periodo
-        
-        # 6. Generar nombre del CSV para este período
-        nombre_csv = f"Unificado_{nombre_periodo}{anio_actual}.csv"
-        
-        # 7. Guardar CSV localmente
+        # 6. Publicar el CSV del período (rename atómico del temporal)
         print(f"\n💾 Guardando CSV para período {periodo}...")
-        ruta_csv_local = guardar_csv_localmente(datos_finales, nombre_csv)
+        try:
+            ruta_csv_local = escritor.finalizar()
+        except OSError as e:
+            print(f"❌ Error guardando CSV local: {e}")
+            escritor.descartar()
+            ruta_csv_local = None
         
         if ruta_csv_local:
             archivos_csv_generados.append(ruta_csv_local)
-            total_filas_todos_periodos += len(datos_periodo)
+            filas_por_csv[ruta_csv_local] = escritor.filas
+            total_filas_todos_periodos += filas_periodo
             
             print(f"✅ CSV guardado: {nombre_csv}")
-            print(f"📊 Filas en este período: {len(datos_periodo)}")
+            print(f"📊 Filas en este período: {filas_periodo}")
             print(f"📋 Columnas totales: 25 (incluye código en columna 25)")
             
+            # 7. Confirmar la carga del período en el almacén local (SQLite)
+            if carga is not None and not carga.cerrada:
+                try:
+                    carga.confirmar()
+                    print(f"🗄️ Período {periodo}/{anio_actual} cargado en el almacén ({ALMACEN_PATH})")
+                except Exception as e:
+                    print(f"⚠️ No se pudo cargar el período en el almacén: {e}")
+            
+            # 7b. Subir el CSV a la carpeta de unificados (reemplaza el de una corrida anterior)
+            if drive_unificados is not None:
+                try:
+                    subir_a_carpeta(drive_unificados, ruta_csv_local, CARPETA_UNIFICADOS_ID, mime="text/csv")
+                    print(f"☁️ {nombre_csv} subido a la carpeta de unificados")
+                except Exception as e:
+                    print(f"⚠️ No se pudo subir {nombre_csv} a Drive: {e}")
+            
             # 8. VERIFICAR CONSISTENCIA ENTRE DATOS DIRECTOS Y CSV
             print(f"\n🔍 EJECUTANDO VERIFICACIÓN DETALLADA DE CONSISTENCIA...")
             
-            # Ejecutar verificación detallada
+            # Ejecutar verificación detallada: extracción contra lo que sumó el escritor
             es_consistente, diferencia_total = verificar_consistencia_sumatorias_detallada(
                 periodo, 
                 sumatorias_por_tipo,
-                ruta_csv_local
+                sumatorias_desde_columnas(escritor.sumas)
             )
             
             consistencias_por_periodo[periodo] = es_consistente
@@ -1260,6 +1075,8 @@ def ejecutar_principal():
             error_msg = f"No se pudo guardar CSV para período {periodo}"
             print(f"❌ {error_msg}")
             todos_errores.append(error_msg)
+            if carga is not None:
+                carga.descartar()
             consistencias_por_periodo[periodo] = False
             diferencias_totales[periodo] = 0.0
     
@@ -1386,6 +1203,9 @@ def ejecutar_principal():
     
     enviar_email_html_con_adjuntos(asunto, html, adjuntos_validos, "SMTP_TO_UNIFICADOR")
     
+    # Corrida completa: el estado para reanudar ya no hace falta
+    checkpoint.finalizar()
+    
     print("\n" + "=" * 70)
     print("✅ PROCESO COMPLETADO!")
     print("=" * 70)
@@ -1393,12 +1213,19 @@ def ejecutar_principal():
     for i, ruta in enumerate(archivos_csv_generados, 1):
         nombre = os.path.basename(ruta)
         if os.path.exists(ruta):
-            filas = sum(1 for _ in open(ruta, 'r', encoding='utf-8')) - 1  # Excluir encabezado
-            print(f"  {i}. {nombre} - {filas} filas")
+            print(f"  {i}. {nombre} - {filas_por_csv[ruta]} filas")
     print(f"📊 Total de filas combinadas: {total_filas_todos_periodos}")
     print(f"📧 Email enviado con {len(adjuntos_validos)} adjunto(s)")
     print("=" * 70)
 
 
 if __name__ == "__main__":
-    ejecutar_principal()
\ No newline at end of file
+    # La caché de hojas y el almacén viven en Drive entre corridas (ver utils.persistencia_utils)
+    persistencia = Persistencia()
+    persistencia.restaurar_directorio(NOMBRE_CACHE_DRIVE, CACHE_DIR)
+    persistencia.restaurar_archivo(NOMBRE_ALMACEN_DRIVE, ALMACEN_PATH)
+    try:
+        ejecutar_principal()
+    finally:
+        persistencia.guardar_archivo(NOMBRE_ALMACEN_DRIVE, ALMACEN_PATH)
+        persistencia.guardar_directorio(NOMBRE_CACHE_DRIVE, CACHE_DIR)
\ No newline at end of file
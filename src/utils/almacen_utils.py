@@ -0,0 +1,225 @@
+"""
+Almacén local (SQLite) de los datos unificados por período
+
+El unificador carga acá las filas de cada Unificado_<Mes><Año>.csv para
+que el reporte anual y las consultas puntuales lean de una base indexada
+en lugar de volver a descargar y parsear los libros de cada repartición.
+
+Tabla liquidaciones: una fila por registro del unificado (25 columnas)
+más anio y periodo. El período se guarda con la clave canónica de
+normalizar_nombre_hoja ("04", "1°sac", ...) para que "1º sac" y "1° sac"
+sean el mismo período. Índices por dni, cuil, codigo y (anio, periodo).
+
+El archivo vive en la carpeta PERSISTENCIA_CARPETA_ID de Drive entre
+corridas (utils.persistencia_utils): el unificador lo baja antes de cargar
+el mes y lo sube al terminar; el reporte anual sólo lo baja. Sin esa
+carpeta cada corrida empieza con el almacén vacío.
+
+Consultas puntuales:
+    python src/utils/almacen_utils.py "SELECT codigo, COUNT(DISTINCT dni) FROM liquidaciones WHERE anio=2025 GROUP BY codigo"
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bloque_utils import BloqueFilas
+from utils.common_utils import normalizar_nombre_hoja, obtener_zona_horaria
+
+ALMACEN_PATH = os.getenv("ALMACEN_PATH", "").strip() or os.path.join("almacen", "liquidaciones.db")
+# Nombre del almacén en la carpeta de persistencia de Drive
+NOMBRE_ALMACEN_DRIVE = "liquidaciones.db"
+
+# Columnas del unificado (mismo orden que los encabezados del CSV)
+COLUMNAS_TEXTO = [
+    "cuil", "dni", "tipo_doc", "nombre", "cod_liq", "sit_revista", "estado_afil", "reparticion",
+]
+COLUMNAS_IMPORTE = [
+    "aporte_personal", "adherente_sec", "fondo_v", "hijo_menor_35", "menor_a_cargo",
+    "cred_asist", "sueldo_sin_desc", "sueldo_con_desc", "reaj_aporte_pers",
+    "reaj_adherente_sec", "reaj_fv", "reaj_hijo_menor", "reaj_menor_a_cargo",
+    "reaj_cred_asist", "aporte_patronal", "reaj_aporte_patronal",
+]
+COLUMNAS = COLUMNAS_TEXTO + COLUMNAS_IMPORTE + ["codigo"]
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS liquidaciones (
+    anio    INTEGER NOT NULL,
+    periodo TEXT    NOT NULL,
+    {", ".join(f"{c} TEXT" for c in COLUMNAS_TEXTO)},
+    {", ".join(f"{c} REAL" for c in COLUMNAS_IMPORTE)},
+    codigo  TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_liq_periodo ON liquidaciones (anio, periodo);
+CREATE INDEX IF NOT EXISTS ix_liq_dni     ON liquidaciones (dni);
+CREATE INDEX IF NOT EXISTS ix_liq_cuil    ON liquidaciones (cuil);
+CREATE INDEX IF NOT EXISTS ix_liq_codigo  ON liquidaciones (codigo);
+
+CREATE TABLE IF NOT EXISTS periodos (
+    anio    INTEGER NOT NULL,
+    periodo TEXT    NOT NULL,
+    filas   INTEGER NOT NULL,
+    cargado TEXT    NOT NULL,
+    PRIMARY KEY (anio, periodo)
+);
+"""
+
+
+def conectar(ruta=None):
+    """Abre el almacén (creándolo si no existe) con el esquema al día."""
+    ruta = ruta or ALMACEN_PATH
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    conn = sqlite3.connect(ruta)
+    conn.executescript(_ESQUEMA)
+    return conn
+
+
+def _importe(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _registro(anio, clave, fila, n_texto=len(COLUMNAS_TEXTO), n_importes=len(COLUMNAS_IMPORTE)):
+    return (
+        anio, clave, *fila[:n_texto],
+        *(_importe(v) for v in fila[n_texto:n_texto + n_importes]),
+        fila[24] if len(fila) > 24 else "",
+    )
+
+
+class CargaPeriodo:
+    """
+    Carga incremental de un período: borra las filas previas de (anio,
+    periodo) y va insertando bloques con agregar() dentro de una única
+    transacción, que recién se confirma con confirmar(). Si la corrida se
+    corta antes (o se llama a descartar()), el almacén queda como estaba.
+    """
+
+    def __init__(self, anio, periodo, ruta=None):
+        self.anio = anio
+        self.clave = normalizar_nombre_hoja(periodo)
+        self.filas = 0
+        self.cerrada = False
+        self._conn = conectar(ruta)
+        self._sql = (
+            f"INSERT INTO liquidaciones (anio, periodo, {', '.join(COLUMNAS)}) "
+            f"VALUES ({', '.join('?' * (len(COLUMNAS) + 2))})"
+        )
+        self._conn.execute("DELETE FROM liquidaciones WHERE anio = ? AND periodo = ?", (anio, self.clave))
+
+    def agregar(self, filas):
+        """
+        Inserta un bloque de filas: un BloqueFilas (importes ya numéricos) o
+        listas de 25 valores como las del CSV unificado.
+        """
+        if isinstance(filas, BloqueFilas):
+            registros = ((self.anio, self.clave, *r) for r in filas.registros())
+        else:
+            registros = (_registro(self.anio, self.clave, f) for f in filas)
+        self._conn.executemany(self._sql, registros)
+        self.filas += len(filas)
+
+    def confirmar(self):
+        """Registra el período y confirma la transacción. Devuelve la cantidad de filas."""
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO periodos (anio, periodo, filas, cargado) VALUES (?, ?, ?, ?)",
+                (self.anio, self.clave, self.filas,
+                 datetime.now(obtener_zona_horaria()).isoformat(timespec="seconds")),
+            )
+            self._conn.commit()
+        finally:
+            self._cerrar()
+        return self.filas
+
+    def descartar(self):
+        """Deshace todo lo cargado desde el inicio y cierra la conexión."""
+        if self.cerrada:
+            return
+        try:
+            self._conn.rollback()
+        finally:
+            self._cerrar()
+
+    def _cerrar(self):
+        self._conn.close()
+        self.cerrada = True
+
+
+def cargar_periodo(anio, periodo, filas, ruta=None):
+    """
+    Reemplaza en el almacén las filas de (anio, periodo) por `filas`
+    (listas de 25 valores como las del CSV unificado, sin encabezado).
+    Es idempotente: volver a correr un período lo pisa completo.
+    """
+    carga = CargaPeriodo(anio, periodo, ruta)
+    try:
+        carga.agregar(filas)
+    except Exception:
+        carga.descartar()
+        raise
+    return carga.confirmar()
+
+
+def periodos_cargados(anio, ruta=None):
+    """{periodo canónico: cantidad de filas} de los períodos del año en el almacén."""
+    ruta = ruta or ALMACEN_PATH
+    if not os.path.exists(ruta):
+        return {}
+    with closing(conectar(ruta)) as conn:
+        return dict(conn.execute(
+            "SELECT periodo, filas FROM periodos WHERE anio = ?", (anio,)
+        ).fetchall())
+
+
+def anios_cargados(ruta=None):
+    """{año: cantidad de períodos cargados} ({} si el almacén no existe o está vacío)."""
+    ruta = ruta or ALMACEN_PATH
+    if not os.path.exists(ruta):
+        return {}
+    with closing(conectar(ruta)) as conn:
+        return dict(conn.execute(
+            "SELECT anio, COUNT(*) FROM periodos GROUP BY anio ORDER BY anio"
+        ).fetchall())
+
+
+def filas_periodo(anio, periodo, ruta=None):
+    """
+    Genera las filas de (anio, periodo) con el formato del CSV unificado
+    (texto, importes con 2 decimales), en el orden en que se cargaron, a
+    medida que se leen del cursor.
+    """
+    ruta = ruta or ALMACEN_PATH
+    if not os.path.exists(ruta):
+        return
+    n_texto = len(COLUMNAS_TEXTO)
+    n_importes = len(COLUMNAS_IMPORTE)
+    with closing(conectar(ruta)) as conn:
+        cursor = conn.execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM liquidaciones "
+            f"WHERE anio = ? AND periodo = ? ORDER BY rowid",
+            (anio, normalizar_nombre_hoja(periodo)),
+        )
+        for f in cursor:
+            yield list(f[:n_texto]) + [f"{v:.2f}" for v in f[n_texto:n_texto + n_importes]] + [f[-1]]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with closing(conectar()) as conn:
+        cursor = conn.execute(sys.argv[1])
+        if cursor.description:
+            print("|".join(d[0] for d in cursor.description))
+            for fila in cursor:
+                print("|".join("" if v is None else str(v) for v in fila))
@@ -0,0 +1,32 @@
+"""
+Apoyo para los benchmarks opt-in de los tests
+
+Los tests de rendimiento se saltean salvo con BENCHMARK=1. Con
+BENCHMARK_REF=<revisión de git> se mide también la versión de un módulo
+en esa revisión sobre los mismos datos (modulo_en_revision): así se
+compara contra la implementación anterior sin tenerla en el árbol.
+"""
+
+import importlib.util
+import os
+import subprocess
+import tempfile
+
+BENCHMARK = os.getenv("BENCHMARK", "").strip() == "1"
+BENCHMARK_REF = os.getenv("BENCHMARK_REF", "").strip()
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def modulo_en_revision(rev, ruta, nombre):
+    """Carga `ruta` (relativa a la raíz del repo) tal como estaba en la revisión `rev`."""
+    fuente = subprocess.run(["git", "show", f"{rev}:{ruta}"], cwd=RAIZ_REPO,
+                            capture_output=True, check=True).stdout
+    directorio = tempfile.mkdtemp()
+    archivo = os.path.join(directorio, f"{nombre}.py")
+    with open(archivo, "wb") as f:
+        f.write(fuente)
+    spec = importlib.util.spec_from_file_location(nombre, archivo)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
@@ -0,0 +1,131 @@
+"""
+Bloques columnares de filas extraídas
+
+Las filas de una hoja del unificado se guardan por columna: las de texto
+(A-H y el código de la columna 25) como listas, y los 16 importes (I-X)
+como array('q') de centavos. Así sumar una columna es sumar enteros
+(exacto y sin reparsear "1234.50") y una hoja ocupa una fracción de lo que
+ocupaban las listas de 25 str por fila.
+
+Las columnas de texto que se repiten en casi todas las filas (tipo doc,
+cod liq, situación de revista, estado, repartición y código) van
+codificadas por diccionario: una tabla de valores distintos por bloque y
+un array('I') con el índice de cada fila. El texto se arma recién al
+escribir (filas(), para el CSV), y los importes con formatear_centavos,
+que da lo mismo que el f"{x:.2f}" que se usaba antes.
+"""
+
+import math
+from array import array
+
+COLUMNAS_TEXTO = tuple(range(0, 8))      # A-H
+COLUMNAS_IMPORTE = tuple(range(8, 24))   # I-X
+COLUMNA_CODIGO = 24                      # 25-codigo
+ANCHO_FILA = 25
+
+# Columnas de texto con pocos valores distintos: tipo doc, cod liq,
+# sit revista, estado del afil, repartición y código
+COLUMNAS_CODIFICADAS = (2, 4, 5, 6, 7, COLUMNA_CODIGO)
+
+# Columnas de texto en el orden en que las guarda el bloque (A-H y el código)
+_COLUMNAS_BLOQUE = COLUMNAS_TEXTO + (COLUMNA_CODIGO,)
+_CODIFICADA = tuple(c in COLUMNAS_CODIFICADAS for c in _COLUMNAS_BLOQUE)
+
+
+def a_centavos(numero):
+    """
+    Centavos de un número redondeado a 2 decimales como lo hace f"{x:.2f}".
+    NaN e infinitos cuentan como 0.
+    """
+    if isinstance(numero, int):
+        return numero * 100
+    if not math.isfinite(numero):
+        return 0
+    return round(round(numero, 2) * 100)
+
+
+def texto_a_centavos(texto):
+    """Centavos de un importe en texto ("1234.50"); vacío o inválido es 0."""
+    if not texto:
+        return 0
+    try:
+        return a_centavos(float(texto))
+    except (TypeError, ValueError):
+        return 0
+
+
+def formatear_centavos(centavos):
+    """12345 -> "123.45", -5 -> "-0.05"."""
+    entero, resto = divmod(abs(centavos), 100)
+    return f"{'-' if centavos < 0 else ''}{entero}.{resto:02d}"
+
+
+class BloqueFilas:
+    """
+    Filas de una hoja en forma columnar.
+
+    textos[i]   columna de texto i (A-H; la 8 es el código de la columna 25):
+                lista de str, o array('I') de índices en `valores` si es una
+                de COLUMNAS_CODIFICADAS
+    importes[j] array('q') con los centavos de la columna 8 + j (I-X)
+    valores     tabla de valores distintos de las columnas codificadas
+    """
+
+    __slots__ = ("textos", "importes", "valores", "_indice")
+
+    def __init__(self):
+        self.textos = [array("I") if codificada else [] for codificada in _CODIFICADA]
+        self.importes = [array("q") for _ in COLUMNAS_IMPORTE]
+        self.valores = []
+        self._indice = {}
+
+    def __len__(self):
+        return len(self.textos[0])
+
+    def codificar(self, valor):
+        """Índice de `valor` en la tabla del bloque (lo agrega si es nuevo)."""
+        indice = self._indice.get(valor)
+        if indice is None:
+            indice = self._indice[valor] = len(self.valores)
+            self.valores.append(valor)
+        return indice
+
+    def agregar(self, textos, centavos, codigo):
+        """Agrega una fila: 8 textos, 16 importes en centavos y el código."""
+        for columna, valor, codificada in zip(self.textos, (*textos, codigo), _CODIFICADA):
+            columna.append(self.codificar(valor) if codificada else valor)
+        for columna, valor in zip(self.importes, centavos):
+            columna.append(valor)
+
+    def _decodificadas(self):
+        """Columnas de texto como iterables de str, en orden del bloque."""
+        valores = self.valores
+        return [
+            map(valores.__getitem__, columna) if codificada else columna
+            for columna, codificada in zip(self.textos, _CODIFICADA)
+        ]
+
+    def columna(self, indice):
+        """Columna de texto por índice del unificado (0-7 o 24), como lista de str."""
+        posicion = _COLUMNAS_BLOQUE.index(indice)
+        if _CODIFICADA[posicion]:
+            return [self.valores[i] for i in self.textos[posicion]]
+        return self.textos[posicion]
+
+    def sumas(self, columnas=COLUMNAS_IMPORTE):
+        """{columna: suma en centavos} de las columnas de importe pedidas."""
+        inicio = COLUMNAS_IMPORTE[0]
+        return {c: sum(self.importes[c - inicio]) for c in columnas}
+
+    def filas(self):
+        """Filas de 25 str con el formato del CSV unificado."""
+        *textos, codigos = self._decodificadas()
+        importes = [map(formatear_centavos, columna) for columna in self.importes]
+        for fila in zip(*textos, *importes, codigos):
+            yield list(fila)
+
+    def registros(self):
+        """Filas con los importes en pesos (float), para el almacén."""
+        *textos, codigos = self._decodificadas()
+        importes = [(c / 100 for c in columna) for columna in self.importes]
+        return zip(*textos, *importes, codigos)
@@ -0,0 +1,130 @@
+"""
+Caché local de hojas ya extraídas
+
+Las filas limpias de un período sólo cambian si cambia el archivo, así
+que se guardan en disco por (ID de Drive, md5Checksum, hoja, esquema) y
+se consultan antes de abrir o descargar el libro. Los Google Sheets no
+tienen md5: para ellos la versión es el modifiedTime.
+
+Cada entrada es un .bin con las filas en forma columnar (una tupla por
+columna), serializadas con pickle y comprimidas con zlib: las columnas
+repiten mucho (repartición, situación, "0.00") y comprimen bien. Si el
+extractor ya devuelve un objeto columnar (BloqueFilas) se guarda tal cual.
+
+El "esquema" identifica al extractor (ESQUEMA_CACHE de utils.esquema_utils,
+el mismo para el unificador y el reporte anual, que guardan las dos un
+Fragmento): si cambia la lógica de limpieza se sube la versión y las
+entradas viejas se ignoran. Lo que extrae un bot lo reaprovecha el otro.
+
+El directorio se guarda en Drive entre corridas (utils.persistencia_utils);
+podar_cache saca los archivos que ya no están en la carpeta para que no
+crezca con los libros de años anteriores.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import zlib
+
+from utils.common_utils import normalizar_nombre_hoja
+
+CACHE_DIR = os.getenv("CACHE_HOJAS_DIR", "").strip() or os.path.join("cache", "hojas")
+CACHE_HABILITADA = os.getenv("CACHE_HOJAS", "1").strip().lower() not in ("0", "false", "no")
+# Nombre del directorio de la caché en la carpeta de persistencia de Drive
+NOMBRE_CACHE_DRIVE = "cache_hojas.tar"
+
+_FORMATO_COLUMNAS = b"C1"
+_FORMATO_FILAS = b"F1"
+_FORMATO_OBJETO = b"O1"
+
+
+def version_archivo(archivo):
+    """md5Checksum del archivo o, si no tiene (Google Sheets), su modifiedTime."""
+    return archivo.get("md5Checksum") or archivo.get("modifiedTime")
+
+
+def _hash(texto):
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _ruta_cache(archivo, hoja, esquema):
+    """Ruta del .bin de la hoja, o None si el archivo no trae versión."""
+    version = version_archivo(archivo)
+    if not version:
+        return None
+    nombre = f"{_hash(version)}_{_hash(esquema + '|' + normalizar_nombre_hoja(hoja))}.bin"
+    return os.path.join(CACHE_DIR, archivo["id"], nombre)
+
+
+def leer_hoja_cacheada(archivo, hoja, esquema):
+    """
+    Devuelve las filas cacheadas de la hoja (lista de listas u objeto
+    columnar, según lo que se guardó; [] si la hoja no existía o estaba
+    vacía) o None si no hay entrada para esta versión.
+    """
+    if not CACHE_HABILITADA:
+        return None
+    ruta = _ruta_cache(archivo, hoja, esquema)
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "rb") as f:
+            formato = f.read(2)
+            contenido = pickle.loads(zlib.decompress(f.read()))
+        if formato == _FORMATO_COLUMNAS:
+            return [list(fila) for fila in zip(*contenido)]
+        if formato in (_FORMATO_FILAS, _FORMATO_OBJETO):
+            return contenido
+    except Exception as e:
+        print(f"   ⚠️ Caché ilegible para {archivo.get('name', archivo['id'])} [{hoja}]: {e}")
+    return None
+
+
+def guardar_hoja_cacheada(archivo, hoja, filas, esquema):
+    """
+    Guarda las filas extraídas de la hoja. Borra de paso las entradas de
+    versiones anteriores del mismo archivo.
+    """
+    if not CACHE_HABILITADA:
+        return
+    ruta = _ruta_cache(archivo, hoja, esquema)
+    if not ruta:
+        return
+    try:
+        directorio = os.path.dirname(ruta)
+        os.makedirs(directorio, exist_ok=True)
+
+        # Objetos columnares tal cual; listas en columnas si todas las filas
+        # tienen el mismo ancho, si no por filas
+        if not isinstance(filas, list):
+            formato, contenido = _FORMATO_OBJETO, filas
+        elif filas and len({len(f) for f in filas}) == 1:
+            formato, contenido = _FORMATO_COLUMNAS, tuple(zip(*filas))
+        else:
+            formato, contenido = _FORMATO_FILAS, [list(f) for f in filas]
+
+        tmp = ruta + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(formato)
+            f.write(zlib.compress(pickle.dumps(contenido, protocol=pickle.HIGHEST_PROTOCOL), 6))
+        os.replace(tmp, ruta)
+
+        prefijo = os.path.basename(ruta).split("_", 1)[0] + "_"
+        for nombre in os.listdir(directorio):
+            if not nombre.startswith(prefijo):
+                os.remove(os.path.join(directorio, nombre))
+    except OSError as e:
+        print(f"   ⚠️ No se pudo guardar la caché de {archivo.get('name', archivo['id'])} [{hoja}]: {e}")
+
+
+def podar_cache(ids_vigentes):
+    """Borra las entradas de los archivos que no están en ids_vigentes. Devuelve cuántos borró."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    borrados = 0
+    for archivo_id in os.listdir(CACHE_DIR):
+        if archivo_id not in ids_vigentes:
+            shutil.rmtree(os.path.join(CACHE_DIR, archivo_id), ignore_errors=True)
+            borrados += 1
+    return borrados
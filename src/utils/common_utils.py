@@ -4,6 +4,8 @@ Funciones comunes para ambos bots
 
 import time
 import os
+import re
+import threading
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -14,14 +16,63 @@ def obtener_zona_horaria():
 
 
 def nombre_mes(numero):
-    """Convierte número de mes a nombre"""
+    """Convierte número de mes a nombre (acepta "1° sac", "1º SAC", "1sac", ...)"""
     meses = {
         "01": "Enero", "02": "Febrero", "03": "Marzo", "04": "Abril",
-        "05": "Mayo", "06": "Junio", "1° sac": "1SAC", "07": "Julio",
+        "05": "Mayo", "06": "Junio", "1°sac": "1SAC", "07": "Julio",
         "08": "Agosto", "09": "Septiembre", "10": "Octubre", "11": "Noviembre",
-        "12": "Diciembre", "2º sac": "2SAC"
+        "12": "Diciembre", "2°sac": "2SAC"
     }
-    return meses.get(str(numero), "???")
+    return meses.get(normalizar_nombre_hoja(numero), "???")
+
+
+# ---------------------------------------------------------------------------
+# Resolución de nombres de hoja
+# ---------------------------------------------------------------------------
+
+# "º" (ordinal), "˚" (anillo) y "°" (grado) se usan indistintamente en los SAC
+_EQUIVALENTES_GRADO = str.maketrans({"º": "°", "˚": "°"})
+_RE_SAC = re.compile(r"([12])°?sac")
+
+# Índices de hojas por ID de archivo (dict: las operaciones son atómicas con el GIL)
+_indices_hojas = {}
+
+
+def normalizar_nombre_hoja(nombre):
+    """
+    Clave canónica de un nombre de hoja: minúsculas, sin espacios, º → °,
+    SAC como "1°sac"/"2°sac" y meses de un dígito con cero ("4" → "04").
+    """
+    clave = "".join(str(nombre).lower().translate(_EQUIVALENTES_GRADO).split())
+    m = _RE_SAC.fullmatch(clave)
+    if m:
+        return f"{m.group(1)}°sac"
+    if clave.isdigit() and len(clave) == 1:
+        return "0" + clave
+    return clave
+
+
+def indexar_hojas(nombres, file_id=None):
+    """
+    Arma {clave normalizada: nombre real} con las hojas de un libro. Si se
+    pasa file_id el índice queda cacheado para indice_hojas_cacheado().
+    """
+    indice = {}
+    for nombre in nombres:
+        indice.setdefault(normalizar_nombre_hoja(nombre), nombre)
+    if file_id:
+        _indices_hojas[file_id] = indice
+    return indice
+
+
+def indice_hojas_cacheado(file_id):
+    """Índice de hojas ya visto para el archivo, o None si todavía no se abrió."""
+    return _indices_hojas.get(file_id)
+
+
+def resolver_hoja(hoja, indice):
+    """Nombre real en el libro de la hoja pedida (p. ej. "1º sac" → "1° SAC"), o None."""
+    return indice.get(normalizar_nombre_hoja(hoja))
 
 
 def obtener_mes_anterior():
@@ -35,7 +86,7 @@ def obtener_anio(mes_a_procesar):
     ahora = datetime.now(obtener_zona_horaria())
     anio_actual = ahora.year
 
-    if mes_a_procesar == "12" or mes_a_procesar == "2° sac":
+    if normalizar_nombre_hoja(mes_a_procesar) in ("12", "2°sac"):
         return anio_actual - 1
 
     return anio_actual
@@ -80,3 +131,40 @@ def crear_directorio_salida():
     """Crea directorio para archivos generados"""
     os.makedirs("generados", exist_ok=True)
     return "generados"
+
+
+class LimitadorTasa:
+    """
+    Limitador de tasa (token bucket) compartido entre hilos.
+
+    Cada llamada a esperar() consume un token; los tokens se reponen a
+    `tasa` por segundo hasta un máximo de `rafaga`. penalizar() frena a
+    todos los hilos cuando la API responde con rate limit.
+    """
+
+    def __init__(self, tasa, rafaga=None):
+        self.tasa = max(float(tasa), 0.01)
+        self.rafaga = max(float(rafaga if rafaga is not None else tasa), 1.0)
+        self._tokens = self.rafaga
+        self._ultimo = time.monotonic()
+        self._bloqueado_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if ahora >= self._bloqueado_hasta and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = max(self._bloqueado_hasta - ahora, (1 - self._tokens) / self.tasa)
+            time.sleep(espera)
+
+    def penalizar(self, segundos):
+        """Suspende la emisión de tokens durante `segundos` (p. ej. tras un 429)."""
+        with self._lock:
+            self._bloqueado_hasta = max(self._bloqueado_hasta, time.monotonic() + segundos)
+            self._tokens = 0.0
@@ -0,0 +1,101 @@
+"""
+Escritura del CSV unificado (delimitador |, UTF-8) en generados/
+
+El CSV se arma a medida que llegan las filas de cada archivo, sin
+juntarlas antes en memoria, y se publica con su nombre definitivo recién
+cuando está completo.
+"""
+
+import csv
+import os
+
+from utils.bloque_utils import texto_a_centavos
+
+
+class EscritorCSV:
+    """
+    CSV con delimitador | en generados/ que se escribe a medida que llegan
+    las filas, sin juntarlas antes en memoria.
+
+    Se escribe sobre <nombre>.tmp y recién finalizar() lo renombra al nombre
+    definitivo (os.replace), así una corrida cortada a mitad de camino no
+    deja un CSV trunco con apariencia de completo. descartar() borra el
+    temporal; usado como context manager, lo que no se haya finalizado al
+    salir del bloque (por una excepción o por no tener filas) se descarta.
+
+    Con columnas_suma (índices de columnas numéricas) va sumando esas
+    columnas, en centavos, a partir del mismo texto que escribe:
+    self.sumas tiene los totales de lo que quedó en el archivo y escribir()
+    devuelve los del bloque, así nadie necesita releer el CSV para
+    verificarlo y los totales no dependen de cómo se armaron las filas.
+    """
+
+    def __init__(self, nombre_archivo, encabezados=None, columnas_suma=None):
+        os.makedirs("generados", exist_ok=True)
+        self.ruta = os.path.join("generados", nombre_archivo)
+        self._tmp = self.ruta + ".tmp"
+        self._f = open(self._tmp, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._f, delimiter="|", quoting=csv.QUOTE_MINIMAL)
+        self.columnas = len(encabezados) if encabezados else 0
+        self.filas = 0
+        self._columnas_suma = tuple(columnas_suma or ())
+        self.sumas = dict.fromkeys(self._columnas_suma, 0) if columnas_suma else None
+        if encabezados:
+            self._writer.writerow(encabezados)
+
+    def escribir(self, filas):
+        """
+        Agrega un bloque de filas (listas de str, p. ej. BloqueFilas.filas())
+        al final del archivo. Devuelve {columna: centavos del bloque} si se
+        pidieron columnas_suma.
+        """
+        if self.sumas is None:
+            n = self.filas
+            for fila in filas:
+                self._writer.writerow(fila)
+                n += 1
+            self.filas = n
+            return None
+
+        columnas = self._columnas_suma
+        minimo = max(columnas) + 1
+        acumulados = [0] * len(columnas)
+        escribir = self._writer.writerow
+        n = 0
+        for fila in filas:
+            escribir(fila)
+            n += 1
+            if len(fila) >= minimo:
+                for i, c in enumerate(columnas):
+                    acumulados[i] += texto_a_centavos(fila[c])
+        self.filas += n
+
+        sumas_bloque = dict(zip(columnas, acumulados))
+        for c, v in sumas_bloque.items():
+            self.sumas[c] += v
+        return sumas_bloque
+
+    def finalizar(self):
+        """Cierra el temporal y lo publica con el nombre definitivo. Devuelve la ruta."""
+        self._f.close()
+        os.replace(self._tmp, self.ruta)
+        print(f"💾 CSV guardado localmente con delimitador '|': {self.ruta} ({self.filas} filas de datos)")
+        print(f"   🔤 Codificación: UTF-8")
+        if self.columnas:
+            print(f"   📝 Formato: {self.columnas} columnas separadas por '|'")
+        return self.ruta
+
+    def descartar(self):
+        """Cierra y borra el temporal sin tocar un CSV anterior con el mismo nombre."""
+        if not self._f.closed:
+            self._f.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if not self._f.closed:
+            self.descartar()
+        return False
@@ -0,0 +1,94 @@
+"""
+Conteo de DNIs únicos para el reporte de aportantes
+
+Los DNIs se pasan a entero una sola vez por archivo (dnis_archivo) y se
+guardan como array('Q') ordenado y sin repetidos, en lugar de un set de
+str por archivo. La unión del período (DNIsUnicos) es un mapa de bits
+sobre el rango de DNI (< 100.000.000, 12,5 MB): agregar un archivo es
+prender bits y la cantidad de únicos es contar los bits prendidos.
+
+Lo que no entra en el mapa (CUIL cargados en la columna de DNI, valores
+con letras) va a un set aparte, que en la práctica queda casi vacío. Los
+valores numéricos se comparan como número: "01234567" y "1234567" son el
+mismo DNI.
+"""
+
+from array import array
+
+LIMITE_BITMAP = 100_000_000
+
+# Valores de la columna DNI que no cuentan como aportante
+_VACIOS = frozenset(("", "None", "nan"))
+
+
+def _es_numero(s):
+    return s.isdigit() and s.isascii() and len(s) <= 18
+
+
+def dnis_archivo(columna):
+    """
+    DNIs distintos de la columna B de un archivo: (array('Q') ordenado con
+    los numéricos, frozenset de str con los que no lo son).
+    """
+    distintos = set(columna)
+    distintos.discard("")
+    distintos.discard(None)
+    # Caso normal (columna ya limpia por convertir_documento): todo dígitos
+    try:
+        digitos = "".join(distintos)
+        if digitos.isascii() and digitos.isdigit():
+            return array("Q", sorted(set(map(int, distintos)))), frozenset()
+    except (TypeError, OverflowError):
+        pass
+    numericos = []
+    otros = set()
+    for valor in distintos:
+        if not valor:
+            continue
+        s = valor if type(valor) is str else str(valor)
+        if _es_numero(s):
+            numericos.append(s)
+            continue
+        # Formatos que no deja convertir_documento pero puede traer otra fuente
+        s = s.strip()
+        if s.endswith('.0'):
+            s = s[:-2]
+        if _es_numero(s):
+            numericos.append(s)
+        elif s not in _VACIOS:
+            otros.add(s)
+    return array("Q", sorted(set(map(int, numericos)))), frozenset(otros)
+
+
+def cantidad_dnis(dnis):
+    """Cantidad de DNIs distintos de un resultado de dnis_archivo."""
+    numericos, otros = dnis
+    return len(numericos) + len(otros)
+
+
+class DNIsUnicos:
+    """Unión de los DNIs de todos los archivos de un período."""
+
+    __slots__ = ("_bits", "_fuera_de_rango", "_otros")
+
+    def __init__(self):
+        self._bits = bytearray(LIMITE_BITMAP >> 3)
+        self._fuera_de_rango = set()
+        self._otros = set()
+
+    def agregar(self, dnis):
+        """Suma los DNIs de un archivo (resultado de dnis_archivo)."""
+        numericos, otros = dnis
+        bits = self._bits
+        for dni in numericos:
+            if dni < LIMITE_BITMAP:
+                bits[dni >> 3] |= 1 << (dni & 7)
+            else:
+                self._fuera_de_rango.add(dni)
+        self._otros.update(otros)
+
+    def __len__(self):
+        return (
+            int.from_bytes(self._bits, "little").bit_count()
+            + len(self._fuera_de_rango) + len(self._otros)
+        )
@@ -5,19 +5,34 @@ Funciones para interactuar con Google Drive
 import io
 import json
 import os
+import shutil
+import tempfile
 import time
 import traceback
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.oauth2.service_account import Credentials
+from google.oauth2.credentials import Credentials as CredencialesOAuth
+from google.auth.transport.requests import Request
 
 # Configuración común
 FOLDER_ID_REPARTICIONES = "1_Xb2jrtr3Sjwi8-2nhT2k53KZ6CLE5hJ"
 INTENTOS_MAX = 3
 ESPERA_REINTENTO = 5
+# Errores HTTP transitorios que se reintentan (además de los cortes de red, OSError)
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
 PAGINA_TAMANIO = 200  # Máximo por página
 
+# Descargas: se piden en rangos de CHUNK_DESCARGA bytes y se escriben en un
+# SpooledTemporaryFile que pasa a disco al superar UMBRAL_MEMORIA_DESCARGA.
+CHUNK_DESCARGA = int(float(os.getenv("DRIVE_CHUNK_MB", "").strip() or 8) * 1024 * 1024)
+UMBRAL_MEMORIA_DESCARGA = int(float(os.getenv("DRIVE_UMBRAL_MEMORIA_MB", "").strip() or 32) * 1024 * 1024)
+
+# Lectura parcial de .xlsx: bloques pedidos con Range y cacheados en memoria
+BLOQUE_REMOTO = 256 * 1024
+MIME_GSHEET = "application/vnd.google-apps.spreadsheet"
+
 
 def inicializar_drive():
     """Inicializa el servicio de Google Drive"""
@@ -32,6 +47,34 @@ def inicializar_drive():
         return None
 
 
+def inicializar_drive_escritura():
+    """
+    Servicio de Drive para crear o actualizar archivos. La cuenta de
+    servicio no tiene cuota en Mi unidad: con OAUTH_REFRESH_TOKEN se usa esa
+    cuenta (como el snapshot builder); sin él, la de servicio, que sólo
+    puede crear archivos en una unidad compartida.
+    """
+    if not os.getenv("OAUTH_REFRESH_TOKEN", "").strip():
+        return inicializar_drive()
+    try:
+        token_data = json.loads(os.getenv("OAUTH_REFRESH_TOKEN"))
+        creds = CredencialesOAuth(
+            token=token_data.get("token"),
+            refresh_token=token_data["refresh_token"],
+            token_uri=token_data["token_uri"],
+            client_id=token_data["client_id"],
+            client_secret=token_data["client_secret"],
+            scopes=token_data["scopes"]
+        )
+        if creds.expired:
+            creds.refresh(Request())
+        return build("drive", "v3", credentials=creds, cache_discovery=False)
+    except Exception as e:
+        print(f"❌ Error iniciando Drive (OAuth): {e}")
+        traceback.print_exc()
+        return None
+
+
 def request_drive_con_reintentos(funcion, descripcion):
     """Ejecuta una función de Drive con reintentos"""
     for intento in range(INTENTOS_MAX):
@@ -65,7 +108,7 @@ def obtener_archivos(servicio_drive, folder_id=None):
             request = servicio_drive.files().list(
                 q=query,
                 pageSize=PAGINA_TAMANIO,
-                fields="nextPageToken, files(id, name, mimeType)",
+                fields="nextPageToken, files(id, name, mimeType, size, md5Checksum, modifiedTime)",
                 supportsAllDrives=True,
                 includeItemsFromAllDrives=True,
                 pageToken=page_token
@@ -116,8 +159,45 @@ def obtener_archivos(servicio_drive, folder_id=None):
     return archivos_validos
 
 
+def descargar_a_archivo(request, descripcion="", chunksize=None, max_memoria=None, limitador=None):
+    """
+    Descarga un get_media/export_media en chunks con HTTP Range.
+
+    Si un chunk falla (corte de red o 429/5xx) se reintenta desde el último
+    byte recibido: MediaIoBaseDownload sólo avanza su progreso con chunks
+    completos, así que volver a llamar next_chunk() pide el mismo rango.
+    El contenido queda en un SpooledTemporaryFile posicionado al inicio,
+    en memoria hasta max_memoria bytes y en disco por encima.
+    """
+    fh = tempfile.SpooledTemporaryFile(max_size=max_memoria or UMBRAL_MEMORIA_DESCARGA)
+    downloader = MediaIoBaseDownload(fh, request, chunksize=chunksize or CHUNK_DESCARGA)
+    fallos = 0
+    terminado = False
+    try:
+        while not terminado:
+            if limitador:
+                limitador.esperar()
+            try:
+                _, terminado = downloader.next_chunk()
+                fallos = 0
+            except (HttpError, OSError) as e:
+                if isinstance(e, HttpError) and e.resp.status not in ESTADOS_REINTENTABLES:
+                    raise
+                fallos += 1
+                if fallos >= INTENTOS_MAX:
+                    raise
+                print(f"⏳ Error descargando {descripcion} en el byte {fh.tell()}, "
+                      f"reanudando ({fallos}/{INTENTOS_MAX - 1})...")
+                time.sleep(ESPERA_REINTENTO * fallos)
+    except Exception:
+        fh.close()
+        raise
+    fh.seek(0)
+    return fh
+
+
 def descargar_archivo(servicio_drive, archivo):
-    """Descarga un archivo de Drive"""
+    """Descarga un archivo de Drive (ver descargar_a_archivo)"""
     file_id = archivo["id"]
     mime = archivo["mimeType"]
     
@@ -130,15 +210,7 @@ def descargar_archivo(servicio_drive, archivo):
         else:
             req = servicio_drive.files().get_media(fileId=file_id)
         
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, req)
-        terminado = False
-        
-        while not terminado:
-            _, terminado = downloader.next_chunk()
-        
-        fh.seek(0)
-        return fh
+        return descargar_a_archivo(req, archivo["name"])
         
     except Exception as e:
         print(f"❌ Error descargando {archivo['name']}: {e}")
@@ -146,6 +218,190 @@ def descargar_archivo(servicio_drive, archivo):
         return None
 
 
+class ArchivoRemoto(io.RawIOBase):
+    """
+    Archivo de sólo lectura y con seek sobre el contenido de Drive.
+
+    Cada lectura pide con HTTP Range sólo los bloques que faltan (los
+    contiguos en una misma request) y los guarda en memoria. Sobre un .xlsx
+    permite que zipfile lea el directorio central al final del archivo y
+    luego únicamente los miembros que se abren (workbook.xml, la hoja
+    pedida, ...), sin descargar el libro completo.
+    """
+
+    def __init__(self, servicio_drive, file_id, tamanio, bloque=BLOQUE_REMOTO):
+        super().__init__()
+        self.servicio_drive = servicio_drive
+        self.file_id = file_id
+        self.tamanio = int(tamanio)
+        self.bloque = bloque
+        self.bytes_descargados = 0
+        self._pos = 0
+        self._bloques = {}
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.tamanio
+        if offset < 0:
+            raise ValueError("posición negativa")
+        self._pos = offset
+        return self._pos
+
+    def _pedir_rango(self, inicio, fin):
+        """Descarga los bytes [inicio, fin] con reintentos."""
+        for intento in range(INTENTOS_MAX):
+            req = self.servicio_drive.files().get_media(fileId=self.file_id)
+            req.headers["range"] = f"bytes={inicio}-{fin}"
+            try:
+                datos = req.execute()
+                self.bytes_descargados += len(datos)
+                return datos
+            except (HttpError, OSError) as e:
+                if isinstance(e, HttpError) and e.resp.status not in ESTADOS_REINTENTABLES:
+                    raise
+                if intento == INTENTOS_MAX - 1:
+                    raise
+                time.sleep(ESPERA_REINTENTO * (intento + 1))
+
+    def _cargar_bloques(self, primero, ultimo):
+        """Trae los bloques faltantes entre primero y ultimo (inclusive)."""
+        i = primero
+        while i <= ultimo:
+            if i in self._bloques:
+                i += 1
+                continue
+            j = i
+            while j + 1 <= ultimo and (j + 1) not in self._bloques:
+                j += 1
+            inicio = i * self.bloque
+            fin = min((j + 1) * self.bloque, self.tamanio) - 1
+            datos = self._pedir_rango(inicio, fin)
+            for k in range(i, j + 1):
+                desde = (k - i) * self.bloque
+                self._bloques[k] = datos[desde:desde + self.bloque]
+            i = j + 1
+
+    def readinto(self, b):
+        if self._pos >= self.tamanio or len(b) == 0:
+            return 0
+        fin = min(self._pos + len(b), self.tamanio)
+        primero, ultimo = self._pos // self.bloque, (fin - 1) // self.bloque
+        self._cargar_bloques(primero, ultimo)
+        escritos = 0
+        for k in range(primero, ultimo + 1):
+            datos = self._bloques[k]
+            desde = max(self._pos - k * self.bloque, 0)
+            hasta = min(fin - k * self.bloque, len(datos))
+            n = hasta - desde
+            b[escritos:escritos + n] = datos[desde:hasta]
+            escritos += n
+        self._pos += escritos
+        return escritos
+
+
+def abrir_archivo_excel(servicio_drive, archivo):
+    """
+    Devuelve un objeto archivo con el contenido del Excel para openpyxl.
+
+    Los .xlsx/.xlsm nativos con tamaño conocido se leen en forma remota por
+    rangos (ArchivoRemoto); los Google Sheets (hay que exportarlos) y los
+    .xls se descargan completos con descargar_archivo.
+    """
+    nombre = archivo["name"].lower()
+    tamanio = archivo.get("size")
+    if (archivo["mimeType"] != MIME_GSHEET and tamanio
+            and nombre.endswith((".xlsx", ".xlsm"))):
+        return ArchivoRemoto(servicio_drive, archivo["id"], tamanio)
+    return descargar_archivo(servicio_drive, archivo)
+
+
+def ejecutar_con_reintentos(request, descripcion):
+    """
+    Ejecuta un request de Drive reintentando los mismos errores que las
+    descargas (ESTADOS_REINTENTABLES y cortes de red); cualquier otro error
+    se propaga. Las subidas resumibles se mandan chunk a chunk y tras un
+    corte se retoma desde el último chunk confirmado.
+    """
+    fallos = 0
+    while True:
+        try:
+            if getattr(request, "resumable", None) is None:
+                return request.execute()
+            respuesta = None
+            while respuesta is None:
+                _, respuesta = request.next_chunk()
+            return respuesta
+        except (HttpError, OSError) as e:
+            if isinstance(e, HttpError) and e.resp.status not in ESTADOS_REINTENTABLES:
+                raise
+            fallos += 1
+            if fallos >= INTENTOS_MAX:
+                raise
+            print(f"⏳ Error {descripcion}, reintento {fallos}/{INTENTOS_MAX - 1}...")
+            time.sleep(ESPERA_REINTENTO * fallos)
+
+
+def buscar_en_carpeta(servicio_drive, carpeta_id, nombre):
+    """Metadatos (id, name, size, modifiedTime) del archivo `nombre` en la carpeta, o None."""
+    nombre_q = nombre.replace("\\", "\\\\").replace("'", "\\'")
+    res = ejecutar_con_reintentos(servicio_drive.files().list(
+        q=f"'{carpeta_id}' in parents and name='{nombre_q}' and trashed=false",
+        fields="files(id, name, size, modifiedTime)",
+        orderBy="modifiedTime desc",
+        pageSize=1,
+        supportsAllDrives=True,
+        includeItemsFromAllDrives=True,
+    ), f"buscando {nombre}")
+    encontrados = res.get("files", [])
+    return encontrados[0] if encontrados else None
+
+
+def descargar_de_carpeta(servicio_drive, carpeta_id, nombre, ruta):
+    """
+    Baja el archivo `nombre` de la carpeta a `ruta` (lo reemplaza recién al
+    terminar la descarga). Devuelve False si no está en la carpeta.
+    """
+    existente = buscar_en_carpeta(servicio_drive, carpeta_id, nombre)
+    if not existente:
+        return False
+    fh = descargar_a_archivo(servicio_drive.files().get_media(fileId=existente["id"]), nombre)
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with fh, open(ruta + ".tmp", "wb") as f:
+        shutil.copyfileobj(fh, f)
+    os.replace(ruta + ".tmp", ruta)
+    return True
+
+
+def subir_a_carpeta(servicio_drive, ruta, carpeta_id, nombre=None, mime="application/octet-stream"):
+    """
+    Sube el archivo local a la carpeta como `nombre` (por defecto el mismo
+    nombre): si ya hay uno se reemplaza su contenido (mismo ID, Drive guarda
+    la revisión anterior) y si no se crea. Devuelve el ID en Drive.
+    """
+    nombre = nombre or os.path.basename(ruta)
+    existente = buscar_en_carpeta(servicio_drive, carpeta_id, nombre)
+    media = MediaFileUpload(ruta, mimetype=mime, chunksize=CHUNK_DESCARGA, resumable=True)
+    if existente:
+        request = servicio_drive.files().update(
+            fileId=existente["id"], media_body=media, fields="id", supportsAllDrives=True)
+    else:
+        request = servicio_drive.files().create(
+            body={"name": nombre, "parents": [carpeta_id]},
+            media_body=media, fields="id", supportsAllDrives=True)
+    return ejecutar_con_reintentos(request, f"subiendo {nombre}")["id"]
+
+
 def guardar_csv_localmente(datos, nombre_archivo="UNIFICADO_MENSUAL.csv"):
     """Guarda CSV localmente usando | como delimitador con codificación UTF-8"""
     try:
@@ -164,20 +420,18 @@ def guardar_csv_localmente(datos, nombre_archivo="UNIFICADO_MENSUAL.csv"):
         print(f"💾 CSV guardado localmente con delimitador '|': {ruta} ({len(datos)} filas)")
         print(f"   🔤 Codificación: UTF-8")
         
-        # Verificar el formato
-        with open(ruta, 'r', encoding='utf-8') as f:
-            lineas = f.readlines()
-            if lineas:
-                print(f"   📝 Formato: {len(lineas[0].split('|'))} columnas separadas por '|'")
-                if len(lineas) > 1:
-                    # Mostrar primeros 100 caracteres de la segunda línea
-                    muestra = lineas[1][:100]
-                    print(f"   📊 Ejemplo primera fila de datos: {muestra}...")
-                    
-                    # Verificar si hay caracteres no ASCII (tildes deberían estar)
-                    non_ascii = sum(1 for c in muestra if ord(c) > 127)
-                    if non_ascii > 0:
-                        print(f"   ✅ Se detectaron {non_ascii} caracteres con tildes/acentos")
+        # Verificar el formato (con las filas en memoria, sin releer el archivo)
+        if datos:
+            print(f"   📝 Formato: {len(datos[0])} columnas separadas por '|'")
+            if len(datos) > 1:
+                # Mostrar primeros 100 caracteres de la primera fila de datos
+                muestra = "|".join("" if v is None else str(v) for v in datos[1])[:100]
+                print(f"   📊 Ejemplo primera fila de datos: {muestra}...")
+                
+                # Verificar si hay caracteres no ASCII (tildes deberían estar)
+                non_ascii = sum(1 for c in muestra if ord(c) > 127)
+                if non_ascii > 0:
+                    print(f"   ✅ Se detectaron {non_ascii} caracteres con tildes/acentos")
         
         return ruta
         
@@ -0,0 +1,177 @@
+"""
+Esquema de columnas de las planillas de liquidación
+
+Las planillas de cada repartición traen las columnas A-X; el unificador
+mensual y el reporte anual las limpian igual. El esquema se declara una
+vez (nombre y tipo de cada columna) y compilar_esquema lo convierte en una
+tupla de funciones de conversión, una por columna, así convertir una fila
+es un zip(conversores, fila) sin preguntar en cada celda de qué columna se
+trata.
+
+Tipos:
+    DOCUMENTO         CUIL / DNI: sólo dígitos
+    TEXTO             strip y "|" → "-", con tildes
+    TEXTO_SIN_TILDES  igual pero sin tildes
+    IMPORTE           centavos enteros (coma o varios puntos como separador)
+
+Las columnas marcadas como repetidas (tipo doc, cod liq, situación,
+estado, repartición) memoizan su conversión por valor crudo: se limpian
+una vez por valor distinto y todas las filas comparten el mismo str.
+"""
+
+from datetime import datetime
+
+from utils.bloque_utils import a_centavos
+from utils.texto_utils import normalizar_csv
+
+# Versión de la extracción de las hojas (este esquema + el corte de filas de
+# los bots) en la caché de hojas, compartida por el unificador y el reporte
+# anual: subirla si cambia la limpieza
+ESQUEMA_CACHE = "liquidacion.v1"
+
+DOCUMENTO = "documento"
+TEXTO = "texto"
+TEXTO_SIN_TILDES = "texto_sin_tildes"
+IMPORTE = "importe"
+
+# (nombre, tipo, repetida) en el orden de las columnas A-X
+ESQUEMA_LIQUIDACION = (
+    ("cuil", DOCUMENTO, False),
+    ("dni", DOCUMENTO, False),
+    ("tipo_doc", TEXTO, True),
+    ("nombre", TEXTO_SIN_TILDES, False),
+    ("cod_liq", TEXTO, True),
+    ("sit_revista", TEXTO_SIN_TILDES, True),
+    ("estado_afil", TEXTO, True),
+    ("reparticion", TEXTO_SIN_TILDES, True),
+    ("aporte_personal", IMPORTE, False),
+    ("adherente_sec", IMPORTE, False),
+    ("fondo_v", IMPORTE, False),
+    ("hijo_menor_35", IMPORTE, False),
+    ("menor_a_cargo", IMPORTE, False),
+    ("cred_asist", IMPORTE, False),
+    ("sueldo_sin_desc", IMPORTE, False),
+    ("sueldo_con_desc", IMPORTE, False),
+    ("reaj_aporte_pers", IMPORTE, False),
+    ("reaj_adherente_sec", IMPORTE, False),
+    ("reaj_fv", IMPORTE, False),
+    ("reaj_hijo_menor", IMPORTE, False),
+    ("reaj_menor_a_cargo", IMPORTE, False),
+    ("reaj_cred_asist", IMPORTE, False),
+    ("aporte_patronal", IMPORTE, False),
+    ("reaj_aporte_patronal", IMPORTE, False),
+)
+
+
+def convertir_documento(cell):
+    """CUIL / DNI: solo dígitos, sin formato."""
+    if cell is None:
+        return ""
+    if isinstance(cell, datetime):
+        return cell.strftime("%Y-%m-%d")
+    if isinstance(cell, (int, float)):
+        # Viene como número: convertir a int directamente
+        return str(int(cell))
+    # Viene como string: quitar puntos, guiones, espacios
+    cell_str = str(cell).strip()
+    cell_str = cell_str.replace('.', '').replace('-', '').replace(' ', '')
+    # Si aún tiene forma de float string (ej: "20271234560.0"), limpiar
+    if '.' in cell_str:
+        try:
+            cell_str = str(int(float(cell_str)))
+        except ValueError:
+            pass
+    return cell_str
+
+
+def _conversor_texto(sin_tildes):
+    def convertir_texto(cell):
+        if cell is None:
+            return ""
+        if isinstance(cell, datetime):
+            return cell.strftime("%Y-%m-%d")
+        if isinstance(cell, (int, float)):
+            # Numéricos en columnas de texto: sin ".0" final
+            if isinstance(cell, float) and cell.is_integer():
+                return str(int(cell))
+            cell_str = str(cell)
+            return cell_str[:-2] if cell_str.endswith('.0') else cell_str
+        return normalizar_csv(str(cell), sin_tildes)
+    return convertir_texto
+
+
+convertir_texto = _conversor_texto(False)
+convertir_texto_sin_tildes = _conversor_texto(True)
+
+
+def convertir_importe(cell):
+    """Importe en centavos; vacíos, fechas y texto no numérico valen 0."""
+    if cell is None:
+        return 0
+    tipo = type(cell)
+    if tipo is float:
+        # Caso más común; NaN e infinitos (cell - cell no es 0) valen 0
+        return round(round(cell, 2) * 100) if cell - cell == 0 else 0
+    if tipo is int:
+        return cell * 100
+    if isinstance(cell, datetime):
+        return 0
+    if isinstance(cell, (int, float)):
+        return a_centavos(cell)
+    cell_str = str(cell).strip()
+    if cell_str == "" or cell_str == "0" or cell_str.lower() == "nan":
+        return 0
+    # Coma decimal y, si hay varios puntos, sólo el último es decimal
+    cell_str = cell_str.replace(',', '.')
+    if cell_str.count('.') > 1:
+        partes = cell_str.split('.')
+        cell_str = ''.join(partes[:-1]) + '.' + partes[-1]
+    try:
+        return a_centavos(float(cell_str))
+    except ValueError:
+        return 0
+
+
+_CONVERSORES = {
+    DOCUMENTO: convertir_documento,
+    TEXTO: convertir_texto,
+    TEXTO_SIN_TILDES: convertir_texto_sin_tildes,
+    IMPORTE: convertir_importe,
+}
+
+
+def _memoizado(convertir):
+    """Memoiza un conversor por (tipo, valor crudo) de la celda."""
+    memo = {}
+
+    def convertir_memo(cell):
+        clave = (type(cell), cell)
+        valor = memo.get(clave)
+        if valor is None:
+            valor = memo[clave] = convertir(cell)
+        return valor
+    return convertir_memo
+
+
+def compilar_esquema(esquema):
+    """Tupla con el conversor de cada columna del esquema."""
+    return tuple(
+        _memoizado(_CONVERSORES[tipo]) if repetida else _CONVERSORES[tipo]
+        for _, tipo, repetida in esquema
+    )
+
+
+CONVERSORES_LIQUIDACION = compilar_esquema(ESQUEMA_LIQUIDACION)
+ANCHO_LIQUIDACION = len(CONVERSORES_LIQUIDACION)
+_RELLENO = (None,) * ANCHO_LIQUIDACION
+
+
+def convertir_fila(row, conversores=CONVERSORES_LIQUIDACION):
+    """
+    Convierte una fila cruda (values_only de openpyxl) con el esquema:
+    textos como str e importes como centavos. Las filas cortas se completan
+    como celdas vacías.
+    """
+    if len(row) < len(conversores):
+        row = (*row, *_RELLENO[:len(conversores) - len(row)])
+    return [convertir(cell) for convertir, cell in zip(conversores, row)]
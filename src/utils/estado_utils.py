@@ -0,0 +1,192 @@
+"""
+Checkpoints de corridas largas (unificador mensual y reporte anual)
+
+Si una corrida se corta a mitad de camino (errores 500 de Drive, runner
+interrumpido), lo ya procesado queda en ESTADO_DIR/<bot>/ y una nueva
+corrida con --resume (o REANUDAR=1) lo retoma sin volver a abrir esos
+archivos. El directorio se sube como artifact cuando la corrida falla y se
+restaura en la que reanuda.
+
+Por cada paso (un período, un mes) y archivo se guarda:
+- el resultado, si lo hay (.bin, pickle + zlib como la caché de hojas),
+  escrito en un temporal y renombrado, así nunca queda uno a medio
+  escribir;
+- una línea en diario.jsonl con la versión del archivo (md5Checksum) y un
+  resumen numérico (filas, sumas en centavos), que es el estado agregado
+  de la corrida.
+
+El diario sólo se agrega, una línea por archivo terminado: una línea
+cortada al final se ignora. La primera línea es la clave de la corrida
+(año, períodos, esquema); si no coincide, el estado es de otra corrida y se
+empieza de cero.
+
+Al terminar una corrida reanudada hay dos controles:
+- verificar() compara los totales de lo armado con la suma de los
+  resúmenes anotados al procesar cada archivo. Prueba que el estado está
+  entero y que se usó todo, no que dé lo mismo que una corrida en frío.
+- verificar_muestra() vuelve a procesar desde Drive algunos de los
+  archivos que salieron del estado (ESTADO_MUESTRA, 2 por defecto) y
+  compara su resumen con el guardado: eso sí contrasta lo reanudado con
+  una extracción en frío, aunque sólo para la muestra.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import random
+import shutil
+import sys
+import zlib
+
+ESTADO_DIR = os.getenv("ESTADO_DIR", "").strip() or "estado"
+ESTADO_MUESTRA = int(os.getenv("ESTADO_MUESTRA", "").strip() or 2)
+REANUDAR = "--resume" in sys.argv or os.getenv("REANUDAR", "").strip().lower() in ("1", "true", "si", "sí")
+
+
+def _nombre(paso, clave):
+    return hashlib.sha1(f"{paso}|{clave}".encode("utf-8")).hexdigest()[:20] + ".bin"
+
+
+class Checkpoint:
+    """
+    Estado de una corrida de `bot` identificada por `clave`. Con
+    reanudar=False (corrida normal) descarta el estado anterior y arranca
+    uno nuevo, que igual se va guardando por si hay que reanudarla.
+    """
+
+    def __init__(self, bot, clave, reanudar=REANUDAR):
+        self.directorio = os.path.join(ESTADO_DIR, bot)
+        self.clave = clave
+        self._diario = os.path.join(self.directorio, "diario.jsonl")
+        self._entradas = {}
+        if reanudar:
+            self._cargar()
+        if not self._entradas:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._diario, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"clave": clave}) + "\n")
+        self.reanudado = bool(self._entradas)
+        if reanudar:
+            if self.reanudado:
+                print(f"⏯️ Reanudando {bot}: {len(self._entradas)} entrada(s) ya procesadas en {self.directorio}")
+            else:
+                print(f"⏯️ Sin estado para reanudar {bot} ({clave}): se empieza de cero")
+
+    def _cargar(self):
+        if not os.path.exists(self._diario):
+            return
+        with open(self._diario, encoding="utf-8") as f:
+            lineas = f.read().split("\n")
+        try:
+            if json.loads(lineas[0]).get("clave") != self.clave:
+                return
+        except ValueError:
+            return
+        for linea in lineas[1:]:
+            try:
+                entrada = json.loads(linea)
+            except ValueError:
+                continue  # línea vacía o cortada por la interrupción
+            self._entradas[(entrada["paso"], entrada["clave"])] = entrada
+
+    def resumen(self, paso, clave, version):
+        """Resumen guardado de `clave` en el paso, o None si no está o es de otra versión."""
+        entrada = self._entradas.get((paso, clave))
+        if entrada is None or entrada["version"] != version:
+            return None
+        return entrada["resumen"]
+
+    def resultado(self, paso, clave, version):
+        """
+        Resultado guardado de `clave` (ID de archivo, mes) en el paso, o
+        None si no está o es de otra versión.
+        """
+        if self.resumen(paso, clave, version) is None:
+            return None
+        try:
+            with open(os.path.join(self.directorio, _nombre(paso, clave)), "rb") as f:
+                return pickle.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            print(f"   ⚠️ Estado ilegible para {clave} [{paso}], se vuelve a procesar: {e}")
+            del self._entradas[(paso, clave)]
+            return None
+
+    def guardar(self, paso, clave, version, resultado, resumen=None):
+        """
+        Guarda el resultado de `clave` en el paso y lo anota en el diario.
+        Con resultado None sólo se anota el resumen.
+        """
+        ruta = os.path.join(self.directorio, _nombre(paso, clave))
+        entrada = {"paso": paso, "clave": clave, "version": version, "resumen": resumen or {}}
+        try:
+            if resultado is not None:
+                with open(ruta + ".tmp", "wb") as f:
+                    f.write(zlib.compress(pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL), 1))
+                os.replace(ruta + ".tmp", ruta)
+            with open(self._diario, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada) + "\n")
+        except OSError as e:
+            print(f"   ⚠️ No se pudo guardar el estado de {clave} [{paso}]: {e}")
+            return
+        self._entradas[(paso, clave)] = entrada
+
+    def totales(self, paso, claves):
+        """Suma de los resúmenes guardados de `claves` en el paso (sólo campos numéricos)."""
+        totales = {}
+        for clave in claves:
+            entrada = self._entradas.get((paso, clave))
+            if entrada is None:
+                continue
+            for campo, valor in entrada["resumen"].items():
+                if isinstance(valor, dict):
+                    sub = totales.setdefault(campo, {})
+                    for k, v in valor.items():
+                        sub[k] = sub.get(k, 0) + v
+                else:
+                    totales[campo] = totales.get(campo, 0) + valor
+        return totales
+
+    def verificar(self, paso, claves, totales):
+        """
+        Compara `totales` (lo armado en esta corrida) con la suma de los
+        resúmenes guardados de `claves`. Devuelve True si coinciden. Sólo
+        prueba que el estado está entero; ver verificar_muestra().
+        """
+        esperados = self.totales(paso, claves)
+        if esperados == totales:
+            print(f"   ✅ Checkpoint [{paso}]: totales iguales a la suma de los resúmenes guardados")
+            return True
+        print(f"   ❌ Checkpoint [{paso}]: los totales no coinciden con los guardados")
+        print(f"      Esperado: {esperados}")
+        print(f"      Obtenido: {totales}")
+        return False
+
+    def verificar_muestra(self, paso, claves, reprocesar, cantidad=ESTADO_MUESTRA):
+        """
+        Vuelve a procesar en frío hasta `cantidad` de las `claves` que salieron
+        del checkpoint (reprocesar(clave) devuelve el resumen, o None si no se
+        pudo) y lo compara con el resumen guardado. Devuelve True si todos
+        los que se pudieron reprocesar coinciden.
+        """
+        claves = [c for c in claves if (paso, c) in self._entradas]
+        muestra = random.sample(claves, min(cantidad, len(claves)))
+        correctos = True
+        for clave in muestra:
+            esperado = self._entradas[(paso, clave)]["resumen"]
+            obtenido = reprocesar(clave)
+            if obtenido is None:
+                print(f"   ⚠️ Checkpoint [{paso}]: no se pudo reprocesar {clave} para la muestra")
+            elif obtenido == esperado:
+                print(f"   ✅ Checkpoint [{paso}]: {clave} reprocesado en frío da lo mismo que el guardado")
+            else:
+                print(f"   ❌ Checkpoint [{paso}]: {clave} reprocesado en frío no coincide con el guardado")
+                print(f"      Guardado: {esperado}")
+                print(f"      En frío:  {obtenido}")
+                correctos = False
+        return correctos
+
+    def finalizar(self):
+        """La corrida terminó bien: borra el estado."""
+        shutil.rmtree(self.directorio, ignore_errors=True)
@@ -12,6 +12,8 @@ from zoneinfo import ZoneInfo
 from io import BytesIO
 import os
 
+from utils.texto_utils import normalizar_csv, quitar_tildes
+
 
 def obtener_hoja_mes_anterior():
     """Obtiene el nombre de la hoja del mes anterior (MM)"""
@@ -28,47 +30,11 @@ def eliminar_tildes_latin(texto):
     Ejemplos:
     - "María González" → "Maria Gonzalez"
     - "José Pérez" → "Jose Perez"
-    - "Ñandú" → "Nandu"
     - "Über" → "Uber"
-    """
-    
-    # caracteres problemáticos
-    texto = texto.replace('Ã¡', 'a').replace('Ã¡', 'a')
-    texto = texto.replace('Ã©', 'e').replace('Ã‰', 'E')
-    texto = texto.replace('Ã­', 'i').replace('Ã', 'I')
-    texto = texto.replace('Ã³', 'o').replace('Ã“', 'O')
-    texto = texto.replace('Ãº', 'u').replace('Ãš', 'U')
-    texto = texto.replace('Ã±', 'ñ').replace('Ã‘', 'Ñ')
-    texto = texto.replace('Âº', '°')
-
-    # Diccionario de reemplazos para tildes y caracteres especiales
-    reemplazos_tildes = {
-        # Vocales minúsculas con tilde
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'à': 'a', 'è': 'e', 'ì': 'i', 'ò': 'o', 'ù': 'u',
-        'ä': 'a', 'ë': 'e', 'ï': 'i', 'ö': 'o', 'ü': 'u',
-        'â': 'a', 'ê': 'e', 'î': 'i', 'ô': 'o', 'û': 'u',
-        
-        # Vocales mayúsculas con tilde
-        'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
-        'À': 'A', 'È': 'E', 'Ì': 'I', 'Ò': 'O', 'Ù': 'U',
-        'Ä': 'A', 'Ë': 'E', 'Ï': 'I', 'Ö': 'O', 'Ü': 'U',
-        'Â': 'A', 'Ê': 'E', 'Î': 'I', 'Ô': 'O', 'Û': 'U',
-    }
-    
-    # Aplicar reemplazos
-    resultado = ""
-    for caracter in texto:
-        if caracter in reemplazos_tildes:
-            resultado += reemplazos_tildes[caracter]
-        else:
-            resultado += caracter
-    
-    # Asegurar que el texto sea compatible con CSV (| como separador)
-    # Reemplazar el separador de CSV si aparece en el texto
-    resultado = resultado.replace('|', '-')
     
-    return resultado
+    Usa las tablas de traducción (memoizadas) de utils.texto_utils.
+    """
+    return quitar_tildes(texto)
 
 
 def normalizar_texto(texto, eliminar_tildes_param=True):
@@ -80,28 +46,35 @@ def normalizar_texto(texto, eliminar_tildes_param=True):
         eliminar_tildes_param: Si True, elimina tildes. Si False, las mantiene.
                                Por defecto es True para columnas D y H.
     """
-    if texto is None:
-        return ""
-    
-    # Convertir a string si no lo es
-    if not isinstance(texto, str):
-        texto = str(texto)
-    
-    # Limpiar espacios
-    texto = texto.strip()
-    
-    # Si está vacío después de limpiar
-    if not texto:
-        return ""
-    
-    # SOLO si se solicita eliminar tildes
-    if eliminar_tildes_param:
-        return eliminar_tildes_latin(texto)
-    else:
-        # Mantener tildes, solo reemplazar separador
-        return texto.replace('|', '-')
+    return normalizar_csv(texto, eliminar_tildes_param)
+
 
 
+def listar_hojas_xlsx(fh):
+    """
+    Devuelve los nombres de las hojas de un .xlsx/.xlsm leyendo sólo
+    xl/workbook.xml del zip (sin sharedStrings ni hojas), o None si el
+    archivo no es un libro OOXML. Sobre un ArchivoRemoto esto descarga
+    apenas el directorio central y ese miembro.
+    """
+    try:
+        fh.seek(0)
+        with zipfile.ZipFile(fh) as z:
+            ruta_libro = "xl/workbook.xml"
+            try:
+                rels = ET.fromstring(z.read("_rels/.rels"))
+                for rel in rels:
+                    if rel.get("Type", "").endswith("/officeDocument"):
+                        ruta_libro = rel.get("Target", ruta_libro).lstrip("/")
+                        break
+            except KeyError:
+                pass
+            libro = ET.fromstring(z.read(ruta_libro))
+        ns = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        return [h.get("name") for h in libro.findall("main:sheets/main:sheet", ns)]
+    except (zipfile.BadZipFile, KeyError, ET.ParseError):
+        return None
+
 
 def sanitizar_libro_remover_filtros(fh):
     """
@@ -113,7 +86,8 @@ def sanitizar_libro_remover_filtros(fh):
         tmpdir = tempfile.mkdtemp()
         ruta_entrada = os.path.join(tmpdir, "input_file")
         with open(ruta_entrada, "wb") as f:
-            f.write(fh.getvalue())
+            fh.seek(0)
+            shutil.copyfileobj(fh, f)
 
         ruta_extraida = os.path.join(tmpdir, "extracted")
         os.makedirs(ruta_extraida, exist_ok=True)
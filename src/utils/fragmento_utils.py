@@ -0,0 +1,39 @@
+"""
+Aporte de cada archivo a un período del unificado
+
+Un Fragmento es todo lo que un libro de una repartición aporta al
+Unificado de un período: las filas (BloqueFilas, de donde salen el texto
+del CSV y lo que va al almacén), las sumas en centavos de las columnas de
+importe y sus DNIs distintos. Se guarda en la caché de hojas
+con la misma clave (ID de Drive + md5Checksum + hoja + esquema), así en
+una nueva corrida del mes sólo se extraen los archivos nuevos o
+modificados y el CSV, las sumatorias y el reporte de aportantes se arman
+juntando los fragmentos: una corrección tardía de una repartición cuesta
+un archivo, no la provincia entera. El reporte anual lee y guarda las
+mismas entradas.
+"""
+
+from utils.bloque_utils import COLUMNAS_IMPORTE
+from utils.dni_utils import cantidad_dnis, dnis_archivo
+
+
+class Fragmento:
+    """
+    bloque  BloqueFilas con las filas del archivo
+    sumas   {columna: centavos} de las columnas de importe
+    dnis    DNIs distintos de la columna B (resultado de dnis_archivo)
+    """
+
+    __slots__ = ("bloque", "sumas", "dnis")
+
+    def __init__(self, bloque):
+        self.bloque = bloque
+        self.sumas = bloque.sumas(COLUMNAS_IMPORTE)
+        self.dnis = dnis_archivo(bloque.columna(1))
+
+    def __len__(self):
+        return len(self.bloque)
+
+    @property
+    def cantidad_dnis(self):
+        return cantidad_dnis(self.dnis)
@@ -4,16 +4,23 @@ Utilidades del bot de monitoreo de liquidaciones.
 Contiene:
   - CONFIG / constantes (espejo del Apps Script)
   - Lógica de comparación (normal y caja)
-  - Generadores de adjuntos: XLSX de cambios y CSVs
+  - Generadores de adjuntos: XLSX de cambios (write_only) y CSVs
   - Helpers de nombres/periodos
 """
 
 import os
 import re
+from collections import namedtuple
 from datetime import datetime
+from itertools import chain
 
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from utils.common_utils import normalizar_nombre_hoja
+from utils.texto_utils import normalizar_clave
 
 
 # ---------------------------------------------------------------------------
@@ -32,6 +39,13 @@ CONFIG = {
 
     "FILA_INICIO_DEFAULT": 4,
     "FILA_INICIO_CAJA": 5,
+
+    # Ventana activa: meses hacia atrás que se comparan en cada corrida
+    "PERIODOS_ACTIVOS": 3,
+    # Meses que un SAC sigue abierto después de su mes (junio / diciembre)
+    "MESES_SAC_ABIERTO": 6,
+    # Día del mes en que se hace el barrido completo de auditoría (0 = nunca)
+    "DIA_BARRIDO_COMPLETO": 1,
 }
 
 HOJAS_ORDEN = [
@@ -39,6 +53,9 @@ HOJAS_ORDEN = [
     "07", "08", "09", "10", "11", "12", "2° sac",
 ]
 
+# Mes al que corresponde cada hoja (los SAC se liquidan con junio y diciembre)
+MES_POR_HOJA = {h: (6 if h == "1° sac" else 12 if h == "2° sac" else int(h)) for h in HOJAS_ORDEN}
+
 # Columnas numéricas (0-based dentro del rango A..X): cols 9-24 → offset 8-23
 COLS_NUMERICAS = set(range(8, 24))
 
@@ -90,12 +107,7 @@ def formatear_importe(val):
     return f"{parse_numero(val):.2f}"
 
 
-def normalizar_texto(s):
-    import unicodedata
-    t = str(s or "").upper()
-    t = unicodedata.normalize("NFD", t)
-    t = "".join(c for c in t if unicodedata.category(c) != "Mn")
-    return " ".join(t.split())
+normalizar_texto = normalizar_clave
 
 
 def limpiar_numero(s):
@@ -145,6 +157,65 @@ def _indexar(filas, hoja_registro, get_id_fn):
     return mapa
 
 
+# ---------------------------------------------------------------------------
+# Modelo de cambios: un registro por (agente, registro)
+# ---------------------------------------------------------------------------
+
+class CambioFila(namedtuple("CambioFila", "tipo id dni nombre registro mascara anteriores actuales fila")):
+    """
+    Cambio de una fila completa. Para "modificado", `mascara` tiene el bit c
+    prendido por cada columna distinta y `anteriores`/`actuales` guardan solo
+    los valores de esas columnas, en orden. `fila` es la fila actual (o la
+    eliminada) y se comparte con el mapa de la hoja, no se copia.
+    """
+    __slots__ = ()
+
+    @property
+    def cantidad(self):
+        """Celdas modificadas (1 para filas nuevas/eliminadas)."""
+        return bin(self.mascara).count("1") if self.tipo == "modificado" else 1
+
+    def columnas(self):
+        """Itera (col, anterior, actual) de las columnas modificadas."""
+        mascara, i, c = self.mascara, 0, 0
+        while mascara:
+            if mascara & 1:
+                yield c, self.anteriores[i], self.actuales[i]
+                i += 1
+            mascara >>= 1
+            c += 1
+
+
+def _cambio_fila(aid, dni, nombre, registro, fa, fs, cant_cols):
+    """Compara dos filas y devuelve un CambioFila "modificado" o None si son iguales."""
+    mascara = 0
+    anteriores = []
+    actuales = []
+    for c in range(cant_cols):
+        va = normalizar_cuil(str(fa[c] if len(fa) > c else "").strip(), c)
+        vs = normalizar_cuil(str(fs[c] if len(fs) > c else "").strip(), c)
+        if va != vs:
+            mascara |= 1 << c
+            anteriores.append(vs or "(vacío)")
+            actuales.append(va or "(vacío)")
+    if not mascara:
+        return None
+    return CambioFila("modificado", aid, dni, nombre, registro, mascara, tuple(anteriores), tuple(actuales), fa)
+
+
+def contar_cambios(cambios):
+    """Totales para el resumen: {"eliminados", "nuevos", "modificados" (celdas), "total"}."""
+    totales = {"eliminado": 0, "nuevo": 0, "modificado": 0}
+    for c in cambios:
+        totales[c.tipo] += c.cantidad
+    return {
+        "eliminados": totales["eliminado"],
+        "nuevos": totales["nuevo"],
+        "modificados": totales["modificado"],
+        "total": sum(totales.values()),
+    }
+
+
 # ---------------------------------------------------------------------------
 # Comparación modo normal
 # ---------------------------------------------------------------------------
@@ -164,7 +235,7 @@ def comparar_hojas_normal(datos_actual, datos_snap, hoja_registro):
             f = filas[0]
             dni = str(f[col_dni] if len(f) > col_dni else "").strip()
             nombre = f[3] if len(f) > 3 else "(sin nombre)"
-            cambios.append({"tipo": "eliminado", "dni": dni, "nombre": nombre, "fila": f})
+            cambios.append(CambioFila("eliminado", aid, dni, nombre, 1, 0, (), (), f))
 
     for aid, filas_act in mapa_act.items():
         fref = filas_act[0]
@@ -172,38 +243,25 @@ def comparar_hojas_normal(datos_actual, datos_snap, hoja_registro):
         nombre = fref[3] if len(fref) > 3 else "(sin nombre)"
 
         if aid not in mapa_snap:
-            for f in filas_act:
-                cambios.append({"tipo": "nuevo", "dni": dni, "nombre": nombre, "fila": f})
+            for i, f in enumerate(filas_act):
+                cambios.append(CambioFila("nuevo", aid, dni, nombre, i + 1, 0, (), (), f))
             continue
 
         filas_sn = mapa_snap[aid]
 
         # Filas eliminadas (había más antes)
         for i in range(len(filas_act), len(filas_sn)):
-            cambios.append({"tipo": "eliminado", "dni": dni, "nombre": nombre, "fila": filas_sn[i]})
+            cambios.append(CambioFila("eliminado", aid, dni, nombre, i + 1, 0, (), (), filas_sn[i]))
 
         # Filas nuevas (hay más ahora)
         for i in range(len(filas_sn), len(filas_act)):
-            cambios.append({"tipo": "nuevo", "dni": dni, "nombre": nombre, "fila": filas_act[i]})
+            cambios.append(CambioFila("nuevo", aid, dni, nombre, i + 1, 0, (), (), filas_act[i]))
 
         # Comparar fila a fila
         for i in range(min(len(filas_act), len(filas_sn))):
-            fa, fs = filas_act[i], filas_sn[i]
-            for c in range(cant_cols):
-                va = normalizar_cuil(str(fa[c] if len(fa) > c else "").strip(), c)
-                vs = normalizar_cuil(str(fs[c] if len(fs) > c else "").strip(), c)
-                if va != vs:
-                    cambios.append({
-                        "tipo": "modificado",
-                        "id": aid,
-                        "dni": dni,
-                        "nombre": nombre,
-                        "columna": NOMBRES_COLUMNAS[c] if c < len(NOMBRES_COLUMNAS) else f"col{c+1}",
-                        "anterior": vs or "(vacío)",
-                        "actual": va or "(vacío)",
-                        "es_no_numerico": c not in COLS_NUMERICAS,
-                        "fila": fa,
-                    })
+            cambio = _cambio_fila(aid, dni, nombre, i + 1, filas_act[i], filas_sn[i], cant_cols)
+            if cambio:
+                cambios.append(cambio)
 
     return {"cambios": cambios, "mapa_actual": mapa_act}
 
@@ -230,41 +288,15 @@ def comparar_hojas_caja(datos_actual, datos_snap, hoja_registro):
         nombre = fref[3] if len(fref) > 3 else "(sin nombre)"
 
         for i in range(len(fa_list), len(fs_list)):
-            cambios.append({
-                "tipo": "eliminado",
-                "dni": dni,
-                "nombre": nombre,
-                "registro": i + 1,
-                "fila": fs_list[i] if i < len(fs_list) else None
-            })
+            cambios.append(CambioFila("eliminado", aid, dni, nombre, i + 1, 0, (), (), fs_list[i]))
 
         for i in range(len(fs_list), len(fa_list)):
-            cambios.append({
-                "tipo": "nuevo",
-                "dni": dni,
-                "nombre": nombre,
-                "registro": i + 1,
-                "fila": fa_list[i] if i < len(fa_list) else None
-            })
+            cambios.append(CambioFila("nuevo", aid, dni, nombre, i + 1, 0, (), (), fa_list[i]))
 
         for i in range(min(len(fa_list), len(fs_list))):
-            fa, fs = fa_list[i], fs_list[i]
-            for c in range(cant_cols):
-                va = normalizar_cuil(str(fa[c] if len(fa) > c else "").strip(), c)
-                vs = normalizar_cuil(str(fs[c] if len(fs) > c else "").strip(), c)
-                if va != vs:
-                    cambios.append({
-                        "tipo": "modificado",
-                        "id": aid,
-                        "dni": dni,
-                        "nombre": nombre,
-                        "registro": i + 1,
-                        "columna": NOMBRES_COLUMNAS[c] if c < len(NOMBRES_COLUMNAS) else f"col{c+1}",
-                        "anterior": vs or "(vacío)",
-                        "actual": va or "(vacío)",
-                        "es_no_numerico": c not in COLS_NUMERICAS,
-                        "fila": fa,
-                    })
+            cambio = _cambio_fila(aid, dni, nombre, i + 1, fa_list[i], fs_list[i], cant_cols)
+            if cambio:
+                cambios.append(cambio)
 
     return {"cambios": cambios, "mapa_actual": grupos_act}
 
@@ -322,15 +354,19 @@ def generar_csv_modificados(modifs, nuevos, ruta):
     vistas = set()
     lineas = []
 
+    # Un CambioFila ya es una fila; solo se descartan filas idénticas del
+    # mismo agente que aparezcan en más de un período.
     for c in modifs:
-        clave = f"{c.get('id','')}_{c.get('fila','')}"
-        if clave not in vistas and c.get("fila"):
+        if not c.fila:
+            continue
+        clave = (c.id, tuple(c.fila))
+        if clave not in vistas:
             vistas.add(clave)
-            lineas.append(_fila_a_csv(c["fila"], cant_cols))
+            lineas.append(_fila_a_csv(c.fila, cant_cols))
 
     for c in nuevos:
-        if c.get("fila"):
-            lineas.append(_fila_a_csv(c["fila"], cant_cols))
+        if c.fila:
+            lineas.append(_fila_a_csv(c.fila, cant_cols))
 
     _escribir_csv(lineas, ruta)
 
@@ -368,7 +404,7 @@ def generar_csv_liquidacion_completa(mapa_agrupado, es_caja, ruta):
 
 
 # ---------------------------------------------------------------------------
-# Generador de XLSX de cambios (con openpyxl)
+# Generador de XLSX de cambios (openpyxl write_only)
 # ---------------------------------------------------------------------------
 
 # Estilos
@@ -399,102 +435,144 @@ _NUM_FMT = "#,##0.00"
 _ANCHOS = [14, 30, 22, 22, 14, 14, 14, 35] + [16] * 16
 
 
-def _celda(ws, row, col, valor, font=None, fill=None, border=None, align=None, num_fmt=None):
-    c = ws.cell(row=row, column=col, value=valor)
-    if font:
-        c.font = font
-    if fill:
-        c.fill = fill
-    if border:
-        c.border = border
-    if align:
-        c.alignment = align
-    if num_fmt:
-        c.number_format = num_fmt
+class _Estilos:
+    """
+    NamedStyles compartidos de un libro write_only: cada combinación de
+    fuente/relleno/borde/alineación/formato se registra una sola vez y las
+    celdas solo guardan el nombre.
+    """
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.nombres = {}
+
+    def __call__(self, font=None, fill=None, border=None, align=None, num_fmt=None):
+        clave = (id(font), id(fill), id(border), id(align), num_fmt)
+        nombre = self.nombres.get(clave)
+        if nombre is None:
+            nombre = f"cambios_{len(self.nombres)}"
+            estilo = NamedStyle(name=nombre)
+            if font:
+                estilo.font = font
+            if fill:
+                estilo.fill = fill
+            if border:
+                estilo.border = border
+            if align:
+                estilo.alignment = align
+            if num_fmt:
+                estilo.number_format = num_fmt
+            self.wb.add_named_style(estilo)
+            self.nombres[clave] = nombre
+        return nombre
+
+
+def _celda(ws, valor, estilo):
+    c = WriteOnlyCell(ws, value=valor)
+    c.style = estilo
     return c
 
 
+def _con_ultimo(iterable):
+    """Itera devolviendo (elemento, es_ultimo) sin materializar la secuencia."""
+    it = iter(iterable)
+    try:
+        anterior = next(it)
+    except StopIteration:
+        return
+    for actual in it:
+        yield anterior, False
+        anterior = actual
+    yield anterior, True
+
+
 def generar_xlsx_cambios(modifs, elims, nuevos, periodo, reparticion, ruta_salida):
-    wb = openpyxl.Workbook()
-    ws = wb.active
+    """
+    Genera el XLSX de cambios en modo write_only: las filas se emiten sección
+    por sección (modificados, eliminados, nuevos) sin armar la grilla en memoria.
+    Recibe CambioFila; elims y nuevos pueden ser cualquier iterable.
+    """
+    wb = openpyxl.Workbook(write_only=True)
     nombre_hoja = re.sub(r'[\\/:*?\[\]]', '-', str(periodo)).replace("°", "")[:31].strip()
-    ws.title = nombre_hoja
+    ws = wb.create_sheet(title=nombre_hoja)
+    estilo = _Estilos(wb)
 
     for i, ancho in enumerate(_ANCHOS, 1):
-        ws.column_dimensions[ws.cell(1, i).column_letter].width = ancho
+        ws.column_dimensions[get_column_letter(i)].width = ancho
 
-    row = 1
+    est_hdr = estilo(font=_FONT_HDR, fill=_FILL_HEADER, border=_BRD_N, align=_ALIGN_CTR)
 
     # ── REGISTROS MODIFICADOS ──
     if modifs:
-        _celda(ws, row, 1, "REGISTROS MODIFICADOS", font=_FONT_BLUE_S)
-        row += 1
+        ws.append([_celda(ws, "REGISTROS MODIFICADOS", estilo(font=_FONT_BLUE_S))])
 
         hdrs = ["DNI", "Nombre y Apellido", "Campo modificado", "Valor anterior", "Valor nuevo"]
-        for c_idx, h in enumerate(hdrs, 1):
-            _celda(ws, row, c_idx, h, font=_FONT_HDR, fill=_FILL_HEADER, border=_BRD_N, align=_ALIGN_CTR)
-        row += 1
+        ws.append([_celda(ws, h, est_hdr) for h in hdrs])
 
-        # Agrupar por DNI
+        # Agrupar por DNI (una fila del XLSX por columna modificada)
         grupos = {}
-        orden_dni = []
         for c in modifs:
-            d = c["dni"]
-            if d not in grupos:
-                grupos[d] = {"nombre": c["nombre"], "cambios": []}
-                orden_dni.append(d)
-            grupos[d]["cambios"].append(c)
-
-        for gi, dni in enumerate(orden_dni):
-            g = grupos[dni]
+            g = grupos.get(c.dni)
+            if g is None:
+                g = grupos[c.dni] = {"nombre": c.nombre, "cambios": []}
+            g["cambios"].append(c)
+
+        for gi, (dni, g) in enumerate(grupos.items()):
             fill = _FILL_BLUE if gi % 2 == 0 else _FILL_WHITE
-            cc = g["cambios"]
-            for i, c in enumerate(cc):
-                es_ult = i == len(cc) - 1
+            celdas_mod = ((col, ant, act) for c in g["cambios"] for col, ant, act in c.columnas())
+            for i, ((col, valor_ant, valor_act), es_ult) in enumerate(_con_ultimo(celdas_mod)):
                 brd = _BRD_B if es_ult else _BRD_N
-                campo = c["columna"]
-                idx_c = NOMBRES_COLUMNAS.index(campo) if campo in NOMBRES_COLUMNAS else -1
-                campo_label = f"{idx_c+1}-{campo}" if idx_c >= 0 else campo
+                est_txt = estilo(font=_FONT_NORMAL, fill=fill, border=brd, align=_ALIGN_LEFT)
+                campo_label = f"{col+1}-{NOMBRES_COLUMNAS[col]}" if col < len(NOMBRES_COLUMNAS) else f"col{col+1}"
 
-                _celda(ws, row, 1, dni if i == 0 else "", font=_FONT_NORMAL, fill=fill, border=brd, align=_ALIGN_LEFT)
-                _celda(ws, row, 2, g["nombre"] if i == 0 else "", font=_FONT_NORMAL, fill=fill, border=brd, align=_ALIGN_LEFT)
-                _celda(ws, row, 3, campo_label, font=_FONT_NORMAL, fill=fill, border=brd, align=_ALIGN_LEFT)
-
-                if c["es_no_numerico"]:
-                    _celda(ws, row, 4, str(c["anterior"]), font=_FONT_RED, fill=fill, border=brd, align=_ALIGN_LEFT)
-                    _celda(ws, row, 5, str(c["actual"]), font=_FONT_GREEN, fill=fill, border=brd, align=_ALIGN_LEFT)
+                if col not in COLS_NUMERICAS:
+                    anterior = _celda(ws, str(valor_ant), estilo(font=_FONT_RED, fill=fill, border=brd, align=_ALIGN_LEFT))
+                    actual = _celda(ws, str(valor_act), estilo(font=_FONT_GREEN, fill=fill, border=brd, align=_ALIGN_LEFT))
                 else:
-                    _celda(ws, row, 4, parse_numero(c["anterior"]), font=_FONT_RED, fill=fill, border=brd, align=_ALIGN_LEFT, num_fmt=_NUM_FMT)
-                    _celda(ws, row, 5, parse_numero(c["actual"]), font=_FONT_GREEN, fill=fill, border=brd, align=_ALIGN_LEFT, num_fmt=_NUM_FMT)
-                row += 1
-        row += 1
+                    anterior = _celda(ws, parse_numero(valor_ant), estilo(font=_FONT_RED, fill=fill, border=brd, align=_ALIGN_LEFT, num_fmt=_NUM_FMT))
+                    actual = _celda(ws, parse_numero(valor_act), estilo(font=_FONT_GREEN, fill=fill, border=brd, align=_ALIGN_LEFT, num_fmt=_NUM_FMT))
+
+                ws.append([
+                    _celda(ws, dni if i == 0 else "", est_txt),
+                    _celda(ws, g["nombre"] if i == 0 else "", est_txt),
+                    _celda(ws, campo_label, est_txt),
+                    anterior,
+                    actual,
+                ])
+        ws.append([])
 
     # ── Helper para secciones de filas completas ──
     def _seccion(titulo, lista, font_titulo, fill_fila, font_fila):
-        nonlocal row
-        _celda(ws, row, 1, titulo, font=font_titulo)
-        row += 1
-        for ci, enc in enumerate(ENCABEZADOS_EXCEL, 1):
-            _celda(ws, row, ci, enc, font=_FONT_HDR, fill=_FILL_HEADER, border=_BRD_N, align=_ALIGN_CTR)
-        row += 1
-        for i, c in enumerate(lista):
-            brd = _BRD_B if i == len(lista) - 1 else _BRD_N
-            fila = c.get("fila", [])
-            cant = CONFIG["COL_FIN"] - CONFIG["COL_INICIO"] + 1
+        filas = _con_ultimo(lista)
+        primera = next(filas, None)
+        if primera is None:
+            return
+        ws.append([_celda(ws, titulo, estilo(font=font_titulo))])
+        ws.append([_celda(ws, enc, est_hdr) for enc in ENCABEZADOS_EXCEL])
+
+        cant = CONFIG["COL_FIN"] - CONFIG["COL_INICIO"] + 1
+        estilos_fila = {
+            brd: (
+                estilo(font=font_fila, fill=fill_fila, border=brd, align=_ALIGN_CTR, num_fmt=_NUM_FMT),
+                estilo(font=font_fila, fill=fill_fila, border=brd, align=_ALIGN_LEFT),
+            )
+            for brd in (_BRD_N, _BRD_B)
+        }
+        for c, es_ult in chain([primera], filas):
+            est_num, est_txt = estilos_fila[_BRD_B if es_ult else _BRD_N]
+            fila = c.fila or []
+            celdas = []
             for ci in range(cant):
                 val = fila[ci] if ci < len(fila) else None
                 if ci in COLS_NUMERICAS:
-                    _celda(ws, row, ci+1, parse_numero(val), font=font_fila, fill=fill_fila, border=brd, align=_ALIGN_CTR, num_fmt=_NUM_FMT)
+                    celdas.append(_celda(ws, parse_numero(val), est_num))
                 else:
-                    _celda(ws, row, ci+1, str(val or ""), font=font_fila, fill=fill_fila, border=brd, align=_ALIGN_LEFT)
-            row += 1
-        row += 1
-
-    if elims:
-        _seccion("REGISTROS ELIMINADOS", elims, _FONT_RED_S, _FILL_RED, _FONT_WHITE)
+                    celdas.append(_celda(ws, str(val or ""), est_txt))
+            ws.append(celdas)
+        ws.append([])
 
-    if nuevos:
-        _seccion("REGISTROS NUEVOS", nuevos, _FONT_GRN_S, _FILL_GREEN, _FONT_WHITE)
+    _seccion("REGISTROS ELIMINADOS", elims, _FONT_RED_S, _FILL_RED, _FONT_WHITE)
+    _seccion("REGISTROS NUEVOS", nuevos, _FONT_GRN_S, _FILL_GREEN, _FONT_WHITE)
 
     wb.save(ruta_salida)
 
@@ -511,10 +589,10 @@ _MESES = {
 
 
 def hoja_a_periodo(hoja, anio):
-    hl = hoja.strip().lower().replace("º", "°")
-    if hl in ("1° sac", "1°sac"):
+    hl = normalizar_nombre_hoja(hoja)
+    if hl == "1°sac":
         return f"1° SAC/{anio}"
-    if hl in ("2° sac", "2°sac"):
+    if hl == "2°sac":
         return f"2° SAC/{anio}"
     h = hoja.strip()
     if h in _MESES:
@@ -522,6 +600,32 @@ def hoja_a_periodo(hoja, anio):
     return f"{h}/{anio}"
 
 
+def hojas_activas(anio, hoy=None, periodos_activos=None, meses_sac_abierto=None, barrido_completo=False):
+    """
+    Hojas de HOJAS_ORDEN que todavía pueden cambiar en un archivo del año `anio`:
+      - los últimos `periodos_activos` meses hasta el mes de `hoy` inclusive
+      - los SAC cuyo mes esté dentro de los últimos `meses_sac_abierto` meses
+    Los meses futuros y los ya congelados se omiten.
+    Con barrido_completo=True devuelve todas las hojas (auditoría).
+    """
+    if barrido_completo:
+        return list(HOJAS_ORDEN)
+    hoy = hoy or datetime.now()
+    if periodos_activos is None:
+        periodos_activos = CONFIG["PERIODOS_ACTIVOS"]
+    if meses_sac_abierto is None:
+        meses_sac_abierto = CONFIG["MESES_SAC_ABIERTO"]
+
+    indice_hoy = hoy.year * 12 + hoy.month - 1
+    activas = []
+    for hoja in HOJAS_ORDEN:
+        antiguedad = indice_hoy - (anio * 12 + MES_POR_HOJA[hoja] - 1)
+        ventana = meses_sac_abierto if "sac" in hoja else periodos_activos
+        if 0 <= antiguedad < ventana:
+            activas.append(hoja)
+    return activas
+
+
 def extraer_reparticion(nombre_archivo):
     sin_ext = nombre_archivo.replace(".xlsx", "").replace(".XLSX", "")
     partes = sin_ext.split("-")
@@ -0,0 +1,166 @@
+"""
+Datos locales que se guardan en Drive entre corridas
+
+actions/cache borra las entradas que pasan 7 días sin usarse, y el
+unificador corre una vez por mes (día 21) y el reporte anual a mano: la
+caché de hojas casi nunca llegaba a la corrida siguiente. Lo que tiene que
+sobrevivir se guarda en la carpeta PERSISTENCIA_CARPETA_ID de Drive. Se
+baja al empezar la corrida y se sube al terminar, aunque la corrida
+falle.
+
+- un archivo se sube tal cual, con su nombre en la carpeta;
+- un directorio se sube como un .tar (las entradas de la caché ya vienen
+  comprimidas).
+
+Lo que ya existe en local no se pisa con lo de Drive, así una corrida local
+no pierde lo suyo. Si nada cambió desde que se bajó, no se vuelve a subir;
+si no se pudo bajar (error de Drive, no "todavía no está"), tampoco: se
+subiría una copia sin lo anterior (p. ej. un almacén con sólo este mes).
+Sin PERSISTENCIA_CARPETA_ID todo queda sólo en la máquina de la corrida, y
+se avisa. Para escribir se usa OAUTH_REFRESH_TOKEN si está (ver
+inicializar_drive_escritura).
+"""
+
+import os
+import tarfile
+import traceback
+
+from utils.drive_utils import inicializar_drive_escritura, descargar_de_carpeta, subir_a_carpeta
+
+CARPETA_PERSISTENCIA_ID = os.getenv("PERSISTENCIA_CARPETA_ID", "").strip()
+
+
+def _firma(ruta):
+    """(nombre relativo, tamaño, mtime) de cada archivo bajo ruta: cambia si algo se escribió."""
+    if os.path.isfile(ruta):
+        st = os.stat(ruta)
+        return ((os.path.basename(ruta), st.st_size, st.st_mtime_ns),)
+    firma = []
+    for raiz, _, nombres in os.walk(ruta):
+        for nombre in nombres:
+            completo = os.path.join(raiz, nombre)
+            st = os.stat(completo)
+            firma.append((os.path.relpath(completo, ruta), st.st_size, st.st_mtime_ns))
+    return tuple(sorted(firma))
+
+
+class Persistencia:
+    """
+    Archivos y directorios locales respaldados en la carpeta de Drive.
+    Los errores de Drive se avisan y no cortan la corrida: a lo sumo esa
+    corrida empieza sin lo guardado o no lo actualiza.
+    """
+
+    def __init__(self, carpeta_id=None):
+        self.carpeta_id = CARPETA_PERSISTENCIA_ID if carpeta_id is None else carpeta_id
+        self._drive = None
+        self._firmas = {}
+        self._sin_restaurar = set()  # rutas que no se pudieron bajar: no se suben
+        if not self.carpeta_id:
+            print("⚠️ PERSISTENCIA_CARPETA_ID sin definir: la caché de hojas y el almacén "
+                  "no se guardan entre corridas")
+
+    def _servicio(self):
+        if self._drive is None and self.carpeta_id:
+            self._drive = inicializar_drive_escritura()
+            if self._drive is None:
+                print("⚠️ Sin acceso a Drive para la persistencia: se sigue sin ella")
+                self.carpeta_id = ""
+        return self._drive
+
+    def restaurar_archivo(self, nombre, ruta):
+        """Baja `nombre` a `ruta` si en local no existe. True si quedó restaurado."""
+        if os.path.exists(ruta):
+            # La copia local se sube al terminar aunque no cambie
+            print(f"ℹ️ {ruta} ya existe en local: no se baja de Drive")
+            return False
+        if not self._servicio():
+            return False
+        try:
+            if not descargar_de_carpeta(self._drive, self.carpeta_id, nombre, ruta):
+                print(f"ℹ️ {nombre} todavía no está en la carpeta de persistencia")
+                return False
+        except Exception as e:
+            print(f"⚠️ No se pudo bajar {nombre} de Drive: {e}")
+            traceback.print_exc()
+            self._sin_restaurar.add(ruta)
+            return False
+        self._firmas[ruta] = _firma(ruta)
+        print(f"📥 {nombre} restaurado desde Drive en {ruta}")
+        return True
+
+    def _puede_subir(self, nombre, ruta):
+        if ruta in self._sin_restaurar:
+            print(f"⚠️ {nombre} no se pudo bajar al empezar: no se sube, para no pisar la copia de Drive")
+            return False
+        if self._firmas.get(ruta) == _firma(ruta):
+            print(f"ℹ️ {nombre} sin cambios: no se sube")
+            return False
+        return True
+
+    def guardar_archivo(self, nombre, ruta):
+        """Sube `ruta` como `nombre` si cambió desde que se restauró. True si se subió."""
+        if not os.path.isfile(ruta) or not self._servicio() or not self._puede_subir(nombre, ruta):
+            return False
+        try:
+            subir_a_carpeta(self._drive, ruta, self.carpeta_id, nombre)
+        except Exception as e:
+            print(f"⚠️ No se pudo subir {nombre} a Drive: {e}")
+            traceback.print_exc()
+            return False
+        self._firmas[ruta] = _firma(ruta)
+        print(f"📤 {nombre} guardado en Drive ({os.path.getsize(ruta) / 1024 / 1024:.1f} MB)")
+        return True
+
+    def restaurar_directorio(self, nombre, directorio):
+        """
+        Baja el .tar `nombre` y lo extrae en `directorio`; los archivos que
+        ya existen en local se conservan. True si quedó restaurado.
+        """
+        if not self._servicio():
+            return False
+        tar = directorio.rstrip(os.sep) + ".tar"
+        habia_locales = os.path.isdir(directorio) and bool(_firma(directorio))
+        try:
+            if not descargar_de_carpeta(self._drive, self.carpeta_id, nombre, tar):
+                print(f"ℹ️ {nombre} todavía no está en la carpeta de persistencia")
+                return False
+            with tarfile.open(tar) as t:
+                miembros = [m for m in t.getmembers()
+                            if not os.path.exists(os.path.join(directorio, m.name))]
+                t.extractall(directorio, members=miembros, filter="data")
+        except Exception as e:
+            print(f"⚠️ No se pudo restaurar {nombre} desde Drive: {e}")
+            traceback.print_exc()
+            self._sin_restaurar.add(directorio)
+            return False
+        finally:
+            if os.path.exists(tar):
+                os.remove(tar)
+        if not habia_locales:
+            # Con archivos locales que Drive no tiene, se sube al terminar aunque no cambie
+            self._firmas[directorio] = _firma(directorio)
+        print(f"📥 {nombre} restaurado desde Drive en {directorio} ({len(miembros)} archivos)")
+        return True
+
+    def guardar_directorio(self, nombre, directorio):
+        """Sube `directorio` como el .tar `nombre` si cambió desde que se restauró."""
+        if (not os.path.isdir(directorio) or not self._servicio()
+                or not self._puede_subir(nombre, directorio)):
+            return False
+        tar = directorio.rstrip(os.sep) + ".tar"
+        try:
+            with tarfile.open(tar, "w") as t:
+                for entrada in sorted(os.listdir(directorio)):
+                    t.add(os.path.join(directorio, entrada), arcname=entrada)
+            subir_a_carpeta(self._drive, tar, self.carpeta_id, nombre)
+            print(f"📤 {nombre} guardado en Drive ({os.path.getsize(tar) / 1024 / 1024:.1f} MB)")
+        except Exception as e:
+            print(f"⚠️ No se pudo subir {nombre} a Drive: {e}")
+            traceback.print_exc()
+            return False
+        finally:
+            if os.path.exists(tar):
+                os.remove(tar)
+        self._firmas[directorio] = _firma(directorio)
+        return True
@@ -6,6 +6,7 @@ Mantiene el mismo esquema que el Apps Script:
   - Una hoja por repartición (nombre del archivo sin .xlsx)
   - Columnas: ID | CUIL | DNI | NOMBRE | FECHA_ALTA | ULTIMA_VEZ
   - Cache en memoria por (spreadsheet_id, nombre_hoja) para evitar llamadas redundantes
+  - Cache y altas de planillas/hojas protegidos con un lock (monitoreo usa un pool de hilos)
 
 El ID de cada planilla de registro se persiste en un archivo local
   /tmp/monitoreo_registro_ids.json
@@ -16,9 +17,9 @@ del día lo descubre desde Drive si el archivo no existe.)
 import json
 import os
 import re
+import threading
 import time
 import traceback
-import unicodedata
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -26,6 +27,8 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.oauth2.service_account import Credentials
 
+from utils.texto_utils import normalizar_clave
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -40,6 +43,9 @@ TZ_AR = ZoneInfo("America/Argentina/Buenos_Aires")
 # Cache en memoria: { "spreadsheet_id__nombre_hoja": { porCuil, porDni, porNombre, ultimoId } }
 _cache_registro: dict = {}
 
+# Serializa la carga del caché y el alta de planillas/hojas entre hilos
+_lock_registro = threading.RLock()
+
 # ---------------------------------------------------------------------------
 # Inicialización del servicio
 # ---------------------------------------------------------------------------
@@ -167,6 +173,11 @@ def obtener_o_crear_hoja_registro(sheets_svc, nombre_archivo):
     Devuelve un dict con toda la info necesaria para trabajar con la hoja:
       { "spreadsheet_id": str, "nombre_hoja": str, "sheets_svc": obj }
     """
+    with _lock_registro:
+        return _obtener_o_crear_hoja_registro(sheets_svc, nombre_archivo)
+
+
+def _obtener_o_crear_hoja_registro(sheets_svc, nombre_archivo):
     nombre_hoja = nombre_archivo.replace(".xlsx", "").replace(".XLSX", "")[:31]
     ids         = _cargar_ids_guardados()
 
@@ -209,11 +220,7 @@ def obtener_o_crear_hoja_registro(sheets_svc, nombre_archivo):
 # Normalización
 # ---------------------------------------------------------------------------
 
-def _normalizar(s):
-    t = str(s or "").upper()
-    t = unicodedata.normalize("NFD", t)
-    t = "".join(c for c in t if unicodedata.category(c) != "Mn")
-    return " ".join(t.split())
+_normalizar = normalizar_clave
 
 
 def _limpiar_num(s):
@@ -230,9 +237,17 @@ def _cargar_cache(hoja_info):
     svc   = hoja_info["sheets_svc"]
     clave = f"{sid}__{nhoja}"
 
-    if clave in _cache_registro:
-        return _cache_registro[clave]
+    with _lock_registro:
+        if clave in _cache_registro:
+            return _cache_registro[clave]
+
+    # La lectura se hace fuera del lock para no frenar a los otros hilos
+    cache = _leer_cache(svc, sid, nhoja)
+    with _lock_registro:
+        return _cache_registro.setdefault(clave, cache)
+
 
+def _leer_cache(svc, sid, nhoja):
     cache = {"porCuil": {}, "porDni": {}, "porNombre": {}, "ultimoId": 0, "filas": []}
     try:
         res = svc.spreadsheets().values().get(
@@ -257,7 +272,6 @@ def _cargar_cache(hoja_info):
     except Exception as e:
         print(f"  ⚠️  Error cargando caché de registro: {e}")
 
-    _cache_registro[clave] = cache
     return cache
 
 
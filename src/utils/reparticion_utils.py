@@ -0,0 +1,117 @@
+"""
+Clasificación de reparticiones por nombre de archivo
+
+Cada libro de liquidación se clasifica en un tipo de entidad (Municipios,
+Comunas, Cajas Municipales, ...) según su nombre. Los grupos de patrones se
+prueban en orden de prioridad y gana el primero que aparece en el nombre
+en minúsculas o en el nombre sin extensión con "-", "_" y espacios
+colapsados; si ninguno aparece el tipo es 'Otros'.
+
+Todos los grupos se compilan en una sola expresión: una alternativa por
+grupo, cada una con un lookahead que busca sus patrones en cualquier
+posición y un grupo con nombre que dice cuál ganó. Como la búsqueda se
+ancla al inicio, las alternativas se prueban en el orden de prioridad (no
+gana la coincidencia más a la izquierda). Los dos nombres se unen con un
+salto de línea, así "^" vale al inicio de cualquiera de los dos y un ".*"
+de un patrón no cruza de uno a otro.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+TIPO_SIN_CLASIFICAR = "Otros"
+
+# (grupo de la expresión, tipo de entidad, patrones) en orden de prioridad
+GRUPOS_REPARTICION = (
+    ("cajas", "Cajas Municipales", (
+        r'caja',
+        r'caja.*municipal',
+        r'caja.*provincial',
+        r'banco.*municipal',
+        r'caja de jubilaciones',
+        r'caja de previsión',
+        r'caja de prevision',
+    )),
+    ("escuela", "Escuela", (
+        r'idessa',
+        r'escuela',
+        r'instituto.*educacion',
+        r'instituto.*educación',
+        r'colegio',
+        r'universidad',
+        r'facultad',
+    )),
+    ("entes", "Entes Descentralizados", (
+        r'ente',
+        r'ente.*descentralizado',
+        r'ente.*autarq',
+        r'autarquico',
+        r'autárquico',
+        r'instituto.*autarq',
+        r'organismo.*descentralizado',
+        r'entidad.*autonoma',
+        r'entidad.*autónoma',
+        r'autarq',
+    )),
+    ("comunas", "Comunas", (
+        r'comuna',
+        r'^com\.',
+        r'comuna de',
+    )),
+    ("municipios", "Municipios", (
+        r'municipio',
+        r'municipalidad',
+        r'intendencia',
+        r'municipal',
+        r'^mun\.',
+        r'municipio de',
+    )),
+    ("pasantias", "Pasantias", (
+        r'pasantias',
+        r'pasantia',
+    )),
+)
+
+TIPOS_REPARTICION = tuple(tipo for _, tipo, _ in GRUPOS_REPARTICION) + (TIPO_SIN_CLASIFICAR,)
+
+
+def compilar_clasificador(grupos):
+    """Una sola expresión con un grupo con nombre por tipo, en orden de prioridad."""
+    alternativas = "|".join(
+        f"(?=(?s:.*?)(?P<{grupo}>{'|'.join(patrones)}))"
+        for grupo, _, patrones in grupos
+    )
+    return re.compile(f"(?:{alternativas})", re.MULTILINE)
+
+
+_CLASIFICADOR = compilar_clasificador(GRUPOS_REPARTICION)
+_TIPO_POR_GRUPO = {grupo: tipo for grupo, tipo, _ in GRUPOS_REPARTICION}
+_SEPARADORES = re.compile(r'[-_\s]+')
+
+
+@lru_cache(maxsize=4096)
+def clasificar_reparticion(nombre_archivo):
+    """
+    Tipo de entidad de un archivo por su nombre ('Otros' si no coincide
+    ningún patrón). Memoizado: cada nombre se clasifica una vez por corrida.
+    """
+    nombre_lower = nombre_archivo.lower()
+    nombre_sin_ext = _SEPARADORES.sub(' ', os.path.splitext(nombre_lower)[0]).strip()
+    coincidencia = _CLASIFICADOR.match(f"{nombre_lower}\n{nombre_sin_ext}")
+    if coincidencia is None:
+        return TIPO_SIN_CLASIFICAR
+    return _TIPO_POR_GRUPO[coincidencia.lastgroup]
+
+
+def clasificar_archivos(archivos):
+    """{id de archivo: tipo de entidad} para una lista de archivos de Drive."""
+    return {archivo['id']: clasificar_reparticion(archivo['name']) for archivo in archivos}
+
+
+def contar_por_tipo(tipos_por_archivo):
+    """{tipo: cantidad de archivos} en el orden de TIPOS_REPARTICION (sólo los presentes)."""
+    cantidades = dict.fromkeys(TIPOS_REPARTICION, 0)
+    for tipo in tipos_por_archivo.values():
+        cantidades[tipo] += 1
+    return {tipo: cantidad for tipo, cantidad in cantidades.items() if cantidad}
@@ -0,0 +1,230 @@
+"""
+Casos dorados del XLSX de cambios (generar_xlsx_cambios, write_only)
+
+Lo esperado es la salida de la versión anterior (Workbook normal, celda por
+celda) para la misma comparación: valores, fuentes, rellenos, bordes,
+alineación, formato numérico y anchos de columna.
+
+    python -m pytest src/utils/test_monitoreo_utils.py
+
+El rendimiento se mide aparte (opt-in), con BENCHMARK_CAMBIOS cambios
+(80% modificados, 10% eliminados, 10% nuevos). Con BENCHMARK_REF se mide
+también la versión de esa revisión de git sobre los mismos datos, por
+ejemplo la anterior al write_only:
+
+    BENCHMARK=1 BENCHMARK_REF=dbfdb19~1 python -m pytest -s src/utils/test_monitoreo_utils.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+from utils import monitoreo_utils
+from utils.benchmark_utils import BENCHMARK, BENCHMARK_REF, modulo_en_revision
+from utils.monitoreo_utils import comparar_hojas_normal, generar_xlsx_cambios
+
+BENCHMARK_CAMBIOS = int(os.getenv("BENCHMARK_CAMBIOS", "").strip() or 50000)
+# write_only no guarda las filas; lo que crece es la tabla de strings
+# compartidos del libro (cada DNI y nombre distinto): ~0,25 MB cada mil
+PICO_MAX_MB_POR_MIL = 0.4
+
+
+def _fila(cuil, dni, nombre, importes, sit="Activo"):
+    return [cuil, dni, "DNI", nombre, "100", sit, "A", "Municipalidad"] + importes
+
+
+_BASE = ["1000,50", "0", "25,00"] + ["0"] * 13
+
+SNAPSHOT = [
+    _fila("20-11111111-3", "11111111", "PÉREZ JUAN", _BASE),
+    _fila("27-22222222-4", "22222222", "GÓMEZ ANA", _BASE),
+    _fila("20-33333333-5", "33333333", "RUIZ LUIS", _BASE),
+]
+ACTUAL = [
+    _fila("20-11111111-3", "11111111", "PÉREZ JUAN", ["1200,75", "0", "30,00"] + ["0"] * 13),
+    _fila("27-22222222-4", "22222222", "GÓMEZ ANA", _BASE, sit="Licencia"),
+    _fila("20-44444444-6", "44444444", "SOSA EVA", ["900,00"] + ["0"] * 15),
+]
+
+# (color de fuente, negrita, relleno, borde inferior, alineación, formato)
+ESTILOS = {
+    "tit_mod": ("00215C98", True, None, None, None, "General"),
+    "tit_eli": ("00C83C2D", True, None, None, None, "General"),
+    "tit_nue": ("00275317", True, None, None, None, "General"),
+    "enc": ("008ED973", True, "00074F69", "thin", "center", "General"),
+    "azul": (None, False, "00EFF6FF", "thin", "left", "General"),
+    "azul_ant": ("00B91C1C", False, "00EFF6FF", "thin", "left", "#,##0.00"),
+    "azul_act": ("0015803D", True, "00EFF6FF", "thin", "left", "#,##0.00"),
+    "azul_ult": (None, False, "00EFF6FF", "medium", "left", "General"),
+    "azul_ult_ant": ("00B91C1C", False, "00EFF6FF", "medium", "left", "#,##0.00"),
+    "azul_ult_act": ("0015803D", True, "00EFF6FF", "medium", "left", "#,##0.00"),
+    "blanco_ult": (None, False, "00FFFFFF", "medium", "left", "General"),
+    "blanco_ult_ant": ("00B91C1C", False, "00FFFFFF", "medium", "left", "General"),
+    "blanco_ult_act": ("0015803D", True, "00FFFFFF", "medium", "left", "General"),
+    "eli_txt": ("00FFFFFF", True, "00C83C2D", "medium", "left", "General"),
+    "eli_num": ("00FFFFFF", True, "00C83C2D", "medium", "center", "#,##0.00"),
+    "nue_txt": ("00FFFFFF", True, "00275317", "medium", "left", "General"),
+    "nue_num": ("00FFFFFF", True, "00275317", "medium", "center", "#,##0.00"),
+}
+
+_ENCABEZADOS = [
+    "1-cuil", "2-dni", "3-tipo doc", "4-nombre y apellido", "5-cod. liq.",
+    "6-sit. revista", "7-estado afil.", "8-reparticion", "9-aporte personal",
+    "10-adherente sec.", "11-fondo vol.", "12-hijo menor de 35", "13-menor a cargo",
+    "14-cred. asist.", "15-sueldo sin desc.", "16-sueldo con desc.",
+    "17-reaj. aporte pers.", "18-reaj. adh. sec.", "19-reaj. fv",
+    "20-reaj. hijo menor", "21-reaj. menor cargo", "22-reaj. cred. asist.",
+    "23-aporte patronal", "24-reaj. ap. patronal",
+]
+
+# (valores, estilos) de cada fila de la hoja; [] es una fila en blanco
+ESPERADO = [
+    (["REGISTROS MODIFICADOS"], ["tit_mod"]),
+    (["DNI", "Nombre y Apellido", "Campo modificado", "Valor anterior", "Valor nuevo"], ["enc"] * 5),
+    (["11111111", "PÉREZ JUAN", "9-aporte personal", 1000.5, 1200.75],
+     ["azul"] * 3 + ["azul_ant", "azul_act"]),
+    ([None, None, "11-fondo vol.", 25, 30],
+     ["azul_ult"] * 3 + ["azul_ult_ant", "azul_ult_act"]),
+    (["22222222", "GÓMEZ ANA", "6-sit. revista", "Activo", "Licencia"],
+     ["blanco_ult"] * 3 + ["blanco_ult_ant", "blanco_ult_act"]),
+    ([], []),
+    (["REGISTROS ELIMINADOS"], ["tit_eli"]),
+    (_ENCABEZADOS, ["enc"] * 24),
+    (["20-33333333-5", "33333333", "DNI", "RUIZ LUIS", "100", "Activo", "A", "Municipalidad",
+      1000.5, 0, 25] + [0] * 13,
+     ["eli_txt"] * 8 + ["eli_num"] * 16),
+    ([], []),
+    (["REGISTROS NUEVOS"], ["tit_nue"]),
+    (_ENCABEZADOS, ["enc"] * 24),
+    (["20-44444444-6", "44444444", "DNI", "SOSA EVA", "100", "Activo", "A", "Municipalidad",
+      900] + [0] * 15,
+     ["nue_txt"] * 8 + ["nue_num"] * 16),
+]
+
+_VACIA = (None, (None, False, None, None, None, "General"))
+
+
+def _firma(celda):
+    font, fill, borde, alin = celda.font, celda.fill, celda.border, celda.alignment
+    color = font.color.rgb if font is not None and font.color is not None else None
+    return celda.value, (
+        color if isinstance(color, str) else None,
+        bool(font.b) if font is not None else False,
+        fill.fgColor.rgb if fill is not None and fill.fill_type else None,
+        borde.bottom.style if borde is not None and borde.bottom is not None else None,
+        alin.horizontal if alin is not None else None,
+        celda.number_format,
+    )
+
+
+class TestXlsxCambios(unittest.TestCase):
+
+    def setUp(self):
+        cambios = comparar_hojas_normal(ACTUAL, SNAPSHOT, None)["cambios"]
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, "cambios.xlsx")
+        generar_xlsx_cambios(
+            [c for c in cambios if c.tipo == "modificado"],
+            (c for c in cambios if c.tipo == "eliminado"),
+            (c for c in cambios if c.tipo == "nuevo"),
+            "1° SAC/2025", "Municipalidad", self.ruta,
+        )
+        self.ws = openpyxl.load_workbook(self.ruta).active
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_hoja_y_anchos(self):
+        self.assertEqual(self.ws.title, "1 SAC-2025")
+        anchos = [self.ws.column_dimensions[get_column_letter(i)].width for i in range(1, 25)]
+        self.assertEqual(anchos, [14, 30, 22, 22, 14, 14, 14, 35] + [16] * 16)
+
+    def test_celdas(self):
+        filas = []
+        for fila in self.ws.iter_rows():
+            firmas = [_firma(c) for c in fila if hasattr(c, "font")]
+            while firmas and firmas[-1] == _VACIA:
+                firmas.pop()
+            filas.append(firmas)
+
+        self.assertEqual(len(filas), len(ESPERADO))
+        for n, (firmas, (valores, estilos)) in enumerate(zip(filas, ESPERADO), 1):
+            with self.subTest(fila=n):
+                self.assertEqual([v for v, _ in firmas], valores)
+                self.assertEqual([e for _, e in firmas], [ESTILOS[e] for e in estilos])
+
+
+def _datos_benchmark(n):
+    """(actual, snapshot) con n cambios: cada modificado es un importe distinto."""
+    azar = random.Random(1)
+    snapshot, actual = [], []
+    for i in range(n):
+        dni = str(20000000 + i)
+        importes = [f"{azar.random() * 1000:.2f}".replace(".", ",") for _ in range(16)]
+        fila = _fila(f"20-{dni}-3", dni, f"AGENTE {i}", importes)
+        tipo = i % 10
+        if tipo < 8:
+            cambiada = list(fila)
+            cambiada[8 + azar.randrange(16)] = "1,50"
+            snapshot.append(fila)
+            actual.append(cambiada)
+        elif tipo == 8:
+            snapshot.append(fila)
+        else:
+            actual.append(fila)
+    return actual, snapshot
+
+
+def _medir(modulo, actual, snapshot, ruta):
+    """
+    (segundos, pico en MB) de generar_xlsx_cambios de `modulo` para la
+    comparación. El tiempo se toma sin tracemalloc, que lo multiplica; el
+    pico, en una segunda pasada con tracemalloc.
+    """
+    cambios = modulo.comparar_hojas_normal(actual, snapshot, None)["cambios"]
+    por_tipo = {"modificado": [], "eliminado": [], "nuevo": []}
+    for c in cambios:
+        por_tipo[c["tipo"] if isinstance(c, dict) else c.tipo].append(c)
+    argumentos = (por_tipo["modificado"], por_tipo["eliminado"], por_tipo["nuevo"],
+                  "Enero/2026", "Municipalidad", ruta)
+    inicio = time.perf_counter()
+    modulo.generar_xlsx_cambios(*argumentos)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    modulo.generar_xlsx_cambios(*argumentos)
+    pico = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return segundos, pico
+
+
+@unittest.skipUnless(BENCHMARK, "benchmark opt-in: BENCHMARK=1")
+class TestRendimientoXlsxCambios(unittest.TestCase):
+
+    def test_rendimiento(self):
+        actual, snapshot = _datos_benchmark(BENCHMARK_CAMBIOS)
+        with tempfile.TemporaryDirectory() as directorio:
+            segundos, pico = _medir(monitoreo_utils, actual, snapshot,
+                                    os.path.join(directorio, "actual.xlsx"))
+            print(f"\n{BENCHMARK_CAMBIOS} cambios, actual: {segundos:.1f} s, pico {pico:.1f} MB")
+            if BENCHMARK_REF:
+                referencia = modulo_en_revision(BENCHMARK_REF, "src/utils/monitoreo_utils.py",
+                                                 "monitoreo_utils_ref")
+                seg_ref, pico_ref = _medir(referencia, actual, snapshot,
+                                           os.path.join(directorio, "referencia.xlsx"))
+                print(f"{BENCHMARK_CAMBIOS} cambios, {BENCHMARK_REF}: {seg_ref:.1f} s, pico {pico_ref:.1f} MB")
+                self.assertLess(segundos, seg_ref)
+                self.assertLess(pico, pico_ref)
+        self.assertLess(pico, PICO_MAX_MB_POR_MIL * BENCHMARK_CAMBIOS / 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Casos dorados de la normalización de texto
+
+Lo esperado es lo que devolvían las funciones que texto_utils reemplaza:
+excel_utils.eliminar_tildes_latin, excel_utils.normalizar_texto y el
+normalizar_texto por NFD del monitoreo y del registro de agentes.
+
+    python -m pytest src/utils/test_texto_utils.py
+
+El rendimiento se mide aparte (opt-in): 100.000 llamadas con 3.000 valores
+distintos (como las columnas de nombre, situación y repartición), con todos
+distintos, y 50 textos de 11.000 caracteres. Con BENCHMARK_REF se miden
+también las funciones de esa revisión de git, por ejemplo la anterior a
+texto_utils:
+
+    BENCHMARK=1 BENCHMARK_REF=2280d91~1 python -m pytest -s src/utils/test_texto_utils.py
+"""
+
+import os
+import random
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import texto_utils
+from utils.benchmark_utils import BENCHMARK, BENCHMARK_REF, modulo_en_revision
+from utils.texto_utils import normalizar_clave, normalizar_csv, quitar_tildes
+
+# texto: (quitar_tildes, normalizar_csv, normalizar_csv sin_tildes=False, normalizar_clave)
+CASOS = {
+    "María González": ("Maria Gonzalez", "Maria Gonzalez", "María González", "MARIA GONZALEZ"),
+    "Ñandú": ("Ñandu", "Ñandu", "Ñandú", "NANDU"),
+    "a|b": ("a-b", "a-b", "a-b", "A|B"),
+    "PÉREZ|JUAN": ("PEREZ-JUAN", "PEREZ-JUAN", "PÉREZ-JUAN", "PEREZ|JUAN"),
+    "àèìòù ÄËÏÖÜ âêîôû": ("aeiou AEIOU aeiou", "aeiou AEIOU aeiou", "àèìòù ÄËÏÖÜ âêîôû", "AEIOU AEIOU AEIOU"),
+    "Çedilla ñ": ("Çedilla ñ", "Çedilla ñ", "Çedilla ñ", "CEDILLA N"),
+    "plain ascii": ("plain ascii", "plain ascii", "plain ascii", "PLAIN ASCII"),
+    "  espacios  ": ("  espacios  ", "espacios", "espacios", "ESPACIOS"),
+    "": ("", "", "", ""),
+    # Mojibake (UTF-8 leído como Latin-1), en el orden de reemplazo de antes
+    "JosÃ© PÃ©rez": ("Jose Perez", "Jose Perez", "JosÃ© PÃ©rez", "JOSA© PA©REZ"),
+    "CaÃ\xadda": ("Caida", "Caida", "CaÃ\xadda", "CAA\xadDA"),
+    "MartÃnez": ("MartInez", "MartInez", "MartÃnez", "MARTANEZ"),
+    "Ã‰XITO": ("EXITO", "EXITO", "Ã‰XITO", "A‰XITO"),
+    "Ã³scar": ("I³scar", "I³scar", "Ã³scar", "A³SCAR"),
+    "Ãlvarez": ("Ilvarez", "Ilvarez", "Ãlvarez", "ALVAREZ"),
+    "1Âº SAC": ("1° SAC", "1° SAC", "1Âº SAC", "1Aº SAC"),
+    # Fuera de Latin-1 y marcas combinantes sueltas
+    "ŁÓDŹ": ("ŁODŹ", "ŁODŹ", "ŁÓDŹ", "ŁODZ"),
+    "Ελλάδα": ("Ελλάδα", "Ελλάδα", "Ελλάδα", "ΕΛΛΑΔΑ"),
+    "e\u0301": ("e\u0301", "e\u0301", "e\u0301", "E"),
+}
+
+# valor: (normalizar_csv, normalizar_clave)
+CASOS_NO_TEXTO = {
+    None: ("", ""),
+    12: ("12", "12"),
+    3.5: ("3.5", "3.5"),
+    "  ": ("", ""),
+    " josé  pérez ": ("jose  perez", "JOSE PEREZ"),
+}
+
+
+class TestTextoUtils(unittest.TestCase):
+
+    def test_casos(self):
+        for texto, esperado in CASOS.items():
+            with self.subTest(texto=texto):
+                obtenido = (
+                    quitar_tildes(texto),
+                    normalizar_csv(texto),
+                    normalizar_csv(texto, sin_tildes=False),
+                    normalizar_clave(texto),
+                )
+                self.assertEqual(obtenido, esperado)
+
+    def test_no_texto(self):
+        for valor, esperado in CASOS_NO_TEXTO.items():
+            with self.subTest(valor=valor):
+                self.assertEqual((normalizar_csv(valor), normalizar_clave(valor)), esperado)
+
+
+def _datos_benchmark():
+    """{nombre: valores} de los casos del benchmark (siempre los mismos)."""
+    azar = random.Random(3)
+    nombres = ["José", "María", "Ángel", "Nuñez", "Óscar", "Juan", "Ana"]
+    apellidos = ["Pérez", "Gómez", "Güemes", "Ibáñez", "Rossi", "Diaz"]
+    distintos = [f"{azar.choice(nombres)} {azar.choice(apellidos)} {i}" for i in range(3000)]
+    return {
+        "repetidos": [azar.choice(distintos) for _ in range(100000)],
+        "distintos": [f"Nombre Apellido {i} Pérez" for i in range(100000)],
+        "largos": ["Dirección de Obras Públicas " * 400 + str(i) for i in range(50)],
+    }
+
+
+def _limpiar_memo():
+    for funcion in (texto_utils.quitar_tildes, texto_utils._normalizar_csv, texto_utils._normalizar_clave):
+        funcion.cache_clear()
+
+
+def _medir(funcion, valores):
+    """Microsegundos por llamada, con la memoización vacía al empezar."""
+    _limpiar_memo()
+    inicio = time.perf_counter()
+    for valor in valores:
+        funcion(valor)
+    return (time.perf_counter() - inicio) / len(valores) * 1e6
+
+
+# (función actual, (módulo, función) en BENCHMARK_REF, datos, máximo en µs por llamada).
+# Los máximos dejan margen para máquinas lentas; la versión anterior a
+# texto_utils tardaba 4-5 µs por llamada corta y ~1000 µs por texto largo
+CASOS_BENCHMARK = (
+    (quitar_tildes, ("excel_utils", "eliminar_tildes_latin"), "repetidos", 1.5),
+    (quitar_tildes, ("excel_utils", "eliminar_tildes_latin"), "distintos", 3.0),
+    (quitar_tildes, ("excel_utils", "eliminar_tildes_latin"), "largos", 150.0),
+    (normalizar_csv, ("excel_utils", "normalizar_texto"), "repetidos", 1.5),
+    (normalizar_clave, ("registro_utils", "_normalizar"), "distintos", 4.0),
+    (normalizar_clave, ("registro_utils", "_normalizar"), "largos", 800.0),
+)
+
+
+@unittest.skipUnless(BENCHMARK, "benchmark opt-in: BENCHMARK=1")
+class TestRendimientoTexto(unittest.TestCase):
+
+    def test_rendimiento(self):
+        datos = _datos_benchmark()
+        referencias = {}
+        for funcion, (modulo, nombre_ref), caso, maximo in CASOS_BENCHMARK:
+            with self.subTest(funcion=funcion.__name__, caso=caso):
+                actual = _medir(funcion, datos[caso])
+                linea = f"{funcion.__name__:16s} {caso:9s} {actual:8.2f} µs"
+                if BENCHMARK_REF:
+                    if modulo not in referencias:
+                        referencias[modulo] = modulo_en_revision(
+                            BENCHMARK_REF, f"src/utils/{modulo}.py", f"{modulo}_ref")
+                    anterior = _medir(getattr(referencias[modulo], nombre_ref), datos[caso])
+                    linea += f"   {BENCHMARK_REF} {nombre_ref}: {anterior:8.2f} µs"
+                print(linea)
+                if BENCHMARK_REF:
+                    self.assertLess(actual, anterior)
+                self.assertLess(actual, maximo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Normalización de texto compartida por los bots
+
+- quitar_tildes: lo que hacía eliminar_tildes_latin (arreglos de mojibake,
+  vocales acentuadas a su letra base y "|" a "-" para el CSV).
+- normalizar_csv: lo que hacía excel_utils.normalizar_texto (strip y, según
+  la columna, sin tildes o sólo sin "|").
+- normalizar_clave: clave de comparación de nombres del monitoreo y del
+  registro de agentes (mayúsculas, sin diacríticos, espacios colapsados).
+
+Todo se resuelve con tablas de traducción armadas una vez al importar el
+módulo, en lugar de recorrer carácter por carácter, y los resultados se
+memoizan con lru_cache: en una liquidación los mismos nombres, situaciones
+y reparticiones se repiten miles de veces. Si el texto entra en Latin-1
+(el caso normal) se traduce como bytes, que es mucho más rápido que
+str.translate con caracteres no ASCII.
+"""
+
+import unicodedata
+from functools import lru_cache
+
+TAMANIO_MEMO = 1 << 16
+
+# Secuencias de UTF-8 leído como Latin-1, en el orden en que se reemplazan.
+# Después de "Ã­" cualquier "Ã" suelta pasa a "I", así que las demás
+# secuencias que empiezan con "Ã" ya no pueden aparecer.
+_MOJIBAKE = (
+    ("Ã¡", "a"),
+    ("Ã©", "e"),
+    ("Ã‰", "E"),
+    ("Ã­", "i"),
+    ("Ã", "I"),
+    ("Âº", "°"),
+)
+
+_SIN_TILDES = str.maketrans({
+    # Vocales minúsculas con tilde
+    "á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u",
+    "à": "a", "è": "e", "ì": "i", "ò": "o", "ù": "u",
+    "ä": "a", "ë": "e", "ï": "i", "ö": "o", "ü": "u",
+    "â": "a", "ê": "e", "î": "i", "ô": "o", "û": "u",
+    # Vocales mayúsculas con tilde
+    "Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U",
+    "À": "A", "È": "E", "Ì": "I", "Ò": "O", "Ù": "U",
+    "Ä": "A", "Ë": "E", "Ï": "I", "Ö": "O", "Ü": "U",
+    "Â": "A", "Ê": "E", "Î": "I", "Ô": "O", "Û": "U",
+    # Separador del CSV
+    "|": "-",
+})
+
+
+def _tabla_bytes(tabla):
+    """Versión bytes (Latin-1) de una tabla de str.maketrans de 1 a 1 carácter."""
+    return bytes(
+        ord(tabla[i]) if isinstance(tabla.get(i), str) else i
+        for i in range(256)
+    )
+
+
+_SIN_TILDES_LATIN1 = _tabla_bytes(_SIN_TILDES)
+
+
+def _sin_marcas(texto):
+    """NFD sin las marcas combinantes (categoría Mn)."""
+    return "".join(
+        c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn"
+    )
+
+
+# Latin-1, Latin Extendido A/B y diacríticos combinantes: cada carácter va
+# directo a su forma NFD sin marcas. Lo que quede fuera de la tabla pasa
+# por _sin_marcas.
+_SIN_MARCAS = str.maketrans({
+    chr(c): _sin_marcas(chr(c))
+    for c in range(0x80, 0x370)
+    if _sin_marcas(chr(c)) != chr(c)
+})
+_SIN_MARCAS_LATIN1 = _tabla_bytes(_SIN_MARCAS)
+_CUBIERTOS = frozenset(chr(c) for c in range(0x370))
+
+
+def _traducir(texto, tabla, tabla_latin1):
+    try:
+        return texto.encode("latin-1").translate(tabla_latin1).decode("latin-1")
+    except UnicodeEncodeError:
+        return texto.translate(tabla)
+
+
+@lru_cache(maxsize=TAMANIO_MEMO)
+def quitar_tildes(texto):
+    """
+    "María González" → "Maria Gonzalez", "Ñandú" → "Ñandu", "a|b" → "a-b".
+    Mismo resultado que eliminar_tildes_latin.
+    """
+    if texto.isascii():
+        return texto.replace("|", "-")
+    if "Ã" in texto or "Â" in texto:
+        for roto, bien in _MOJIBAKE:
+            texto = texto.replace(roto, bien)
+    return _traducir(texto, _SIN_TILDES, _SIN_TILDES_LATIN1)
+
+
+@lru_cache(maxsize=TAMANIO_MEMO)
+def _normalizar_csv(texto, sin_tildes):
+    texto = texto.strip()
+    if not texto:
+        return ""
+    if sin_tildes:
+        return quitar_tildes(texto)
+    return texto.replace("|", "-")
+
+
+def normalizar_csv(texto, sin_tildes=True):
+    """Normaliza una celda de texto para el CSV (None → "")."""
+    if texto is None:
+        return ""
+    if not isinstance(texto, str):
+        texto = str(texto)
+    return _normalizar_csv(texto, sin_tildes)
+
+
+@lru_cache(maxsize=TAMANIO_MEMO)
+def _normalizar_clave(texto):
+    texto = texto.upper()
+    if not texto.isascii():
+        if _CUBIERTOS.issuperset(texto):
+            texto = _traducir(texto, _SIN_MARCAS, _SIN_MARCAS_LATIN1)
+        else:
+            texto = _sin_marcas(texto)
+    return " ".join(texto.split())
+
+
+def normalizar_clave(s):
+    """" josé  pérez " → "JOSE PEREZ". Vacío o None → ""."""
+    return _normalizar_clave(str(s or ""))